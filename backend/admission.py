@@ -0,0 +1,217 @@
+"""Admission control for public write endpoints.
+
+AdmissionMiddleware checks each request to a limited route, before the body
+is read, against:
+
+- token buckets per client IP and per session, refilled continuously at
+  the route's rate up to its burst size. An empty bucket answers 429 with
+  Retry-After set to when a token will be available. Requests without an
+  established session (no cookie, or a new one) share one bucket per
+  route, since a fresh session id would otherwise be a fresh bucket.
+- a cap on requests to the route in flight in this worker. Past the cap,
+  requests are shed with 503 and Retry-After instead of queueing behind
+  slow Mongo or gateway calls.
+
+Buckets live in a size-bounded LRU in each worker (LocalBucketStore), or in
+a Mongo collection shared by all workers (MongoBucketStore).
+
+Per-IP buckets key on the socket peer. Behind a proxy or ingress the peer
+is the proxy, so they take the client address from X-Forwarded-For, but
+only when the peer is one of the trusted proxies: the rightmost address
+that is not itself a trusted proxy is the client.
+"""
+import ipaddress
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from pymongo import ReturnDocument
+
+from metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+admission_rejections = registry.register(Counter(
+    "admission_rejections_total", "Requests rejected by rate limits or load shedding", ("route", "reason")
+))
+
+
+class LocalBucketStore:
+    """Token buckets for one worker, evicting the least recently used keys past max_keys"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Tuple[bool, float]:
+        """Return (allowed, seconds until cost tokens are available)"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        while len(self._buckets) > self.max_keys:
+            # The least recently used buckets are the likeliest to have refilled,
+            # and a full bucket is the same as a new one, so eviction rarely loosens a limit
+            self._buckets.popitem(last=False)
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return True, 0.0
+        return False, (cost - bucket[0]) / rate
+
+
+class MongoBucketStore:
+    """Token buckets shared by all workers, updated atomically by one pipeline upsert per check"""
+
+    def __init__(self, collection, ttl: float = 3600.0):
+        self.collection = collection
+        self.ttl_ms = int(ttl * 1000)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Tuple[bool, float]:
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [burst, {"$add": [{"$ifNull": ["$tokens", burst]}, {"$multiply": [elapsed, rate]}]}]},
+                    "updated_at": "$$NOW",
+                    # Idle buckets are removed by a TTL index on expires_at
+                    "expires_at": {"$add": ["$$NOW", self.ttl_ms]},
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            projection={"_id": 0, "tokens": 1, "allowed": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if bucket["allowed"]:
+            return True, 0.0
+        return False, (cost - bucket["tokens"]) / rate
+
+
+class AdmissionMiddleware:
+    """Applies per-route rules of the form
+
+        {
+            "ip": (rate_per_second, burst),
+            "session": (rate_per_second, burst),
+            "new_session": (rate_per_second, burst),
+            "concurrency": max_in_flight,
+        }
+
+    keyed by (method, path). Every part of a rule is optional; "new_session",
+    the bucket shared by requests without an established session, defaults
+    to the "session" limits.
+    """
+
+    def __init__(
+        self,
+        app,
+        rules: Dict[Tuple[str, str], dict],
+        store,
+        enabled: bool = True,
+        ip_limits: bool = True,
+        trusted_proxies: Sequence[str] = (),
+    ):
+        self.app = app
+        self.rules = rules
+        self.store = store
+        self.enabled = enabled
+        self.ip_limits = ip_limits
+        # Addresses or CIDR ranges, e.g. "10.0.0.0/8"
+        self.trusted_proxies = [ipaddress.ip_network(value.strip(), strict=False) for value in trusted_proxies]
+        self.in_flight: Dict[Tuple[str, str], int] = {}
+
+    def _trusted(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def client_ip(self, scope) -> Optional[str]:
+        """The client address, read through X-Forwarded-For only when the peer is a trusted proxy"""
+        if not scope.get("client"):
+            return None
+        host = scope["client"][0]
+        if not self._trusted(host):
+            return host
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                for forwarded in reversed(value.decode("latin-1").split(",")):
+                    forwarded = forwarded.strip()
+                    if not forwarded:
+                        continue
+                    host = forwarded
+                    if not self._trusted(host):
+                        break
+                break
+        return host
+
+    async def _reject(self, send, status: int, retry_after: float, detail: str):
+        body = orjson.dumps({"detail": detail})
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _check_buckets(self, scope, route: Tuple[str, str], rule: dict) -> Optional[Tuple[str, float]]:
+        """Return (limit name, retry after) for the first exhausted bucket, or None"""
+        keys = []
+        client_ip = self.client_ip(scope) if "ip" in rule and self.ip_limits else None
+        if client_ip:
+            keys.append(("ip", client_ip, rule["ip"]))
+        session = scope.get("state", {}).get("session")
+        if session is not None and not session.is_new:
+            if "session" in rule:
+                keys.append(("session", session.id, rule["session"]))
+        elif "new_session" in rule or "session" in rule:
+            # A new session id would be a fresh bucket every time, so clients
+            # without one share a single bucket for the route
+            keys.append(("new_session", "*", rule.get("new_session", rule.get("session"))))
+        for name, value, (rate, burst) in keys:
+            try:
+                allowed, retry_after = await self.store.take(f"{route[0]} {route[1]}|{name}|{value}", rate, burst)
+            except Exception as e:
+                # Fail open: an unreachable shared store must not take the endpoint down
+                logger.error(f"Rate limit check failed, admitting request: {str(e)}")
+                return None
+            if not allowed:
+                return name, retry_after
+        return None
+
+    async def __call__(self, scope, receive, send):
+        rule = self.rules.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if rule is None or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        route = (scope["method"], scope["path"])
+        label = f"{route[0]} {route[1]}"
+
+        limit = rule.get("concurrency")
+        if limit is not None and self.in_flight.get(route, 0) >= limit:
+            admission_rejections.inc(route=label, reason="concurrency")
+            await self._reject(send, 503, 1, "Server is busy, please retry shortly")
+            return
+
+        # Counted before the bucket check so a slow shared store cannot let a burst past the cap
+        self.in_flight[route] = self.in_flight.get(route, 0) + 1
+        try:
+            exhausted = await self._check_buckets(scope, route, rule)
+            if exhausted:
+                name, retry_after = exhausted
+                admission_rejections.inc(route=label, reason=name)
+                await self._reject(send, 429, retry_after, "Too many requests, please slow down")
+                return
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[route] -= 1
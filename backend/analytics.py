@@ -0,0 +1,294 @@
+"""Daily analytics rollups maintained with Mongo aggregation pipelines.
+
+refresh() recomputes one rollup document per metric and day with $group
+pipelines that $merge into the analytics_daily collection. Only days that
+changed since the previous run are recomputed:
+
+- orders: the creation days of orders updated since the last run, since a
+  status change alters an older day, plus the days of orders archived since
+  then (mark_orders_archived)
+- carts and inquiries: days since the last run, since neither a cart's
+  nor an inquiry's creation date ever changes
+
+Order rollups read orders and orders_archive, so orders archived to the
+collection keep counting. Orders archived to JSONL files leave Mongo, and
+their days are rebuilt without them. A recomputed day that no longer has
+any documents has its rollup removed.
+
+Report queries read only rollup documents for the requested days, so their
+cost depends on the date range rather than on the size of the history.
+"""
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+ROLLUP_COLLECTION = "analytics_daily"
+ARCHIVE_COLLECTION = "orders_archive"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def day_of(field: str, tz: str) -> dict:
+    return {"$dateToString": {"format": "%Y-%m-%d", "date": f"${field}", "timezone": tz}}
+
+
+def merge_rollups(metric: str, run_id: str) -> List[dict]:
+    """Final stages turning one document per day into rollups merged by (metric, day)"""
+    return [
+        {"$set": {
+            "_id": {"$concat": [metric, "|", "$day"]},
+            "metric": {"$literal": metric},
+            "run_id": {"$literal": run_id},
+            "updated_at": "$$NOW",
+        }},
+        {"$merge": {"into": ROLLUP_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+def with_archive(match: dict) -> List[dict]:
+    """Stages selecting matching orders from both orders and orders_archive"""
+    return [
+        {"$match": match},
+        {"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": [{"$match": match}]}},
+    ]
+
+
+def orders_pipeline(match: dict, tz: str, run_id: str) -> List[dict]:
+    return [
+        *with_archive(match),
+        {"$group": {
+            "_id": {"day": day_of("created_at", tz), "status": "$status"},
+            "count": {"$sum": 1},
+            "amount_paise": {"$sum": "$total_amount"},
+        }},
+        {"$group": {
+            "_id": "$_id.day",
+            "orders": {"$sum": "$count"},
+            "statuses": {"$push": {"status": "$_id.status", "count": "$count", "amount_paise": "$amount_paise"}},
+        }},
+        {"$project": {"_id": 0, "day": "$_id", "orders": 1, "statuses": 1}},
+        *merge_rollups("orders", run_id),
+    ]
+
+
+def products_pipeline(match: dict, tz: str, run_id: str) -> List[dict]:
+    paid = {"$eq": ["$status", "paid"]}
+    return [
+        *with_archive(match),
+        {"$unwind": "$items"},
+        # Orders placed before unit prices were stored fall back to the catalog price
+        {"$lookup": {"from": "products", "localField": "items.product_id", "foreignField": "product_id", "as": "product"}},
+        {"$group": {
+            "_id": {"day": day_of("created_at", tz), "product_id": "$items.product_id"},
+            "name": {"$first": "$items.name"},
+            "quantity": {"$sum": {"$cond": [paid, "$items.quantity", 0]}},
+            "revenue_paise": {"$sum": {"$cond": [paid, {"$multiply": [
+                {"$ifNull": ["$items.unit_price", {"$ifNull": [{"$arrayElemAt": ["$product.price_paise", 0]}, 0]}]},
+                "$items.quantity",
+            ]}, 0]}},
+        }},
+        # Days whose paid orders all changed status still get a (now empty) rollup
+        {"$group": {
+            "_id": "$_id.day",
+            "products": {"$push": {
+                "product_id": "$_id.product_id", "name": "$name",
+                "quantity": "$quantity", "revenue_paise": "$revenue_paise",
+            }},
+        }},
+        {"$project": {
+            "_id": 0,
+            "day": "$_id",
+            "products": {"$filter": {"input": "$products", "cond": {"$gt": ["$$this.quantity", 0]}}},
+        }},
+        *merge_rollups("products", run_id),
+    ]
+
+
+def inquiries_pipeline(match: dict, tz: str, run_id: str) -> List[dict]:
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {"day": day_of("timestamp", tz), "service_interest": {"$ifNull": ["$service_interest", "General inquiry"]}},
+            "count": {"$sum": 1},
+        }},
+        {"$group": {
+            "_id": "$_id.day",
+            "inquiries": {"$sum": "$count"},
+            "services": {"$push": {"service_interest": "$_id.service_interest", "count": "$count"}},
+        }},
+        {"$project": {"_id": 0, "day": "$_id", "inquiries": 1, "services": 1}},
+        *merge_rollups("inquiries", run_id),
+    ]
+
+
+def carts_pipeline(match: dict, tz: str, run_id: str) -> List[dict]:
+    return [
+        {"$match": match},
+        {"$group": {"_id": day_of("created_at", tz), "carts_created": {"$sum": 1}}},
+        {"$project": {"_id": 0, "day": "$_id", "carts_created": 1}},
+        *merge_rollups("carts", run_id),
+    ]
+
+
+PIPELINES = {
+    "orders": ("orders", "created_at", orders_pipeline),
+    "products": ("orders", "created_at", products_pipeline),
+    "inquiries": ("contact_inquiries", "timestamp", inquiries_pipeline),
+    "carts": ("carts", "created_at", carts_pipeline),
+}
+
+
+class AnalyticsRollups:
+    def __init__(self, db, tz: str = "Asia/Kolkata", grace: float = 300.0):
+        self.db = db
+        self.tz = tz
+        self.zone = ZoneInfo(tz)
+        # Re-scan this far before the previous run to catch writes that were in flight
+        self.grace = timedelta(seconds=grace)
+
+    @property
+    def rollups(self):
+        return self.db[ROLLUP_COLLECTION]
+
+    def day_start(self, day: date) -> datetime:
+        return datetime(day.year, day.month, day.day, tzinfo=self.zone).astimezone(timezone.utc)
+
+    def start_of_day(self, moment: datetime) -> datetime:
+        return self.day_start(moment.astimezone(self.zone).date())
+
+    def local_day(self, moment: datetime) -> str:
+        return moment.astimezone(self.zone).date().isoformat()
+
+    def day_ranges(self, days: Iterable[str]) -> List[Tuple[datetime, datetime]]:
+        """UTC [start, end) ranges covering the given local days, merging adjacent days"""
+        ranges = []
+        for day in sorted(set(days)):
+            begin = self.day_start(date.fromisoformat(day))
+            end = self.day_start(date.fromisoformat(day) + timedelta(days=1))
+            if ranges and ranges[-1][1] == begin:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((begin, end))
+        return ranges
+
+    def scope(self, field: str, days) -> Tuple[dict, dict]:
+        """(source match, rollup day filter) for every day, the days since a moment, or a list of days"""
+        if days is None:
+            return {}, {}
+        if isinstance(days, datetime):
+            return {field: {"$gte": days}}, {"day": {"$gte": self.local_day(days)}}
+        ranges = [{field: {"$gte": begin, "$lt": end}} for begin, end in self.day_ranges(days)]
+        return {"$or": ranges}, {"day": {"$in": sorted(days)}}
+
+    async def mark_orders_archived(self, orders: List[dict]):
+        """Queue the creation days of orders just archived, for the next refresh to rebuild"""
+        days = sorted({self.local_day(order["created_at"]) for order in orders if order.get("created_at")})
+        if days:
+            await self.rollups.update_one(
+                {"_id": "state"},
+                {"$set": {"metric": "state"}, "$addToSet": {"archived_order_days": {"$each": days}}},
+                upsert=True,
+            )
+
+    async def changed_order_days(self, since: datetime) -> List[str]:
+        """Creation days of the orders updated since a moment"""
+        groups = await self.db.orders.aggregate([
+            {"$match": {"updated_at": {"$gte": since}}},
+            {"$group": {"_id": day_of("created_at", self.tz)}},
+        ]).to_list(None)
+        return [group["_id"] for group in groups if group["_id"]]
+
+    async def refresh(self) -> Dict:
+        """Recompute the rollups of every day changed since the previous refresh"""
+        started = datetime.now(timezone.utc)
+        run_id = uuid.uuid4().hex
+        state = await self.rollups.find_one({"_id": "state"}) or {}
+        archived_days = state.get("archived_order_days", [])
+
+        if "last_run_at" not in state:
+            # First run: every day of every metric
+            scopes = dict.fromkeys(PIPELINES)
+        else:
+            since = state["last_run_at"] - self.grace
+            recent = self.start_of_day(since)
+            scopes = {"carts": recent, "inquiries": recent}
+            order_days = sorted(set(await self.changed_order_days(since)) | set(archived_days))
+            if order_days:
+                scopes["orders"] = scopes["products"] = order_days
+
+        refreshed = {}
+        for metric, days in scopes.items():
+            collection_name, field, build = PIPELINES[metric]
+            match, rollup_days = self.scope(field, days)
+            await self.db[collection_name].aggregate(build(match, self.tz, run_id)).to_list(None)
+            # A recomputed day with no documents left was not rewritten by this run
+            await self.rollups.delete_many({"metric": metric, **rollup_days, "run_id": {"$ne": run_id}})
+            refreshed[metric] = days if isinstance(days, list) else {"from": self.local_day(days)} if days else "all"
+
+        update = {"$set": {"metric": "state", "last_run_at": started}}
+        if archived_days:
+            # Only the days handled here; more may have been queued meanwhile
+            update["$pullAll"] = {"archived_order_days": archived_days}
+        await self.rollups.update_one({"_id": "state"}, update, upsert=True)
+        return {"refreshed": refreshed, "last_run_at": started.isoformat()}
+
+    def _days(self, start: Optional[date], end: Optional[date]) -> dict:
+        end = end or datetime.now(self.zone).date()
+        start = start or end - timedelta(days=29)
+        return {"$gte": start.isoformat(), "$lte": end.isoformat()}
+
+    async def orders_by_day(self, start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+        return await self.rollups.find(
+            {"metric": "orders", "day": self._days(start, end)}, {"_id": 0, "metric": 0, "run_id": 0, "updated_at": 0}
+        ).sort("day", 1).to_list(None)
+
+    async def revenue_by_product(self, start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+        return await self.rollups.aggregate([
+            {"$match": {"metric": "products", "day": self._days(start, end)}},
+            {"$unwind": "$products"},
+            {"$group": {
+                "_id": "$products.product_id",
+                "name": {"$last": "$products.name"},
+                "quantity": {"$sum": "$products.quantity"},
+                "revenue_paise": {"$sum": "$products.revenue_paise"},
+            }},
+            {"$project": {"_id": 0, "product_id": "$_id", "name": 1, "quantity": 1, "revenue_paise": 1}},
+            {"$sort": {"revenue_paise": -1}},
+        ]).to_list(None)
+
+    async def inquiries_by_service(self, start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+        return await self.rollups.aggregate([
+            {"$match": {"metric": "inquiries", "day": self._days(start, end)}},
+            {"$unwind": "$services"},
+            {"$group": {"_id": "$services.service_interest", "count": {"$sum": "$services.count"}}},
+            {"$project": {"_id": 0, "service_interest": "$_id", "count": 1}},
+            {"$sort": {"count": -1}},
+        ]).to_list(None)
+
+    async def cart_abandonment(self, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+        """Share of carts created per day that did not turn into a paid order"""
+        days = await self.rollups.aggregate([
+            {"$match": {"metric": {"$in": ["carts", "orders"]}, "day": self._days(start, end)}},
+            {"$project": {
+                "day": 1,
+                "carts": {"$ifNull": ["$carts_created", 0]},
+                "paid": {"$sum": {"$map": {
+                    "input": {"$filter": {"input": {"$ifNull": ["$statuses", []]}, "cond": {"$eq": ["$$this.status", "paid"]}}},
+                    "in": "$$this.count",
+                }}},
+            }},
+            {"$group": {"_id": "$day", "carts_created": {"$sum": "$carts"}, "paid_orders": {"$sum": "$paid"}}},
+            {"$project": {"_id": 0, "day": "$_id", "carts_created": 1, "paid_orders": 1}},
+            {"$sort": {"day": 1}},
+        ]).to_list(None)
+        for day in days:
+            day["abandonment_rate"] = abandonment_rate(day["carts_created"], day["paid_orders"])
+        carts = sum(day["carts_created"] for day in days)
+        paid = sum(day["paid_orders"] for day in days)
+        return {"carts_created": carts, "paid_orders": paid, "abandonment_rate": abandonment_rate(carts, paid), "days": days}
+
+
+def abandonment_rate(carts: int, paid_orders: int) -> Optional[float]:
+    if not carts:
+        return None
+    return round(max(0.0, 1 - paid_orders / carts), 4)
@@ -0,0 +1,113 @@
+"""Customer latency during a bot flood, with and without admission control.
+
+One client address floods POST /api/contact while customers, each from its
+own address, submit inquiries at a steady pace. Reports what the flood got
+through (inserted inquiries, 429/503 answers) and the customers' latency
+and error counts for builds of the app with rate limits off and on.
+
+Usage (run from backend/):
+    python benchmarks/admission_flood.py --flood 2000 --flood-concurrency 100
+    python benchmarks/admission_flood.py --mongomock  # pip install mongomock-motor
+
+Without --mongomock, MONGO_URL must point at a local mongod. The benchmark drops
+and reseeds BENCH_DB_NAME (default mystic_prana_bench), never the app's DB_NAME.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["PAYMENT_GATEWAY"] = "fake"
+os.environ["EMAIL_TRANSPORT"] = "local"
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+# Benchmarks seed and drop their database, so never reuse the app's DB_NAME
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "mystic_prana_bench")
+
+import httpx  # noqa: E402
+
+from load_test import contact_request, drop_bench_database  # noqa: E402
+
+
+async def flood(app, requests: int, concurrency: int) -> Counter:
+    statuses: Counter = Counter()
+    transport = httpx.ASGITransport(app=app, client=("203.0.113.9", 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        queue = iter(range(requests))
+
+        async def worker():
+            for i in queue:
+                method, url, kwargs = contact_request(i)
+                response = await http.request(method, url, **kwargs)
+                statuses[response.status_code] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return statuses
+
+
+async def customers(app, count: int, interval: float):
+    latencies, errors = [], 0
+
+    async def customer(n: int):
+        nonlocal errors
+        transport = httpx.ASGITransport(app=app, client=(f"198.51.100.{n % 250 + 1}", 50000 + n))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            method, url, kwargs = contact_request(n)
+            start = time.perf_counter()
+            response = await http.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    tasks = []
+    for n in range(count):
+        tasks.append(asyncio.create_task(customer(n)))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p99_ms": round(ordered[int(len(ordered) * 0.99) - 1], 3),
+        "errors": errors,
+    }
+
+
+async def main(args):
+    import server
+
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db.bind(AsyncMongoMockClient()[os.environ["DB_NAME"]])
+    else:
+        server.connect_database()
+        await drop_bench_database(server)
+
+    print(f"{'build':<9} {'inserted':>9} {'429':>6} {'503':>6} {'cust p50':>9} {'cust p99':>9} {'cust err':>9}")
+    async with server.app.router.lifespan_context(server.app):
+        for name, enabled in (("baseline", False), ("limited", True)):
+            server.RATE_LIMIT_ENABLED = enabled
+            server.rate_limit_store = server.LocalBucketStore()
+            app = server.create_app()
+            before = await server.db.contact_inquiries.count_documents({})
+            statuses, result = await asyncio.gather(
+                flood(app, args.flood, args.flood_concurrency),
+                customers(app, args.customers, args.interval),
+            )
+            inserted = await server.db.contact_inquiries.count_documents({}) - before - args.customers + result["errors"]
+            print(
+                f"{name:<9} {inserted:>9} {statuses[429]:>6} {statuses[503]:>6} "
+                f"{result['p50_ms']:>9} {result['p99_ms']:>9} {result['errors']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flood", type=int, default=2000, help="Requests sent by the flooding client")
+    parser.add_argument("--flood-concurrency", type=int, default=100)
+    parser.add_argument("--customers", type=int, default=100, help="Customers, one request each")
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between customer arrivals")
+    parser.add_argument("--mongomock", action="store_true", help="Use mongomock-motor instead of a local mongod")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,46 @@
+"""Fire N parallel add-to-cart requests at one session and check no increment is lost.
+
+Adds are spread over the catalog products so no line reaches MAX_ITEM_QUANTITY.
+
+Usage: python benchmarks/cart_concurrency.py [N]  (run from backend/, needs MONGO_URL and DB_NAME)
+"""
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+
+async def main(n: int):
+    server.connect_database()
+    await server.ensure_indexes()
+    await server.load_product_catalog()
+    products = list(server.product_catalog.values())
+    if n > len(products) * server.MAX_ITEM_QUANTITY:
+        raise SystemExit(f"N must be at most {len(products) * server.MAX_ITEM_QUANTITY}")
+    session_id = f"bench_{uuid.uuid4().hex[:8]}"
+    items = [
+        server.CartItem(product_id=product.product_id, name=product.name, price=product.price, quantity=1, image="")
+        for product in products
+    ]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(server.add_to_cart(items[i % len(items)], session_id=session_id) for i in range(n)))
+    elapsed = time.perf_counter() - start
+
+    cart = await server.db.carts.find_one({"session_id": session_id})
+    quantity = sum(i["quantity"] for i in cart["items"])
+    await server.db.carts.delete_one({"session_id": session_id})
+
+    print(f"{n} parallel adds in {elapsed:.3f}s ({n / elapsed:.0f} adds/s)")
+    print(f"final quantity: {quantity} (expected {n}), total: {cart['total_amount']}")
+    if quantity != n:
+        raise SystemExit("lost updates detected")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,68 @@
+"""Compare order-confirmation rendering: inline f-strings with += rows vs precompiled templates.
+
+Usage: python benchmarks/email_render.py  (run from backend/, no database needed)
+"""
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from email_templates import render_order_confirmation_email  # noqa: E402
+
+
+def legacy_render(order_data):
+    """The pre-template implementation: rows built with += and one large f-string"""
+    customer_info = order_data.get("customer_info", {})
+    items_html = ""
+    for item in order_data.get("items", []):
+        items_html += f"""
+                <tr>
+                    <td style="padding: 10px; border-bottom: 1px solid #eee;">{item['name']}</td>
+                    <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: center;">{item['quantity']}</td>
+                    <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: right;">{item['price']}</td>
+                </tr>
+                """
+    return f"""
+            <html><body>
+            <p><strong>Order ID:</strong> {order_data['order_id']}</p>
+            <p><strong>Customer:</strong> {customer_info.get('name', 'N/A')}</p>
+            <table><tbody>{items_html}</tbody></table>
+            <p><strong>Total Amount:</strong> ₹{order_data['total_amount']/100}</p>
+            <p><strong>Status:</strong> {order_data['status'].title()}</p>
+            </body></html>
+            """
+
+
+def make_order(n_items):
+    return {
+        "order_id": "order_bench",
+        "customer_info": {"name": "Bench Customer", "email": "bench@example.com"},
+        "items": [{"name": f"Item {i}", "quantity": i % 5 + 1, "price": "₹600"} for i in range(n_items)],
+        "total_amount": 60000 * n_items,
+        "status": "paid",
+    }
+
+
+def measure(render, order, number):
+    seconds = timeit.timeit(lambda: render(order), number=number) / number
+    tracemalloc.start()
+    render(order)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, peak / 1024
+
+
+def main():
+    print(f"{'items':>6} {'legacy us':>10} {'legacy KiB':>11} {'template us':>12} {'template KiB':>13}")
+    for n_items in (1, 10, 50, 100, 250, 500):
+        order = make_order(n_items)
+        number = max(10, 2000 // n_items)
+        legacy_us, legacy_kib = measure(legacy_render, order, number)
+        template_us, template_kib = measure(render_order_confirmation_email, order, number)
+        print(f"{n_items:>6} {legacy_us:>10.1f} {legacy_kib:>11.1f} {template_us:>12.1f} {template_kib:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare per-request insert_one with the group-commit writer under concurrent load.
+
+Usage: python benchmarks/group_commit.py [N] [CONCURRENCY]  (run from backend/, needs MONGO_URL and DB_NAME)
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from group_commit import GroupCommitWriter  # noqa: E402
+
+
+def status_document():
+    return {"id": str(uuid.uuid4()), "client_name": "bench", "timestamp": datetime.now(timezone.utc).isoformat()}
+
+
+async def run(insert, total, concurrency):
+    remaining = iter(range(total))
+    latencies = []
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await insert(status_document())
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return total / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+async def main(total, concurrency):
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    collection = client[os.environ["DB_NAME"]][f"bench_status_checks_{uuid.uuid4().hex[:8]}"]
+    try:
+        rate, p50, p99 = await run(collection.insert_one, total, concurrency)
+        print(f"insert_one:   {rate:8.0f} docs/s  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+        for max_delay in (0.001, 0.005):
+            writer = GroupCommitWriter(collection, max_batch=100, max_delay=max_delay)
+            rate, p50, p99 = await run(writer.insert, total, concurrency)
+            await writer.close()
+            print(f"group commit ({max_delay * 1000:.0f} ms): {rate:8.0f} docs/s  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+        print(f"documents written: {await collection.count_documents({})} (expected {total * 3})")
+    finally:
+        await collection.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [5000, 200][len(args):])))
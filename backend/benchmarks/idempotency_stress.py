@@ -0,0 +1,88 @@
+"""Fire parallel retries of one /create-order request and check only one order is created.
+
+Every round sends N concurrent requests sharing an Idempotency-Key (and a
+unique customer email), then checks that all successful responses carry the
+same order id and that exactly one order document exists for the round.
+
+Usage (run from backend/, needs MONGO_URL and DB_NAME for a disposable mongod):
+    python benchmarks/idempotency_stress.py --parallel 50 --rounds 20
+    # Across processes: start `SESSION_SECRET=bench python run.py --workers 4` first, then
+    python benchmarks/idempotency_stress.py --url http://127.0.0.1:8001
+"""
+import argparse
+import asyncio
+import collections
+import os
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["PAYMENT_GATEWAY"] = "fake"
+os.environ["EMAIL_TRANSPORT"] = "local"
+# Every in-process request comes from the same client address
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+# Widen the race window between the first request and its duplicates
+os.environ.setdefault("FAKE_GATEWAY_LATENCY_MS", "50")
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+
+def order_payload(email: str):
+    return {
+        "amount": 60000,
+        "currency": "INR",
+        "customer_info": {"name": "Stress User", "email": email},
+        "cart_items": [{"product_id": "1", "name": "Aura Spray", "price": "₹600", "quantity": 1, "image": ""}],
+    }
+
+
+async def run_round(http, parallel: int):
+    key = uuid.uuid4().hex
+    email = f"stress_{key[:12]}@example.com"
+    responses = await asyncio.gather(*(
+        http.post("/api/create-order", json=order_payload(email), headers={"Idempotency-Key": key})
+        for _ in range(parallel)
+    ))
+    statuses = collections.Counter(response.status_code for response in responses)
+    order_ids = {response.json()["id"] for response in responses if response.status_code == 200}
+    stored = await server.db.orders.count_documents({"customer_info.email": email})
+    return statuses, order_ids, stored
+
+
+async def run_rounds(http, args):
+    failures = 0
+    totals = collections.Counter()
+    for round_number in range(args.rounds):
+        statuses, order_ids, stored = await run_round(http, args.parallel)
+        totals.update(statuses)
+        if len(order_ids) != 1 or stored != 1:
+            failures += 1
+            print(f"round {round_number}: {len(order_ids)} distinct order ids, {stored} stored orders, {dict(statuses)}")
+    print(f"{args.rounds} rounds x {args.parallel} parallel requests: statuses {dict(totals)}")
+    if failures:
+        raise SystemExit(f"{failures} rounds created duplicate orders")
+    print("no duplicate orders")
+
+
+async def main(args):
+    server.connect_database()
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as http:
+            await run_rounds(http, args)
+    else:
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=60) as http:
+                await run_rounds(http, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parallel", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--url", help="Target a running server (e.g. run.py with several workers)")
+    asyncio.run(main(parser.parse_args()))
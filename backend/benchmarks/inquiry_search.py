@@ -0,0 +1,131 @@
+"""Inquiry search latency on a large seeded collection.
+
+Seeds contact inquiries (100k by default) with varied subjects, statuses
+and service interests, creates the declared indexes, then times searches
+through the API against the old approach of fetching a 1000 inquiry page
+and filtering it on the client. Also pages through one search to the end
+and reports the status update round trip.
+
+Usage (run from backend/):
+    python benchmarks/inquiry_search.py --seed 100000 --requests 100
+
+Needs a disposable local mongod (MONGO_URL) and drops BENCH_DB_NAME
+(default mystic_prana_bench); mongomock has no $text.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["PAYMENT_GATEWAY"] = "fake"
+os.environ["EMAIL_TRANSPORT"] = "local"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["ADMIN_TOKEN"] = "bench-admin-token"
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+# Benchmarks seed and drop their database, so never reuse the app's DB_NAME
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "mystic_prana_bench")
+
+import httpx  # noqa: E402
+
+from load_test import drop_bench_database  # noqa: E402
+
+TOPICS = ["reiki", "chakra balancing", "aura cleansing", "meditation", "crystal healing",
+          "past life regression", "tarot reading", "sound bath", "breathwork", "yoga retreat"]
+SERVICES = ["Energy Healing Sessions", "Meditation Classes", "Spiritual Counseling", "Crystal Therapy", None]
+STATUSES = ["new", "new", "new", "in_progress", "responded", "closed"]
+NAMES = ["Asha", "Ravi", "Meera", "John", "Priya", "Karan", "Sara", "Vikram", "Leela", "Dev"]
+
+SEARCHES = {
+    "text": "/api/contact/search?q=reiki&limit=50",
+    "text+status": "/api/contact/search?q=chakra%20balancing&status=new&limit=50",
+    "status": "/api/contact/search?status=in_progress&limit=50",
+    "service+status": "/api/contact/search?service_interest=Crystal%20Therapy&status=new&limit=50",
+}
+
+
+async def seed(server, count: int):
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    batch = []
+    for i in range(count):
+        topic, other = rng.sample(TOPICS, 2)
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "name": f"{rng.choice(NAMES)} {rng.choice(NAMES)}son",
+            "email": f"user{i}@example.com",
+            "phone": None,
+            "subject": f"Question about {topic}",
+            "message": f"Hello, I would like to know more about {topic} and maybe {other}. Inquiry {i}.",
+            "service_interest": rng.choice(SERVICES),
+            "timestamp": now - timedelta(seconds=i * 30),
+            "status": rng.choice(STATUSES),
+        })
+        if len(batch) == 5000:
+            await server.db.contact_inquiries.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await server.db.contact_inquiries.insert_many(batch, ordered=False)
+
+
+async def time_requests(http, method: str, url: str, requests: int, **kwargs):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await http.request(method, url, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    ordered = sorted(latencies)
+    return round(ordered[len(ordered) // 2], 3), round(ordered[int(len(ordered) * 0.95) - 1], 3)
+
+
+async def main(args):
+    import server
+
+    server.connect_database()
+    await drop_bench_database(server)
+    start = time.perf_counter()
+    await seed(server, args.seed)
+    print(f"seeded {args.seed} inquiries in {time.perf_counter() - start:.1f}s")
+
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", headers={"Authorization": "Bearer bench-admin-token"}
+        ) as http:
+            print(f"{'search':<16} {'p50 ms':>8} {'p95 ms':>8}")
+            for name, url in SEARCHES.items():
+                p50, p95 = await time_requests(http, "GET", url, args.requests)
+                print(f"{name:<16} {p50:>8} {p95:>8}")
+            p50, p95 = await time_requests(http, "GET", "/api/contact?limit=1000", args.requests)
+            print(f"{'old list 1000':<16} {p50:>8} {p95:>8}  (client still has to filter)")
+
+            pages, rows, cursor = 0, 0, None
+            start = time.perf_counter()
+            while True:
+                url = "/api/contact/search?q=meditation&limit=500&fields=id,subject"
+                response = await http.get(url + (f"&cursor={cursor}" if cursor else ""))
+                pages, rows = pages + 1, rows + len(response.json())
+                cursor = response.headers.get("x-next-cursor")
+                if not cursor:
+                    break
+            print(f"paged {rows} matches in {pages} pages, {(time.perf_counter() - start) * 1000:.0f} ms")
+
+            inquiry = (await http.get("/api/contact/search?status=new&limit=1")).json()[0]
+            p50, p95 = await time_requests(
+                http, "PATCH", f"/api/contact/{inquiry['id']}/status", args.requests, json={"status": "in_progress"}
+            )
+            print(f"{'status update':<16} {p50:>8} {p95:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=100_000, help="Inquiries to insert")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per search")
+    asyncio.run(main(parser.parse_args()))
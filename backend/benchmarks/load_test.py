@@ -0,0 +1,252 @@
+"""Latency and throughput benchmark for the /api endpoints.
+
+Drives the FastAPI app in-process through httpx's ASGI transport, or over a
+real socket through an in-process uvicorn server, with the fake payment
+gateway and the local email transport. Reports p50/p95/p99 latency and
+requests/sec per endpoint and writes the results as JSON so runs from
+different commits can be diffed.
+
+Usage (run from backend/):
+    python benchmarks/load_test.py --transport asgi --concurrency 20 --requests 500
+    python benchmarks/load_test.py --transport uvicorn --output bench.json
+    python benchmarks/load_test.py --mongomock  # pip install mongomock-motor; cart updates need a real mongod
+
+Without --mongomock, MONGO_URL must point at a local mongod. The benchmark drops
+and reseeds BENCH_DB_NAME (default mystic_prana_bench), never the app's DB_NAME.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ["PAYMENT_GATEWAY"] = "fake"
+os.environ["EMAIL_TRANSPORT"] = "local"
+# Every in-process request comes from the same client address
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+# Benchmarks seed and drop their database, so never reuse the app's DB_NAME
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "mystic_prana_bench")
+
+import httpx  # noqa: E402
+
+ENDPOINTS = ["contact", "services", "cart", "cart-get", "create-order", "verify-payment", "webhook"]
+
+
+def contact_request(i):
+    return "POST", "/api/contact", {"json": {
+        "name": "Bench User",
+        "email": "bench@example.com",
+        "subject": "Benchmark inquiry",
+        "message": f"Benchmark message number {i}",
+    }}
+
+
+def services_request(i):
+    return "GET", "/api/services", {}
+
+
+def make_cart_requests(secret, cookie_name):
+    from sessions import SessionSigner
+
+    # Spread cart traffic over 50 shoppers, each with its own signed session cookie
+    signer = SessionSigner(secret)
+    cookies = [{"Cookie": f"{cookie_name}={signer.sign(f'bench_{n}')}"} for n in range(50)]
+
+    def cart_request(i):
+        return "POST", "/api/cart", {"headers": cookies[i % 50], "json": {
+            "product_id": "1", "name": "Aura Spray", "price": "₹600", "quantity": 1, "image": "",
+        }}
+
+    def cart_get_request(i):
+        return "GET", "/api/cart/current", {"headers": cookies[i % 50]}
+    return cart_request, cart_get_request
+
+
+def order_payload():
+    return {
+        "amount": 60000,
+        "currency": "INR",
+        "customer_info": {"name": "Bench User", "email": "bench@example.com"},
+        "cart_items": [{"product_id": "1", "name": "Aura Spray", "price": "₹600", "quantity": 1, "image": ""}],
+    }
+
+
+def create_order_request(i):
+    return "POST", "/api/create-order", {"json": order_payload()}
+
+
+def make_verify_request(order_ids):
+    def verify_request(i):
+        return "POST", "/api/verify-payment", {"json": {
+            "razorpay_order_id": order_ids[i % len(order_ids)],
+            "razorpay_payment_id": f"pay_bench_{i}",
+            "razorpay_signature": "bench",
+        }}
+    return verify_request
+
+
+def make_webhook_request(order_ids):
+    def webhook_request(i):
+        event = {
+            "event": "payment.captured",
+            "payload": {"payment": {"entity": {"id": f"pay_bench_{i}", "order_id": order_ids[i % len(order_ids)]}}},
+        }
+        return "POST", "/api/webhook", {
+            "content": json.dumps(event),
+            "headers": {"X-Razorpay-Event-Id": f"evt_bench_{uuid.uuid4().hex}"},
+        }
+    return webhook_request
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_endpoint(http, build_request, total, concurrency):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, kwargs = build_request(i)
+            start = time.perf_counter()
+            try:
+                response = await http.request(method, url, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": total,
+        "errors": errors,
+        "requests_per_second": round(total / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+async def seed_orders(http, count):
+    order_ids = []
+    for _ in range(count):
+        response = await http.post("/api/create-order", json=order_payload())
+        response.raise_for_status()
+        order_ids.append(response.json()["id"])
+    return order_ids
+
+
+async def run_suite(http, args, session):
+    order_ids = await seed_orders(http, min(args.requests, 200))
+    cart_request, cart_get_request = make_cart_requests(*session)
+    builders = {
+        "contact": contact_request,
+        "services": services_request,
+        "cart": cart_request,
+        "cart-get": cart_get_request,
+        "create-order": create_order_request,
+        "verify-payment": make_verify_request(order_ids),
+        "webhook": make_webhook_request(order_ids),
+    }
+    results = {}
+    for endpoint in args.endpoints:
+        # Warm up connection pools and caches before measuring
+        await run_endpoint(http, builders[endpoint], min(20, args.requests), args.concurrency)
+        results[endpoint] = await run_endpoint(http, builders[endpoint], args.requests, args.concurrency)
+        print(f"{endpoint:>15}: {results[endpoint]}")
+    return results
+
+
+async def drop_bench_database(server):
+    """Drop the benchmark database, refusing any name that does not end in _bench"""
+    name = os.environ["DB_NAME"]
+    if not name.endswith("_bench"):
+        raise SystemExit(f"Refusing to drop database {name!r}; BENCH_DB_NAME must end in _bench")
+    await server.client.drop_database(name)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def main(args):
+    import server
+
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db.bind(AsyncMongoMockClient()[os.environ["DB_NAME"]])
+    else:
+        server.connect_database()
+        await drop_bench_database(server)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.transport == "asgi":
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as http:
+                results = await run_suite(http, args, (server.SESSION_SECRET, server.SESSION_COOKIE_NAME))
+    else:
+        import uvicorn
+        port = free_port()
+        uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+        serve_task = asyncio.create_task(uvicorn_server.serve())
+        while not uvicorn_server.started:
+            await asyncio.sleep(0.05)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as http:
+                results = await run_suite(http, args, (server.SESSION_SECRET, server.SESSION_COOKIE_NAME))
+        finally:
+            uvicorn_server.should_exit = True
+            await serve_task
+
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "transport": args.transport,
+        "database": "mongomock" if args.mongomock else "mongod",
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Mystic Prana API endpoints")
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--mongomock", action="store_true", help="Use mongomock-motor instead of a local mongod")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    asyncio.run(main(parser.parse_args()))
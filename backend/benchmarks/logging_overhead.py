@@ -0,0 +1,97 @@
+"""Request latency with logging off, written synchronously, and through the queue.
+
+Each mode runs in a fresh interpreter, since logging is configured when
+server.py is imported, with stderr sent to a file so log writes do real I/O:
+
+- off: LOG_LEVEL=WARNING, so info events are dropped before any work
+- sync: LOG_PIPELINE=sync, formatted and written on the event loop thread
+- queue: the default QueueHandler/QueueListener pipeline
+- sampled: the queue pipeline keeping 10% of the per-request events
+
+Usage (run from backend/):
+    python benchmarks/logging_overhead.py --requests 500 --concurrency 20
+    python benchmarks/logging_overhead.py --mongomock  # pip install mongomock-motor
+
+Without --mongomock, MONGO_URL must point at a local mongod. The benchmark drops
+and reseeds BENCH_DB_NAME (default mystic_prana_bench), never the app's DB_NAME.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+MODES = {
+    "off": {"LOG_LEVEL": "WARNING"},
+    "sync": {"LOG_PIPELINE": "sync"},
+    "queue": {"LOG_PIPELINE": "queue"},
+    "sampled": {"LOG_PIPELINE": "queue", "LOG_SAMPLE_RATES": "contact_inquiry.created=0.1,order.created=0.1"},
+}
+ENDPOINTS = ["contact", "create-order", "services"]
+
+
+async def child(args):
+    sys.path.insert(0, str(BACKEND_DIR / "benchmarks"))
+    import load_test  # sets the fake gateway and local email transport
+    import httpx
+    import server
+
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db.bind(AsyncMongoMockClient()[os.environ["DB_NAME"]])
+    else:
+        server.connect_database()
+        await load_test.drop_bench_database(server)
+
+    builders = {
+        "contact": load_test.contact_request,
+        "create-order": load_test.create_order_request,
+        "services": load_test.services_request,
+    }
+    results = {}
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            for endpoint in ENDPOINTS:
+                await load_test.run_endpoint(http, builders[endpoint], min(50, args.requests), args.concurrency)
+                results[endpoint] = await load_test.run_endpoint(
+                    http, builders[endpoint], args.requests, args.concurrency
+                )
+    print(json.dumps(results))
+
+
+def parent(args):
+    print(f"{'mode':<8} {'endpoint':<13} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'log KiB':>8}")
+    for mode, env in MODES.items():
+        with tempfile.NamedTemporaryFile(suffix=".log") as log_file:
+            command = [sys.executable, __file__, "--child", "--requests", str(args.requests),
+                       "--concurrency", str(args.concurrency)] + (["--mongomock"] if args.mongomock else [])
+            output = subprocess.run(
+                command, cwd=BACKEND_DIR, env={**os.environ, **env},
+                stdout=subprocess.PIPE, stderr=log_file, text=True, check=True,
+            ).stdout
+            log_kib = Path(log_file.name).stat().st_size / 1024
+        results = json.loads(output.strip().splitlines()[-1])
+        for endpoint, result in results.items():
+            print(
+                f"{mode:<8} {endpoint:<13} {result['requests_per_second']:>8} {result['p50_ms']:>8} "
+                f"{result['p95_ms']:>8} {result['p99_ms']:>8} {log_kib:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mongomock", action="store_true", help="Use mongomock-motor instead of a local mongod")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.child:
+        asyncio.run(child(parsed))
+    else:
+        parent(parsed)
@@ -0,0 +1,109 @@
+"""Order export throughput for each output format on a large seeded dataset.
+
+Seeds orders (a million by default, one to four line items each), then runs
+scripts/export_orders.py once per format in a fresh interpreter and reports
+rows/sec, output size and the exporter's peak RSS, which should stay flat
+as the dataset grows.
+
+Usage (run from backend/):
+    python benchmarks/order_export.py --orders 1000000
+    python benchmarks/order_export.py --skip-seed --formats csv,jsonl
+
+Needs a disposable local mongod (MONGO_URL) and drops BENCH_DB_NAME
+(default mystic_prana_bench); Parquet needs pyarrow.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+# Benchmarks seed and drop their database, so never reuse the app's DB_NAME
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "mystic_prana_bench")
+
+from load_test import drop_bench_database  # noqa: E402
+
+STATUSES = ["paid"] * 6 + ["created"] * 3 + ["failed"]
+
+
+async def seed(count: int):
+    import server
+
+    server.connect_database()
+    await drop_bench_database(server)
+    products = list(server.DEFAULT_PRODUCTS)
+    rng = random.Random(11)
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    batch = []
+    for i in range(count):
+        items = []
+        for product in rng.sample(products, rng.randint(1, 4)):
+            quantity = rng.randint(1, 3)
+            items.append({**product, "quantity": quantity, "image": "", "unit_price": 60000})
+        created_at = start + timedelta(seconds=i * 31_536_000 / count)
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "order_id": f"order_bench_{i:08d}",
+            "customer_info": {"name": f"Customer {i}", "email": f"customer{i}@example.com",
+                              "phone": "9999999999", "address": "12 Lotus Lane, Rishikesh"},
+            "items": items,
+            "total_amount": sum(item["quantity"] * 60000 for item in items),
+            "currency": "INR",
+            "status": rng.choice(STATUSES),
+            "payment_id": None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        if len(batch) == 10_000:
+            await server.db.orders.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await server.db.orders.insert_many(batch, ordered=False)
+    await server.ensure_indexes()
+
+
+def run_export(fmt: str, directory: str, chunk_size: int) -> dict:
+    output = Path(directory) / f"orders.{fmt}"
+    result = subprocess.run(
+        [sys.executable, "scripts/export_orders.py", "--format", fmt, "--output", str(output),
+         "--chunk-size", str(chunk_size)],
+        cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True, check=True,
+    )
+    stats = json.loads(result.stdout)
+    stats["output_mb"] = round(sum(Path(path).stat().st_size for path in stats["files"]) / 1024 / 1024, 1)
+    return stats
+
+
+def main(args):
+    if not args.skip_seed:
+        start = time.perf_counter()
+        asyncio.run(seed(args.orders))
+        print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+    print(f"{'format':<8} {'orders':>9} {'rows':>9} {'seconds':>8} {'rows/s':>9} {'MB':>7} {'rss MB':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in args.formats.split(","):
+            stats = run_export(fmt, directory, args.chunk_size)
+            print(
+                f"{fmt:<8} {stats['orders']:>9} {stats['rows']:>9} {stats['elapsed_seconds']:>8} "
+                f"{stats['rows_per_second']:>9} {stats['output_mb']:>7} {stats['peak_rss_mb']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000, help="Orders to insert")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the orders from a previous run")
+    parser.add_argument("--formats", default="csv,jsonl,parquet")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    main(parser.parse_args())
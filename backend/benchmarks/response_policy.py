@@ -0,0 +1,122 @@
+"""Bytes on the wire and latency with and without the response policy layer.
+
+Seeds contact inquiries and status checks, then fetches list and report
+endpoints from two builds of the app, with and without
+ResponsePolicyMiddleware. Each build is measured twice: first fetches
+sending Accept-Encoding, then revalidations sending the ETag from a first
+fetch in If-None-Match.
+
+Usage (run from backend/):
+    python benchmarks/response_policy.py --requests 200
+    python benchmarks/response_policy.py --mongomock  # pip install mongomock-motor
+
+Without --mongomock, MONGO_URL must point at a local mongod. The benchmark drops
+and reseeds BENCH_DB_NAME (default mystic_prana_bench), never the app's DB_NAME.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["PAYMENT_GATEWAY"] = "fake"
+os.environ["EMAIL_TRANSPORT"] = "local"
+# Every in-process request comes from the same client address
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["ADMIN_TOKEN"] = "bench-admin-token"
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+# Benchmarks seed and drop their database, so never reuse the app's DB_NAME
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "mystic_prana_bench")
+
+import httpx  # noqa: E402
+
+from load_test import drop_bench_database  # noqa: E402
+
+URLS = ["/api/services", "/api/contact?limit=100", "/api/status?limit=500", "/api/admin/analytics/orders"]
+
+
+async def seed(server, count: int):
+    now = datetime.now(timezone.utc)
+    await server.db.contact_inquiries.insert_many([{
+        "id": str(uuid.uuid4()),
+        "name": "Bench User",
+        "email": "bench@example.com",
+        "phone": None,
+        "subject": "Benchmark inquiry",
+        "message": f"Benchmark message number {i} about energy healing sessions",
+        "service_interest": "Energy Healing Sessions",
+        "timestamp": now - timedelta(seconds=i),
+        "status": "new",
+    } for i in range(count)])
+    await server.db.status_checks.insert_many([{
+        "id": str(uuid.uuid4()),
+        "client_name": f"bench-client-{i % 10}",
+        "timestamp": now - timedelta(seconds=i),
+    } for i in range(count)])
+
+
+async def measure(http, url: str, requests: int, revalidate: bool):
+    headers = {"Accept-Encoding": "gzip, br"}
+    if revalidate:
+        first = await http.get(url, headers=headers)
+        if "etag" in first.headers:
+            headers["If-None-Match"] = first.headers["etag"]
+    latencies, sizes, statuses = [], [], set()
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await http.get(url, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sizes.append(response.num_bytes_downloaded)
+        statuses.add(response.status_code)
+    ordered = sorted(latencies)
+    return {
+        "bytes": round(statistics.fmean(sizes)),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 3),
+        "status": "/".join(str(status) for status in sorted(statuses)),
+    }
+
+
+async def main(args):
+    import server
+
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db.bind(AsyncMongoMockClient()[os.environ["DB_NAME"]])
+    else:
+        server.connect_database()
+        await drop_bench_database(server)
+
+    apps = {"baseline": server.create_app(response_policy=False), "policy": server.create_app(response_policy=True)}
+    async with server.app.router.lifespan_context(server.app):
+        await seed(server, args.seed)
+        if not args.mongomock:
+            # mongomock has no $merge, so the analytics report stays empty there
+            await server.analytics.refresh()
+        print(f"{'url':<32} {'build':<9} {'mode':<11} {'bytes':>8} {'p50 ms':>8} {'p95 ms':>8} {'status':>8}")
+        for url in URLS:
+            for name, app in apps.items():
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(
+                    transport=transport, base_url="http://bench", headers={"Authorization": "Bearer bench-admin-token"}
+                ) as http:
+                    for mode, revalidate in (("fetch", False), ("revalidate", True)):
+                        result = await measure(http, url, args.requests, revalidate)
+                        print(
+                            f"{url:<32} {name:<9} {mode:<11} {result['bytes']:>8} "
+                            f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['status']:>8}"
+                        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per url, build and mode")
+    parser.add_argument("--seed", type=int, default=1000, help="Inquiries and status checks to insert")
+    parser.add_argument("--mongomock", action="store_true", help="Use mongomock-motor instead of a local mongod")
+    asyncio.run(main(parser.parse_args()))
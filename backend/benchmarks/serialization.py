@@ -0,0 +1,89 @@
+"""Measure CPU time and allocations per request for the old and new write/read codecs.
+
+Old write: *Create model -> .dict() -> full model -> .dict() -> prepare_for_mongo (ISO strings).
+New write: validated input -> model_construct -> model_dump (datetimes kept native).
+Old read: BSON dict -> model -> jsonable_encoder -> json.dumps.
+New read: BSON dict -> orjson (lists) / model_dump_json (single documents).
+
+Usage: python benchmarks/serialization.py  (run from backend/, no database needed)
+"""
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "mystic_prana_bench")
+
+from server import ContactInquiry, ContactInquiryCreate  # noqa: E402
+
+PAYLOAD = {
+    "name": "Bench User",
+    "email": "bench@example.com",
+    "phone": "+91 98765 43210",
+    "subject": "Benchmark inquiry",
+    "message": "A reasonably long benchmark message body. " * 10,
+    "service_interest": "Energy Healing Sessions",
+}
+
+
+def prepare_for_mongo(data):
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            data[key] = value.isoformat()
+    return data
+
+
+def old_write():
+    inquiry = ContactInquiryCreate(**PAYLOAD)
+    contact = ContactInquiry(**inquiry.dict())
+    return prepare_for_mongo(contact.dict())
+
+
+def new_write():
+    inquiry = ContactInquiryCreate(**PAYLOAD)
+    return ContactInquiry.model_construct(**inquiry.model_dump()).model_dump()
+
+
+STORED = [
+    {**ContactInquiry(**PAYLOAD).model_dump(), "timestamp": datetime.now(timezone.utc)}
+    for _ in range(100)
+]
+
+
+def old_read():
+    return json.dumps(jsonable_encoder([ContactInquiry(**doc) for doc in STORED])).encode()
+
+
+def new_read():
+    return orjson.dumps(STORED)
+
+
+def measure(function, number):
+    seconds = timeit.timeit(function, number=number) / number
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, peak / 1024
+
+
+def main():
+    for label, old, new, number in (
+        ("write (1 inquiry)", old_write, new_write, 5000),
+        ("read (100 inquiries)", old_read, new_read, 200),
+    ):
+        old_us, old_kib = measure(old, number)
+        new_us, new_kib = measure(new, number)
+        print(f"{label:>22}: old {old_us:8.1f} us {old_kib:7.1f} KiB | new {new_us:8.1f} us {new_kib:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
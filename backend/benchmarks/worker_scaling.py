@@ -0,0 +1,77 @@
+"""Throughput of the API served by 1..N worker processes.
+
+Starts run.py with each worker count, drives the same request mix against
+it over HTTP, and prints requests/sec and p95 latency per worker count.
+
+Usage (run from backend/, needs MONGO_URL and DB_NAME for a disposable mongod):
+    python benchmarks/worker_scaling.py --max-workers 4 --concurrency 64 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR / "benchmarks"))
+
+import httpx  # noqa: E402
+
+from load_test import contact_request, free_port, run_endpoint, services_request  # noqa: E402
+
+ENDPOINTS = {"services": services_request, "contact": contact_request}
+
+
+async def wait_until_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not become ready at {url}")
+
+
+async def measure(workers: int, args):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "run.py", "--workers", str(workers), "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PAYMENT_GATEWAY": "fake", "EMAIL_TRANSPORT": "local",
+             "SESSION_SECRET": os.environ.get("SESSION_SECRET", "bench-session-secret")},
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await wait_until_ready(f"{base_url}/api/")
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as http:
+            results = {}
+            for name in args.endpoints:
+                await run_endpoint(http, ENDPOINTS[name], min(100, args.requests), args.concurrency)
+                results[name] = await run_endpoint(http, ENDPOINTS[name], args.requests, args.concurrency)
+            return results
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def main(args):
+    print(f"{'workers':>7} {'endpoint':>10} {'req/s':>9} {'p95 ms':>8} {'errors':>7}")
+    for workers in range(1, args.max_workers + 1):
+        results = await measure(workers, args)
+        for name, result in results.items():
+            print(f"{workers:>7} {name:>10} {result['requests_per_second']:>9} {result['p95_ms']:>8} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint per worker count")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    asyncio.run(main(parser.parse_args()))
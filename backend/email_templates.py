@@ -0,0 +1,222 @@
+"""Precompiled HTML and plain-text templates for outgoing emails.
+
+Templates use {{ name }} placeholders, which are HTML-escaped on render, and
+{{{ name }}} placeholders for fragments that are already safe HTML. Each
+template is compiled once at import into a Python function, so a render is
+a single join with no template parsing.
+"""
+import html
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+PLACEHOLDER = re.compile(r"\{\{\{\s*(\w+)\s*\}\}\}|\{\{\s*(\w+)\s*\}\}")
+
+
+def _escape(value) -> str:
+    return html.escape(str(value), quote=True)
+
+
+class Template:
+    def __init__(self, source: str, autoescape: bool = True):
+        # Compile the template into a Python function returning one join over
+        # its literal chunks and converted fields
+        pieces = []
+        position = 0
+        escape = "_escape" if autoescape else "str"
+        for match in PLACEHOLDER.finditer(source):
+            raw_name, name = match.groups()
+            pieces.append(repr(source[position:match.start()]))
+            pieces.append(f"str(context[{raw_name!r}])" if raw_name else f"{escape}(context[{name!r}])")
+            position = match.end()
+        pieces.append(repr(source[position:]))
+        code = f"def render(context):\n    return ''.join(({', '.join(pieces)},))\n"
+        namespace = {"_escape": _escape}
+        exec(compile(code, "<email template>", "exec"), namespace)
+        self.render: Callable[[Dict], str] = namespace["render"]
+
+
+def render_rows(template: Template, rows: List[Dict]) -> str:
+    """Render one template per row and join them in a single pass"""
+    return "".join([template.render(row) for row in rows])
+
+
+CONTACT_HTML = Template("""
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #2d5739; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background: linear-gradient(135deg, #2d5739 0%, #4a7c59 100%); color: white; padding: 20px; text-align: center; }
+        .content { background: #f7f3e9; padding: 20px; }
+        .field { margin-bottom: 15px; }
+        .field strong { color: #2d5739; }
+        .footer { background: #2d5739; color: white; padding: 15px; text-align: center; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>New Contact Inquiry - Mystic Prana</h1>
+        </div>
+        <div class="content">
+            <h2>Contact Details:</h2>
+            <div class="field">
+                <strong>Name:</strong> {{ name }}
+            </div>
+            <div class="field">
+                <strong>Email:</strong> {{ email }}
+            </div>
+            {{{ optional_fields_top }}}
+            <div class="field">
+                <strong>Subject:</strong> {{ subject }}
+            </div>
+            {{{ optional_fields_bottom }}}
+            <div class="field">
+                <strong>Message:</strong><br>
+                {{{ message_html }}}
+            </div>
+            <div class="field">
+                <strong>Submitted:</strong> {{ submitted }}
+            </div>
+            <div class="field">
+                <strong>Inquiry ID:</strong> {{ id }}
+            </div>
+        </div>
+        <div class="footer">
+            <p>This inquiry has been automatically stored in your database.</p>
+            <p>Please respond to {{ email }} directly.</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+CONTACT_FIELD_HTML = Template('<div class="field"><strong>{{ label }}:</strong> {{ value }}</div>')
+
+CONTACT_TEXT = Template("""New Contact Inquiry - Mystic Prana
+
+Name: {{ name }}
+Email: {{ email }}
+Phone: {{ phone }}
+Subject: {{ subject }}
+Service Interest: {{ service_interest }}
+
+Message:
+{{ message }}
+
+Submitted: {{ submitted }}
+Inquiry ID: {{ id }}
+
+Please respond to {{ email }} directly.
+""", autoescape=False)
+
+ORDER_HTML = Template("""
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #2d5739; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background: linear-gradient(135deg, #2d5739 0%, #4a7c59 100%); color: white; padding: 20px; text-align: center; }
+        .content { background: #f7f3e9; padding: 20px; }
+        .order-table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+        .order-table th { background: #2d5739; color: white; padding: 10px; text-align: left; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Order Confirmation - Mystic Prana</h1>
+        </div>
+        <div class="content">
+            <h2>Thank you for your order!</h2>
+            <p><strong>Order ID:</strong> {{ order_id }}</p>
+            <p><strong>Customer:</strong> {{ customer_name }}</p>
+
+            <table class="order-table">
+                <thead>
+                    <tr>
+                        <th>Product</th>
+                        <th>Quantity</th>
+                        <th>Price</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {{{ items_html }}}
+                </tbody>
+            </table>
+
+            <p><strong>Total Amount:</strong> ₹{{ total }}</p>
+            <p><strong>Status:</strong> {{ status }}</p>
+
+            <p>We'll process your order and send you tracking information soon.</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+ORDER_ITEM_HTML = Template("""
+<tr>
+    <td style="padding: 10px; border-bottom: 1px solid #eee;">{{ name }}</td>
+    <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: center;">{{ quantity }}</td>
+    <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: right;">{{ price }}</td>
+</tr>
+""")
+
+ORDER_TEXT = Template("""Order Confirmation - Mystic Prana
+
+Thank you for your order!
+Order ID: {{ order_id }}
+Customer: {{ customer_name }}
+
+{{ items_text }}
+
+Total Amount: ₹{{ total }}
+Status: {{ status }}
+
+We'll process your order and send you tracking information soon.
+""", autoescape=False)
+
+ORDER_ITEM_TEXT = Template("- {{ name }} x {{ quantity }} @ {{ price }}\n", autoescape=False)
+
+
+def format_submitted(timestamp: datetime) -> str:
+    return timestamp.strftime('%B %d, %Y at %I:%M %p UTC')
+
+
+def render_contact_email(inquiry) -> Tuple[str, str, str]:
+    """Return (subject, html, text) for a contact inquiry notification"""
+    context = {
+        "id": inquiry.id,
+        "name": inquiry.name,
+        "email": inquiry.email,
+        "phone": inquiry.phone or "Not provided",
+        "subject": inquiry.subject,
+        "service_interest": inquiry.service_interest or "General inquiry",
+        "message": inquiry.message,
+        "message_html": _escape(inquiry.message).replace("\n", "<br>"),
+        "submitted": format_submitted(inquiry.timestamp),
+        "optional_fields_top": CONTACT_FIELD_HTML.render({"label": "Phone", "value": inquiry.phone}) if inquiry.phone else "",
+        "optional_fields_bottom": (
+            CONTACT_FIELD_HTML.render({"label": "Service Interest", "value": inquiry.service_interest})
+            if inquiry.service_interest else ""
+        ),
+    }
+    subject = f"New Contact Inquiry from {inquiry.name} - {inquiry.subject}"
+    return subject, CONTACT_HTML.render(context), CONTACT_TEXT.render(context)
+
+
+def render_order_confirmation_email(order_data: Dict) -> Tuple[str, str, str]:
+    """Return (subject, html, text) for an order confirmation"""
+    items = order_data.get("items", [])
+    context = {
+        "order_id": order_data["order_id"],
+        "customer_name": order_data.get("customer_info", {}).get("name", "N/A"),
+        "items_html": render_rows(ORDER_ITEM_HTML, items),
+        "items_text": render_rows(ORDER_ITEM_TEXT, items),
+        "total": order_data["total_amount"] / 100,
+        "status": order_data["status"].title(),
+    }
+    subject = f"Order Confirmation - {order_data['order_id']} - Mystic Prana"
+    return subject, ORDER_HTML.render(context), ORDER_TEXT.render(context)
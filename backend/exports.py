@@ -0,0 +1,313 @@
+"""Streaming order exports as CSV, JSONL or Parquet.
+
+OrderExport reads db.orders through one Motor cursor in (created_at,
+order_id) order, with a projection and optional date range and status
+filters, and flattens every order into one row per line item with the
+order and customer columns repeated. Orders are encoded a chunk at a time,
+so memory stays flat however many orders match.
+
+A position is the (created_at, order_id) of the last order written.
+export_to_file() saves it in a checkpoint file after every chunk (every
+part file for Parquet) so an interrupted export resumes where it stopped;
+the API takes the order_id of the last complete order received as `after`.
+
+Parquet needs pyarrow, imported only when a Parquet export starts
+(pip install pyarrow, or install requirements-dev.txt).
+"""
+import csv
+import io
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import orjson
+
+FORMATS = ("csv", "jsonl", "parquet")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+ORDER_COLUMNS = ["order_id", "status", "currency", "total_amount", "payment_id", "created_at", "updated_at"]
+CUSTOMER_FIELDS = ["name", "email", "phone", "address"]
+ITEM_FIELDS = ["product_id", "name", "quantity", "unit_price", "price"]
+COLUMNS = (
+    ORDER_COLUMNS
+    + [f"customer_{field}" for field in CUSTOMER_FIELDS]
+    + ["item_index"] + [f"item_{field}" for field in ITEM_FIELDS]
+)
+PROJECTION = {"_id": 0, "customer_info": 1, "items": 1, **{column: 1 for column in ORDER_COLUMNS}}
+
+
+def flatten_order(order: dict) -> List[dict]:
+    """One row per line item; an order without items still gets one row"""
+    base = {column: order.get(column) for column in ORDER_COLUMNS}
+    customer = order.get("customer_info") or {}
+    base.update({f"customer_{field}": customer.get(field) for field in CUSTOMER_FIELDS})
+    rows = []
+    for index, item in enumerate(order.get("items") or [{}]):
+        row = dict(base)
+        row["item_index"] = index if item else None
+        row.update({f"item_{field}": item.get(field) for field in ITEM_FIELDS})
+        rows.append(row)
+    return rows
+
+
+def position_query(position: Optional[dict]) -> dict:
+    if not position:
+        return {}
+    return {"$or": [
+        {"created_at": {"$gt": position["created_at"]}},
+        {"created_at": position["created_at"], "order_id": {"$gt": position["order_id"]}},
+    ]}
+
+
+def encode_position(position: dict) -> dict:
+    return {"created_at": position["created_at"].isoformat(), "order_id": position["order_id"]}
+
+
+def decode_position(position: dict) -> dict:
+    return {"created_at": datetime.fromisoformat(position["created_at"]), "order_id": position["order_id"]}
+
+
+class CsvEncoder:
+    def __init__(self, header: bool = True):
+        self.header = header
+
+    def encode(self, rows: List[dict]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=COLUMNS, extrasaction="ignore")
+        if self.header:
+            writer.writeheader()
+            self.header = False
+        for row in rows:
+            writer.writerow({key: value.isoformat() if isinstance(value, datetime) else value
+                             for key, value in row.items()})
+        return buffer.getvalue().encode()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class JsonlEncoder:
+    def encode(self, rows: List[dict]) -> bytes:
+        return b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+    def close(self) -> bytes:
+        return b""
+
+
+class ChunkSink:
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.pieces: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.pieces.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet records absolute offsets in its footer, so keep counting across drains
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.pieces = b"".join(self.pieces), []
+        return data
+
+
+class ParquetEncoder:
+    """Writes one row group per chunk; the file is complete once close() has been written"""
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        types = {"total_amount": pa.int64(), "item_index": pa.int32(), "item_quantity": pa.int32(),
+                 "item_unit_price": pa.int64(), "created_at": pa.timestamp("ms", tz="UTC"),
+                 "updated_at": pa.timestamp("ms", tz="UTC")}
+        self.schema = pa.schema([(column, types.get(column, pa.string())) for column in COLUMNS])
+        self.sink = ChunkSink()
+        self.writer = pq.ParquetWriter(pa.PythonFile(self.sink, mode="w"), self.schema, compression="zstd")
+
+    def encode(self, rows: List[dict]) -> bytes:
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+        return self.sink.drain()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+def create_encoder(fmt: str, header: bool = True):
+    if fmt == "csv":
+        return CsvEncoder(header=header)
+    if fmt == "jsonl":
+        return JsonlEncoder()
+    if fmt == "parquet":
+        return ParquetEncoder()
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+class OrderExport:
+    def __init__(
+        self,
+        orders,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        statuses: Optional[List[str]] = None,
+        chunk_size: int = 5000,
+    ):
+        self.orders = orders
+        self.start = start
+        self.end = end
+        self.statuses = statuses
+        self.chunk_size = chunk_size
+
+    def query(self, position: Optional[dict] = None) -> dict:
+        query = {}
+        if self.start or self.end:
+            query["created_at"] = {}
+            if self.start:
+                query["created_at"]["$gte"] = self.start
+            if self.end:
+                query["created_at"]["$lt"] = self.end
+        if self.statuses:
+            query["status"] = {"$in": self.statuses}
+        after = position_query(position)
+        return {"$and": [query, after]} if after else query
+
+    async def position_of(self, order_id: str) -> Optional[dict]:
+        return await self.orders.find_one({"order_id": order_id}, {"_id": 0, "created_at": 1, "order_id": 1})
+
+    async def chunks(self, position: Optional[dict] = None) -> AsyncIterator[tuple]:
+        """Yield (rows, orders, position after the chunk) for each chunk of orders"""
+        cursor = self.orders.find(self.query(position), PROJECTION)
+        cursor = cursor.sort([("created_at", 1), ("order_id", 1)]).batch_size(self.chunk_size)
+        rows, count = [], 0
+        async for order in cursor:
+            rows.extend(flatten_order(order))
+            count += 1
+            if count >= self.chunk_size:
+                yield rows, count, {"created_at": order["created_at"], "order_id": order["order_id"]}
+                rows, count = [], 0
+        if count:
+            yield rows, count, {"created_at": order["created_at"], "order_id": order["order_id"]}
+
+    async def stream(self, fmt: str, position: Optional[dict] = None) -> AsyncIterator[bytes]:
+        """Encoded export bytes, one piece per chunk"""
+        encoder = create_encoder(fmt)
+        async for rows, _, _ in self.chunks(position):
+            data = encoder.encode(rows)
+            if data:
+                yield data
+        tail = encoder.close()
+        if tail:
+            yield tail
+
+
+def part_path(path: Path, part: int) -> Path:
+    return path if part == 0 else path.with_name(f"{path.stem}.part{part}{path.suffix}")
+
+
+def save_checkpoint(path: Path, checkpoint: dict):
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_bytes(orjson.dumps(checkpoint))
+    os.replace(temporary, path)
+
+
+async def export_to_file(
+    export: OrderExport,
+    fmt: str,
+    path: Path,
+    resume: bool = False,
+    parquet_part_chunks: int = 20,
+) -> Dict[str, float]:
+    """Write an export to path, checkpointing after every chunk that is safely on disk
+
+    CSV and JSONL are appended to and truncated back to the last checkpoint
+    on resume. A Parquet file is only readable once closed, so Parquet is
+    written as part files of parquet_part_chunks chunks, checkpointed as each
+    part closes.
+    """
+    checkpoint_path = path.with_name(path.name + ".checkpoint.json")
+    filters = {
+        "format": fmt,
+        "start": export.start.isoformat() if export.start else None,
+        "end": export.end.isoformat() if export.end else None,
+        "statuses": export.statuses,
+    }
+    if checkpoint_path.exists():
+        if not resume:
+            raise FileExistsError(f"{checkpoint_path} exists; resume the export or delete it")
+        checkpoint = orjson.loads(checkpoint_path.read_bytes())
+        if checkpoint["filters"] != filters:
+            raise ValueError("The checkpoint was written by an export with different options")
+    else:
+        checkpoint = {"filters": filters, "position": None, "orders": 0, "rows": 0, "bytes": 0, "part": 0}
+    position = decode_position(checkpoint["position"]) if checkpoint["position"] else None
+
+    start = time.perf_counter()
+    rows_before, orders_before = checkpoint["rows"], checkpoint["orders"]
+    if fmt == "parquet":
+        encoder, output, chunks_in_part = None, None, 0
+        async for rows, orders, position in export.chunks(position):
+            if encoder is None:
+                encoder = create_encoder(fmt)
+                output = open(part_path(path, checkpoint["part"]), "wb")
+            output.write(encoder.encode(rows))
+            checkpoint["rows"] += len(rows)
+            checkpoint["orders"] += orders
+            chunks_in_part += 1
+            if chunks_in_part >= parquet_part_chunks:
+                output.write(encoder.close())
+                output.close()
+                encoder, chunks_in_part = None, 0
+                checkpoint.update(position=encode_position(position), part=checkpoint["part"] + 1)
+                save_checkpoint(checkpoint_path, checkpoint)
+        if encoder is not None:
+            output.write(encoder.close())
+            output.close()
+            checkpoint.update(position=encode_position(position), part=checkpoint["part"] + 1)
+    else:
+        mode = "r+b" if path.exists() else "wb"
+        with open(path, mode) as output:
+            # Drop anything written after the last checkpoint
+            output.truncate(checkpoint["bytes"])
+            output.seek(checkpoint["bytes"])
+            encoder = create_encoder(fmt, header=checkpoint["bytes"] == 0)
+            async for rows, orders, position in export.chunks(position):
+                output.write(encoder.encode(rows))
+                output.flush()
+                os.fsync(output.fileno())
+                checkpoint["rows"] += len(rows)
+                checkpoint["orders"] += orders
+                checkpoint.update(position=encode_position(position), bytes=output.tell())
+                save_checkpoint(checkpoint_path, checkpoint)
+    # A finished export leaves no checkpoint behind
+    checkpoint_path.unlink(missing_ok=True)
+    stats = export_stats(checkpoint["rows"] - rows_before, checkpoint["orders"] - orders_before,
+                         time.perf_counter() - start)
+    stats["files"] = [str(part_path(path, part)) for part in range(checkpoint["part"])] if fmt == "parquet" else [str(path)]
+    return stats
+
+
+def export_stats(rows: int, orders: int, elapsed: float) -> Dict[str, float]:
+    return {
+        "orders": orders,
+        "rows": rows,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else 0.0,
+    }
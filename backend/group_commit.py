@@ -0,0 +1,70 @@
+"""Group-commit writer batching concurrent inserts into insert_many calls.
+
+Callers await insert(); their documents are gathered per collection and
+written with one unordered insert_many once the batch reaches max_batch
+documents or max_delay seconds have passed since the first pending insert.
+Each caller's await resolves when its own document has been written, or
+raises if that document (or the batch's write concern) failed.
+"""
+import asyncio
+from typing import List, Optional, Set, Tuple
+
+from pymongo.errors import BulkWriteError
+
+
+class GroupCommitError(Exception):
+    pass
+
+
+class GroupCommitWriter:
+    def __init__(self, collection, max_batch: int = 100, max_delay: float = 0.005):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def insert(self, document: dict):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]):
+        failures = {}
+        try:
+            await self.collection.insert_many([document for document, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            if e.details.get("writeConcernErrors"):
+                failures = {index: GroupCommitError(str(e)) for index in range(len(batch))}
+            for error in e.details.get("writeErrors", []):
+                failures[error["index"]] = GroupCommitError(error.get("errmsg", "Write failed"))
+        except Exception as e:
+            failures = {index: e for index in range(len(batch))}
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failures:
+                future.set_exception(failures[index])
+            else:
+                future.set_result(None)
+
+    async def close(self):
+        """Flush anything pending and wait for in-flight writes"""
+        self._flush()
+        await asyncio.gather(*self._flushes, return_exceptions=True)
@@ -0,0 +1,114 @@
+"""Idempotency keys for endpoints with side effects.
+
+The first request with a key inserts an in-progress record, keyed by scope
+and key, into a Mongo collection and runs the operation. Its result is then
+stored on the record. Duplicates, from this or any other process, wait for
+that record to complete and get the stored result instead of running the
+operation again. A key reused with a different request body is rejected.
+
+A failed operation deletes its record so the client can retry with the same
+key. If the owning process dies mid-operation, another request takes the
+record over once its lease expires.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different fingerprint"""
+
+
+class IdempotencyKeyInProgress(Exception):
+    """The original request is still running after the wait timeout"""
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        collection,
+        lease: float = 60.0,
+        wait_timeout: float = 30.0,
+        poll_interval: float = 0.1,
+    ):
+        self.collection = collection
+        self.lease = lease
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        # Completion signals for operations owned by this process, so local
+        # duplicates wake immediately instead of on the next poll
+        self._done: Dict[str, asyncio.Event] = {}
+
+    async def run(
+        self, scope: str, key: str, fingerprint: str, operation: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Return (result, replayed), running operation at most once per key"""
+        record_id = f"{scope}:{key}"
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            owner = await self._acquire(record_id, fingerprint)
+            if owner:
+                return await self._execute(record_id, owner, operation), False
+
+            record = await self.collection.find_one({"_id": record_id})
+            if record is None:
+                # The owner failed and released the key; try to take it
+                continue
+            if record["fingerprint"] != fingerprint:
+                raise IdempotencyKeyReused(f"Idempotency key {key} was used with a different request")
+            if record["state"] == "completed":
+                return record["response"], True
+
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise IdempotencyKeyInProgress(f"Request with idempotency key {key} is still in progress")
+            event = self._done.get(record_id)
+            if event:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(remaining, self.poll_interval))
+
+    async def _acquire(self, record_id: str, fingerprint: str):
+        """Insert the record, or take over one whose owner's lease expired; return the owner token"""
+        now = datetime.now(timezone.utc)
+        owner = str(uuid.uuid4())
+        try:
+            await self.collection.insert_one({
+                "_id": record_id,
+                "fingerprint": fingerprint,
+                "state": "in_progress",
+                "owner": owner,
+                "locked_until": now + timedelta(seconds=self.lease),
+                "created_at": now,
+            })
+            return owner
+        except DuplicateKeyError:
+            pass
+        taken = await self.collection.find_one_and_update(
+            {"_id": record_id, "fingerprint": fingerprint, "state": "in_progress", "locked_until": {"$lt": now}},
+            {"$set": {"owner": owner, "locked_until": now + timedelta(seconds=self.lease)}},
+        )
+        return owner if taken else None
+
+    async def _execute(self, record_id: str, owner: str, operation):
+        event = self._done.setdefault(record_id, asyncio.Event())
+        try:
+            try:
+                response = await operation()
+            except BaseException:
+                await self.collection.delete_one({"_id": record_id, "owner": owner})
+                raise
+            await self.collection.update_one(
+                {"_id": record_id, "owner": owner},
+                {"$set": {"state": "completed", "response": response, "completed_at": datetime.now(timezone.utc)}},
+            )
+            return response
+        finally:
+            event.set()
+            self._done.pop(record_id, None)
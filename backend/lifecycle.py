@@ -0,0 +1,214 @@
+"""Data lifecycle: bounded status check storage and archival of stale orders.
+
+- Abandoned carts expire through the TTL index on carts.updated_at (see
+  INDEX_SPECS in server.py).
+- status_checks is created as a time-series collection that drops
+  measurements past a retention period, or as a capped collection of a
+  fixed size. An existing plain collection is left alone and reported;
+  scripts/migrate_lifecycle.py converts it.
+- OrderArchiver moves orders still in "created" past a cutoff into an
+  archive collection or gzip-compressed JSONL files, in batches, pausing
+  between batches so it uses at most duty_cycle of the time.
+
+Orders are written to the archive before they are deleted, and only orders
+still in "created" are deleted. Orders that were paid or failed in between
+stay live and their archive copies are discarded: removed from the archive
+collection, or followed by a {"order_id": ..., "discarded": true} line in
+the JSONL file.
+"""
+import asyncio
+import gzip
+import logging
+import os
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import orjson
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+
+async def collection_options(db, name: str) -> Optional[dict]:
+    """Creation options of a collection, or None when it does not exist"""
+    async for info in await db.list_collections(filter={"name": name}):
+        return info
+    return None
+
+
+async def ensure_status_checks_collection(
+    db,
+    storage: str = "timeseries",
+    retention_seconds: int = 30 * 24 * 3600,
+    capped_size_bytes: int = 64 * 1024 * 1024,
+    name: str = "status_checks",
+) -> str:
+    """Create the status check collection with bounded storage; return its kind"""
+    info = await collection_options(db, name)
+    if info is not None:
+        if info.get("type") == "timeseries":
+            return "timeseries"
+        if info.get("options", {}).get("capped"):
+            return "capped"
+        logger.warning(f"{name} is a plain collection and grows without bound; run scripts/migrate_lifecycle.py")
+        return "plain"
+    if storage == "timeseries":
+        await db.create_collection(
+            name,
+            timeseries={"timeField": "timestamp", "metaField": "client_name", "granularity": "seconds"},
+            expireAfterSeconds=retention_seconds,
+        )
+    elif storage == "capped":
+        await db.create_collection(name, capped=True, size=capped_size_bytes)
+    else:
+        return "plain"
+    return storage
+
+
+async def collection_sizes(db, names: List[str]) -> Dict[str, dict]:
+    """Document count, data size and index size of each collection"""
+    sizes = {}
+    for name in names:
+        try:
+            stats = await db[name].aggregate([{"$collStats": {"storageStats": {}}}]).to_list(1)
+        except Exception as e:
+            sizes[name] = {"error": str(e)}
+            continue
+        storage = stats[0]["storageStats"] if stats else {}
+        sizes[name] = {
+            "count": storage.get("count", 0),
+            "size_bytes": storage.get("size", 0),
+            "storage_bytes": storage.get("storageSize", 0),
+            "index_bytes": storage.get("totalIndexSize", 0),
+            "capped": storage.get("capped", False),
+        }
+    return sizes
+
+
+class CollectionArchiveSink:
+    """Archives orders into a Mongo collection, keyed by order_id so reruns are idempotent"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def write(self, orders: List[dict]):
+        await self.collection.bulk_write(
+            [ReplaceOne({"order_id": order["order_id"]}, order, upsert=True) for order in orders],
+            ordered=False
+        )
+
+    async def discard(self, order_ids: List[str]):
+        await self.collection.delete_many({"order_id": {"$in": order_ids}})
+
+    async def close(self):
+        pass
+
+
+class JsonlArchiveSink:
+    """Archives orders into one gzip-compressed JSONL file per run, fsynced after every batch"""
+
+    def __init__(self, directory: str, compresslevel: int = 6):
+        self.directory = Path(directory)
+        self.compresslevel = compresslevel
+        self.path: Optional[Path] = None
+        self._raw = None
+        self._file = None
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self.path = self.directory / f"orders-{stamp}-{os.getpid()}.jsonl.gz"
+        self._raw = open(self.path, "ab")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="ab", compresslevel=self.compresslevel)
+
+    def _append(self, records: List[dict]):
+        if self._file is None:
+            self._open()
+        self._file.write(b"".join(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in records))
+        # Sync flush so the batch is on disk before its orders are deleted
+        self._file.flush(zlib.Z_SYNC_FLUSH)
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    async def write(self, orders: List[dict]):
+        await asyncio.to_thread(self._append, orders)
+
+    async def discard(self, order_ids: List[str]):
+        await asyncio.to_thread(self._append, [{"order_id": order_id, "discarded": True} for order_id in order_ids])
+
+    async def close(self):
+        if self._file is not None:
+            await asyncio.to_thread(self._close)
+
+    def _close(self):
+        self._file.close()
+        self._raw.close()
+        self._file = self._raw = None
+
+
+class OrderArchiver:
+    def __init__(
+        self,
+        orders,
+        sink,
+        batch_size: int = 500,
+        duty_cycle: float = 0.2,
+        min_pause: float = 0.05,
+        on_archived: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    ):
+        self.orders = orders
+        self.sink = sink
+        self.batch_size = batch_size
+        self.duty_cycle = duty_cycle
+        self.min_pause = min_pause
+        # Called with each batch of orders removed from the live collection
+        self.on_archived = on_archived
+
+    def pause_after(self, elapsed: float) -> float:
+        """Sleep long enough that work takes duty_cycle of the wall time"""
+        return max(self.min_pause, elapsed * (1 / self.duty_cycle - 1))
+
+    async def archive_batch(self, cutoff: datetime, stats: Dict[str, float]) -> int:
+        query = {"status": "created", "created_at": {"$lt": cutoff}}
+        batch = await self.orders.find(query).sort("created_at", 1).limit(self.batch_size).to_list(self.batch_size)
+        if not batch:
+            return 0
+        for order in batch:
+            order.pop("_id", None)
+        order_ids = [order["order_id"] for order in batch]
+        await self.sink.write(batch)
+        result = await self.orders.delete_many({**query, "order_id": {"$in": order_ids}})
+        remaining = []
+        if result.deleted_count < len(batch):
+            # Paid or failed since the batch was read, so they stay live
+            remaining = await self.orders.distinct("order_id", {"order_id": {"$in": order_ids}})
+            await self.sink.discard(remaining)
+            stats["discarded"] += len(remaining)
+        stats["archived"] += result.deleted_count
+        if self.on_archived:
+            await self.on_archived([order for order in batch if order["order_id"] not in remaining])
+        return len(batch)
+
+    async def run(self, cutoff: datetime, max_batches: Optional[int] = None) -> Dict[str, float]:
+        """Archive orders in "created" older than cutoff, oldest first"""
+        stats = {"archived": 0, "discarded": 0, "batches": 0, "paused_seconds": 0.0}
+        start = time.perf_counter()
+        try:
+            while max_batches is None or stats["batches"] < max_batches:
+                batch_start = time.perf_counter()
+                if not await self.archive_batch(cutoff, stats):
+                    break
+                stats["batches"] += 1
+                pause = self.pause_after(time.perf_counter() - batch_start)
+                stats["paused_seconds"] += pause
+                await asyncio.sleep(pause)
+        finally:
+            await self.sink.close()
+        elapsed = time.perf_counter() - start
+        stats["paused_seconds"] = round(stats["paused_seconds"], 3)
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["orders_per_second"] = round(stats["archived"] / elapsed, 1) if elapsed else 0.0
+        return stats
@@ -0,0 +1,317 @@
+"""Dependency-free Prometheus metrics and per-request timing.
+
+Provides counters, gauges and histograms rendered in the Prometheus text
+format, an ASGI middleware recording request latency by route and status
+and adding a Server-Timing header, proxies that time every awaited call on
+Motor collections and external clients, and a monitor sampling event-loop
+lag and default thread-pool queue depth.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (system, seconds) pairs recorded while handling the current request
+request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in list(zip(labelnames, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self.values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts followed by the running sum and count
+            series = self.series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self.series.items()]
+        lines = self.header()
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, (('le', bound),))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and status", ("method", "route", "status")
+))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled"
+))
+call_duration = registry.register(Histogram(
+    "external_call_duration_seconds", "Latency of Mongo and third-party calls", ("system", "operation", "outcome")
+))
+event_loop_lag = registry.register(Gauge(
+    "event_loop_lag_seconds", "Delay between a scheduled wake-up and when the event loop ran it"
+))
+thread_pool_queue_depth = registry.register(Gauge(
+    "thread_pool_queue_depth", "Work items waiting in the default thread pool executor"
+))
+
+
+@contextmanager
+def timer(system: str, operation: str):
+    """Time a block into the call histogram and the current request's Server-Timing"""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        call_duration.observe(elapsed, system=system, operation=operation, outcome=outcome)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((system, elapsed))
+
+
+class Instrumented:
+    """Proxy that times the listed coroutine methods of a client object"""
+
+    def __init__(self, target, system: str, methods: Iterable[str], prefix: str = ""):
+        self._target = target
+        self._system = system
+        self._methods = frozenset(methods)
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in self._methods:
+            return attr
+
+        async def timed(*args, **kwargs):
+            with timer(self._system, f"{self._prefix}{name}"):
+                return await attr(*args, **kwargs)
+        return timed
+
+
+class InstrumentedCursor:
+    """Wraps a Motor cursor so to_list and explain are timed and chaining keeps the wrapper"""
+
+    def __init__(self, cursor, operation: str):
+        self._cursor = cursor
+        self._operation = operation
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name in ("to_list", "explain"):
+            async def timed(*args, **kwargs):
+                with timer("mongo", f"{self._operation}.{name}"):
+                    return await attr(*args, **kwargs)
+            return timed
+        if callable(attr):
+            def chained(*args, **kwargs):
+                result = attr(*args, **kwargs)
+                return self if result is self._cursor else result
+            return chained
+        return attr
+
+    def __aiter__(self):
+        return self._cursor.__aiter__()
+
+
+COLLECTION_METHODS = (
+    "insert_one", "insert_many", "find_one", "find_one_and_update", "find_one_and_delete",
+    "update_one", "update_many", "delete_one", "delete_many", "replace_one", "bulk_write",
+    "count_documents", "estimated_document_count", "create_index", "distinct", "drop",
+)
+
+
+class InstrumentedCollection(Instrumented):
+    """Collection proxy resolved through its database on every call, so it can
+    be created before the database is bound"""
+
+    def __init__(self, database: "InstrumentedDatabase", name: str):
+        self._database = database
+        self._name = name
+        self._system = "mongo"
+        self._methods = frozenset(COLLECTION_METHODS)
+        self._prefix = f"{name}."
+
+    @property
+    def _target(self):
+        return self._database.database[self._name]
+
+    def find(self, *args, **kwargs):
+        return InstrumentedCursor(self._target.find(*args, **kwargs), f"{self._name}.find")
+
+    def aggregate(self, *args, **kwargs):
+        return InstrumentedCursor(self._target.aggregate(*args, **kwargs), f"{self._name}.aggregate")
+
+
+class InstrumentedDatabase:
+    """Proxy over a Motor database returning instrumented collections
+
+    The database may be bound after construction, which lets each worker
+    process create its Motor client at startup rather than at import.
+    """
+
+    def __init__(self, database=None):
+        self._database = database
+        self._collections: Dict[str, InstrumentedCollection] = {}
+
+    def bind(self, database):
+        self._database = database
+
+    @property
+    def bound(self) -> bool:
+        return self._database is not None
+
+    @property
+    def database(self):
+        if self._database is None:
+            raise RuntimeError("Database is not connected; call connect_database() first")
+        return self._database
+
+    def __getitem__(self, name: str) -> InstrumentedCollection:
+        if name not in self._collections:
+            self._collections[name] = InstrumentedCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            return getattr(self.database, name)
+        return self[name]
+
+
+class MetricsMiddleware:
+    """Records request latency by route and status and adds a Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: List[Tuple[str, float]] = []
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                totals: Dict[str, float] = {}
+                for system, seconds in timings:
+                    totals[system] = totals.get(system, 0.0) + seconds
+                entries = [f"{system};dur={seconds * 1000:.2f}" for system, seconds in totals.items()]
+                entries.append(f"total;dur={(time.perf_counter() - start) * 1000:.2f}")
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", ", ".join(entries).encode())]
+            await send(message)
+
+        http_requests_in_progress.inc(1)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            http_requests_in_progress.inc(-1)
+            endpoint = scope.get("endpoint")
+            route = getattr(endpoint, "__name__", "unmatched")
+            http_request_duration.observe(
+                time.perf_counter() - start, method=scope["method"], route=route, status=status["code"]
+            )
+            request_timings.reset(token)
+
+
+async def monitor_event_loop(interval: float = 0.5):
+    """Sample event-loop lag and default executor queue depth until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.set(max(0.0, loop.time() - start - interval))
+        executor = getattr(loop, "_default_executor", None)
+        work_queue = getattr(executor, "_work_queue", None)
+        thread_pool_queue_depth.set(work_queue.qsize() if work_queue is not None else 0)
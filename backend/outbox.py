@@ -0,0 +1,228 @@
+"""Durable email outbox drained by a background worker pool.
+
+Request handlers enqueue email jobs into a Mongo collection and return
+immediately. Workers claim due jobs with an atomic lease, send them in
+batches through a pluggable transport under a shared rate limit, retry
+failures with exponential backoff and dead-letter jobs that keep failing.
+Transports take a permit from the rate limiter for every API request they
+make, including per-message fallbacks.
+
+The rate limiter is per process. With several worker processes, pass the
+shared TaskLeases: only the process holding the outbox lease sends, the
+others stand by and take over when its lease expires.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from structured_logging import log_event
+
+logger = logging.getLogger(__name__)
+
+
+class ResendTransport:
+    """Sends through the Resend batch API from a worker thread"""
+
+    def __init__(self, api_key: str):
+        import resend
+        resend.api_key = api_key
+        self.resend = resend
+
+    async def send_batch(self, messages: List[dict], rate_limiter: "RateLimiter") -> List[Optional[Exception]]:
+        if len(messages) == 1:
+            return [await self._send_one(messages[0], rate_limiter)]
+        try:
+            await rate_limiter.acquire()
+            await asyncio.to_thread(self.resend.Batch.send, messages)
+            return [None] * len(messages)
+        except Exception:
+            # The batch endpoint is all-or-nothing; fall back to individual sends
+            # so one bad address does not fail the rest
+            return [await self._send_one(message, rate_limiter) for message in messages]
+
+    async def _send_one(self, message: dict, rate_limiter: "RateLimiter") -> Optional[Exception]:
+        try:
+            await rate_limiter.acquire()
+            await asyncio.to_thread(self.resend.Emails.send, message)
+            return None
+        except Exception as e:
+            return e
+
+
+class LocalTransport:
+    """Records messages in memory instead of sending them"""
+
+    def __init__(self, fail_times: int = 0):
+        self.sent: List[dict] = []
+        self.fail_times = fail_times
+
+    async def send_batch(self, messages: List[dict], rate_limiter: "RateLimiter") -> List[Optional[Exception]]:
+        # One permit per call, like one batch request
+        await rate_limiter.acquire()
+        results = []
+        for message in messages:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                results.append(RuntimeError("Simulated transport failure"))
+                continue
+            self.sent.append(message)
+            log_event(logger, "email.delivered_locally", to=message.get("to"), subject=message.get("subject"))
+            results.append(None)
+        return results
+
+
+class RateLimiter:
+    """Spaces calls evenly so at most `rate` calls start per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class EmailOutbox:
+    def __init__(
+        self,
+        collection,
+        transport,
+        workers: int = 2,
+        batch_size: int = 10,
+        rate_per_second: float = 2.0,
+        max_attempts: int = 5,
+        backoff: float = 30.0,
+        lease: float = 120.0,
+        poll_interval: float = 1.0,
+        leases=None,
+        lease_name: str = "email_outbox",
+    ):
+        self.collection = collection
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.leases = leases
+        self.lease_name = lease_name
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def enqueue(self, message: dict, kind: str = "email") -> str:
+        """Store an email job; it is sent by the worker pool"""
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "message": message,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "last_error": None,
+        }
+        await self.collection.insert_one(job)
+        if self._wakeup:
+            self._wakeup.set()
+        return job["id"]
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                # Jobs whose worker died mid-send become claimable once the lease expires
+                {"status": "sending", "locked_until": {"$lt": now}},
+            ]},
+            {"$set": {"status": "sending", "locked_until": now + timedelta(seconds=self.lease)}},
+            sort=[("next_attempt_at", 1)],
+        )
+
+    async def _claim_batch(self) -> List[dict]:
+        jobs = []
+        while len(jobs) < self.batch_size:
+            job = await self._claim()
+            if not job:
+                break
+            jobs.append(job)
+        return jobs
+
+    async def _complete(self, job: dict, error: Optional[Exception]):
+        now = datetime.now(timezone.utc)
+        if error is None:
+            update = {"$set": {"status": "sent", "sent_at": now}, "$inc": {"attempts": 1}}
+        elif job["attempts"] + 1 >= self.max_attempts:
+            logger.error(f"Email job {job['id']} dead-lettered after {job['attempts'] + 1} attempts: {str(error)}")
+            update = {"$set": {"status": "dead", "last_error": str(error)}, "$inc": {"attempts": 1}}
+        else:
+            delay = self.backoff * 2 ** job["attempts"]
+            logger.warning(f"Email job {job['id']} failed, retrying in {delay:.0f}s: {str(error)}")
+            update = {
+                "$set": {"status": "pending", "last_error": str(error), "next_attempt_at": now + timedelta(seconds=delay)},
+                "$inc": {"attempts": 1},
+            }
+        await self.collection.update_one({"id": job["id"]}, update)
+
+    async def drain_once(self) -> int:
+        """Claim and send one batch of due jobs, returning how many were processed"""
+        jobs = await self._claim_batch()
+        if not jobs:
+            return 0
+        try:
+            results = await self.transport.send_batch([job["message"] for job in jobs], self.rate_limiter)
+        except Exception as e:
+            results = [e] * len(jobs)
+        for job, error in zip(jobs, results):
+            await self._complete(job, error)
+        return len(jobs)
+
+    async def _holds_lease(self) -> bool:
+        """Take or renew the outbox lease; always True without shared leases"""
+        if self.leases is None:
+            return True
+        return await self.leases.acquire(self.lease_name, self.lease)
+
+    async def _worker(self):
+        while not self._stopping:
+            try:
+                if await self._holds_lease() and await self.drain_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self._stopping = True
+        if self._wakeup:
+            self._wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.leases is not None:
+            try:
+                await self.leases.release(self.lease_name)
+            except Exception as e:
+                logger.error(f"Failed to release the email outbox lease: {str(e)}")
@@ -0,0 +1,237 @@
+"""Async payment gateway layer for Razorpay.
+
+RazorpayGateway talks to the Razorpay REST API over a pooled keep-alive
+httpx client with timeouts, retries for idempotent calls and a circuit
+breaker. FakePaymentGateway mimics the same interface locally so the API can
+run in demo mode and be load-tested offline.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+RAZORPAY_API_URL = "https://api.razorpay.com/v1"
+
+# Bodies larger than this are signed off the event loop; hashlib releases the
+# GIL for large buffers, while small payloads are cheaper to hash inline
+SIGNATURE_THREAD_THRESHOLD = 64 * 1024
+
+
+class PaymentGatewayError(Exception):
+    pass
+
+
+class GatewayUnavailableError(PaymentGatewayError):
+    """Raised when the circuit breaker is open"""
+
+
+class SignatureVerificationError(PaymentGatewayError):
+    pass
+
+
+def hmac_sha256(secret: str, message: bytes) -> str:
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, message: bytes, signature: str):
+    if not hmac.compare_digest(hmac_sha256(secret, message), signature or ""):
+        raise SignatureVerificationError("Signature verification failed")
+
+
+async def verify_signature_async(secret: str, message: bytes, signature: str):
+    if len(message) > SIGNATURE_THREAD_THRESHOLD:
+        await asyncio.to_thread(verify_signature, secret, message, signature)
+    else:
+        verify_signature(secret, message, signature)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one trial call through after a cool-down
+
+    While half-open, calls other than the trial are rejected until it
+    records a success (closing the circuit) or a failure (reopening it).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Raise if the call may not go through; return True for the half-open trial call"""
+        state = self.state
+        if state == "open" or (state == "half-open" and self.probing):
+            raise GatewayUnavailableError("Payment gateway circuit is open")
+        if state == "half-open":
+            self.probing = True
+            return True
+        return False
+
+    def end_probe(self):
+        # Lets another trial through if the last one ended without an outcome, e.g. cancelled
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class RazorpayGateway:
+    demo = False
+
+    def __init__(
+        self,
+        key_id: str,
+        key_secret: str,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_retries: int = 2,
+        backoff: float = 0.2,
+        max_connections: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._client = None
+
+    @property
+    def client(self):
+        # Created lazily so the pool binds to the running event loop and
+        # httpx is only imported by processes that talk to Razorpay
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=RAZORPAY_API_URL,
+                auth=(self.key_id, self.key_secret),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def _request(self, method: str, path: str, idempotent: bool, **kwargs) -> dict:
+        import httpx
+        probe = self.breaker.before_call()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = await self.client.request(method, path, **kwargs)
+                    if response.status_code >= 500:
+                        raise httpx.HTTPStatusError("Server error", request=response.request, response=response)
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    # Non-idempotent calls are only retried when the request never left
+                    retryable = idempotent or isinstance(e, httpx.ConnectError)
+                    if not retryable or attempt >= self.max_retries:
+                        self.breaker.record_failure()
+                        raise PaymentGatewayError(f"Razorpay {method} {path} failed: {str(e)}") from e
+                    attempt += 1
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+                    continue
+                self.breaker.record_success()
+                if response.status_code >= 400:
+                    raise PaymentGatewayError(f"Razorpay {method} {path} returned {response.status_code}: {response.text}")
+                return response.json()
+        finally:
+            if probe:
+                self.breaker.end_probe()
+
+    async def create_order(self, data: dict) -> dict:
+        return await self._request("POST", "/orders", idempotent=False, json=data)
+
+    async def fetch_order(self, order_id: str) -> dict:
+        return await self._request("GET", f"/orders/{order_id}", idempotent=True)
+
+    async def fetch_order_payments(self, order_id: str) -> dict:
+        return await self._request("GET", f"/orders/{order_id}/payments", idempotent=True)
+
+    async def verify_payment_signature(self, order_id: str, payment_id: str, signature: str):
+        await verify_signature_async(self.key_secret, f"{order_id}|{payment_id}".encode(), signature)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class FakePaymentGateway:
+    """Local stand-in for Razorpay with optional simulated latency"""
+
+    demo = True
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.orders = {}
+        self.payments = {}
+
+    async def _simulate(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def create_order(self, data: dict) -> dict:
+        await self._simulate()
+        order = {
+            "id": f"order_demo_{uuid.uuid4().hex[:10]}",
+            "amount": data["amount"],
+            "currency": data.get("currency", "INR"),
+            "status": "created",
+        }
+        self.orders[order["id"]] = order
+        return order
+
+    async def fetch_order(self, order_id: str) -> dict:
+        await self._simulate()
+        if order_id not in self.orders:
+            raise PaymentGatewayError(f"Order not found: {order_id}")
+        return self.orders[order_id]
+
+    async def fetch_order_payments(self, order_id: str) -> dict:
+        await self._simulate()
+        items = self.payments.get(order_id, [])
+        return {"entity": "collection", "count": len(items), "items": items}
+
+    def capture(self, order_id: str, payment_id: Optional[str] = None) -> dict:
+        """Record a captured payment for an order, as a customer checkout would"""
+        payment = {
+            "id": payment_id or f"pay_demo_{uuid.uuid4().hex[:10]}",
+            "order_id": order_id,
+            "status": "captured",
+        }
+        self.payments.setdefault(order_id, []).append(payment)
+        if order_id in self.orders:
+            self.orders[order_id]["status"] = "paid"
+        return payment
+
+    async def verify_payment_signature(self, order_id: str, payment_id: str, signature: str):
+        # Demo checkouts have no signature to verify
+        return None
+
+    async def close(self):
+        return None
@@ -0,0 +1,213 @@
+"""Response policy middleware: per-route caching headers, ETags and compression.
+
+For each buffered response (a single body message) the middleware:
+
+- adds the route's Cache-Control rule, looked up by endpoint name
+- adds a strong ETag from a hash of the body to cacheable GET responses
+  that do not set one themselves
+- compresses the body with brotli (when installed) or gzip, if the client
+  accepts it and the body is compressible and over the size threshold; the
+  ETag of a compressed body carries the encoding as a suffix
+- answers a matching If-None-Match (or, without one, If-Modified-Since
+  against Last-Modified) with 304 and no body, carrying the same ETag the
+  200 for that request would have had
+
+Handlers only set ETag and Last-Modified; all conditional requests are
+answered here.
+
+Streamed responses, such as NDJSON listings, pass through unchanged so rows
+keep flowing as they are produced.
+"""
+import gzip
+import hashlib
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "application/xml")
+
+
+def load_brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    encodings = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of If-None-Match against the ETag of the representation being sent"""
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified_since(if_modified_since: str, last_modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+class ResponsePolicyMiddleware:
+    def __init__(
+        self,
+        app,
+        cache_rules: Dict[str, str],
+        etag_routes: Tuple[str, ...] = (),
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        self.app = app
+        self.cache_rules = cache_rules
+        self.etag_routes = frozenset(etag_routes)
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._brotli = False  # Not looked up yet
+
+    @property
+    def brotli(self):
+        # Imported on the first compressible response to keep startup fast
+        if self._brotli is False:
+            self._brotli = load_brotli()
+        return self._brotli
+
+    def _choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = parse_accept_encoding(accept_encoding)
+        if self.brotli and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return self.brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        method = scope["method"]
+        start_message = None
+        passthrough = False
+
+        async def send_with_policy(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # Streaming response: send what we held back and stop interfering
+                passthrough = True
+                await send(self._apply_cache_rule(scope, start_message))
+                await send(message)
+                return
+            for outgoing in self._finalize(scope, method, request_headers, start_message, message.get("body", b"")):
+                await send(outgoing)
+
+        await self.app(scope, receive, send_with_policy)
+
+    def _route(self, scope) -> str:
+        return getattr(scope.get("endpoint"), "__name__", "")
+
+    def _apply_cache_rule(self, scope, start_message: dict) -> dict:
+        rule = self.cache_rules.get(self._route(scope))
+        headers = list(start_message.get("headers", []))
+        if rule and start_message["status"] < 400 and not any(name == b"cache-control" for name, _ in headers):
+            headers.append((b"cache-control", rule.encode("latin-1")))
+        return {**start_message, "headers": headers}
+
+    def _not_modified(self, request_headers: Dict[str, str], etag: str, existing: Dict[bytes, bytes]) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            # If-Modified-Since is ignored when If-None-Match is present
+            return bool(etag) and etag_matches(if_none_match, etag)
+        last_modified = existing.get(b"last-modified")
+        if_modified_since = request_headers.get("if-modified-since")
+        return bool(last_modified and if_modified_since) and not_modified_since(
+            if_modified_since, last_modified.decode("latin-1")
+        )
+
+    def _finalize(self, scope, method: str, request_headers: Dict[str, str], start_message: dict, body: bytes) -> List[dict]:
+        start_message = self._apply_cache_rule(scope, start_message)
+        status = start_message["status"]
+        headers: List[Tuple[bytes, bytes]] = start_message["headers"]
+        existing = {name.lower(): value for name, value in headers}
+
+        cacheable = method in ("GET", "HEAD") and status == 200 and self._route(scope) in self.etag_routes
+        etag = existing.get(b"etag", b"").decode("latin-1")
+        if cacheable and not etag:
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            headers.append((b"etag", etag.encode("latin-1")))
+
+        content_type = existing.get(b"content-type", b"").decode("latin-1")
+        compressible = (
+            len(body) >= self.minimum_size
+            and b"content-encoding" not in existing
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+        if (etag or compressible) and b"accept-encoding" not in existing.get(b"vary", b"").lower():
+            vary = existing.get(b"vary")
+            headers = [(name, value) for name, value in headers if name.lower() != b"vary"]
+            headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+
+        encoding = None
+        if compressible:
+            encoding = self._choose_encoding(request_headers.get("accept-encoding", ""))
+        if etag and encoding:
+            # A strong ETag must differ between encodings of the same body
+            etag = f'{etag[:-1]}-{encoding}"'
+            headers = [(name, value) for name, value in headers if name.lower() != b"etag"]
+            headers.append((b"etag", etag.encode("latin-1")))
+
+        if method in ("GET", "HEAD") and status == 200 and self._not_modified(request_headers, etag, existing):
+            kept = [(name, value) for name, value in headers if name.lower() not in (b"content-length", b"content-type")]
+            return [
+                {"type": "http.response.start", "status": 304, "headers": kept},
+                {"type": "http.response.body", "body": b""},
+            ]
+
+        if encoding:
+            body = self._compress(body, encoding)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(body)).encode()))
+        if method == "HEAD":
+            body = b""
+        return [
+            {**start_message, "headers": headers},
+            {"type": "http.response.body", "body": body},
+        ]
@@ -0,0 +1,51 @@
+"""Production entry point: serve the API from several uvicorn worker processes.
+
+Usage (run from backend/):
+    python run.py                      # one worker per CPU core
+    python run.py --workers 4 --port 8001
+
+Each worker imports server.py and opens its own Motor pool at startup. With
+more than one worker, in-process caches are kept in step through Mongo
+change streams (SHARED_STATE_BACKEND=changestream, needs a replica set);
+without a replica set the hot cart cache stays off and the services cache
+relies on its TTL. SESSION_SECRET must be set so every worker signs session
+cookies with the same key; periodic tasks take a Mongo lease so only one
+worker runs each of them.
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def default_workers() -> int:
+    return int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Mystic Prana API")
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--log-level", default=os.environ.get('LOG_LEVEL', 'info'))
+    args = parser.parse_args()
+
+    # Workers read this to size their connection pools and pick the shared state backend
+    os.environ['WEB_CONCURRENCY'] = str(args.workers)
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        # Leave logging to server.py so uvicorn's records also go through the queue
+        log_config=None,
+        proxy_headers=True,
+        # Exact addresses only; the admission middleware also accepts CIDR ranges
+        forwarded_allow_ips=os.environ.get('TRUSTED_PROXIES') or None,
+        app_dir=os.path.dirname(os.path.abspath(__file__))
+    )
+
+
+if __name__ == "__main__":
+    main()
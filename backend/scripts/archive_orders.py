@@ -0,0 +1,32 @@
+"""Archive orders left unpaid in "created" for longer than ORDER_ARCHIVE_AFTER_DAYS.
+
+Usage: python scripts/archive_orders.py [--batch-size 500] [--duty-cycle 0.2] [--max-batches N]
+(run from backend/, needs MONGO_URL and DB_NAME; ORDER_ARCHIVE_TARGET=jsonl
+writes gzip JSONL files under ORDER_ARCHIVE_DIR instead of orders_archive)
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+
+async def main(args):
+    server.connect_database()
+    stats = await server.archive_orders(
+        max_batches=args.max_batches, batch_size=args.batch_size, duty_cycle=args.duty_cycle
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=server.ORDER_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--duty-cycle", type=float, default=server.ORDER_ARCHIVE_DUTY_CYCLE,
+                        help="Fraction of wall time spent working; the rest is spent paused")
+    parser.add_argument("--max-batches", type=int, default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,54 @@
+"""Export orders to CSV, JSONL or Parquet, one row per line item.
+
+The export is checkpointed next to the output file; rerun the same command
+with --resume to continue an interrupted export.
+
+Usage: python scripts/export_orders.py --format csv --output orders.csv
+           [--start 2026-01-01] [--end 2026-02-01] [--status paid,created] [--resume]
+(run from backend/, needs MONGO_URL and DB_NAME; --format parquet needs pyarrow)
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+from exports import FORMATS, OrderExport, export_to_file  # noqa: E402
+
+
+def parse_date(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def main(args):
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("--format parquet needs pyarrow (pip install pyarrow, or install requirements-dev.txt)")
+    server.connect_database()
+    statuses = [value.strip() for value in args.status.split(",") if value.strip()] if args.status else None
+    export = OrderExport(
+        server.db.orders, start=args.start, end=args.end, statuses=statuses, chunk_size=args.chunk_size
+    )
+    stats = await export_to_file(export, args.format, Path(args.output), resume=args.resume)
+    stats["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--start", type=parse_date, help="Orders created on or after this date (UTC)")
+    parser.add_argument("--end", type=parse_date, help="Orders created before this date (UTC)")
+    parser.add_argument("--status", help="Comma separated statuses")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Orders encoded and written at a time")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an earlier run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,38 @@
+"""Convert datetimes stored as ISO strings into native BSON dates.
+
+Documents written before dates were stored natively keep their timestamps as
+strings, which sort and compare separately from BSON dates and are ignored by
+TTL indexes. This rewrites them in place with one $toDate pipeline update per
+field.
+
+Usage: python scripts/migrate_dates_to_bson.py  (run from backend/, needs MONGO_URL and DB_NAME)
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+DATE_FIELDS = {
+    "contact_inquiries": ["timestamp"],
+    "status_checks": ["timestamp"],
+    "carts": ["created_at", "updated_at"],
+    "orders": ["created_at", "updated_at"],
+}
+
+
+async def main():
+    server.connect_database()
+    for collection_name, fields in DATE_FIELDS.items():
+        for field in fields:
+            result = await server.db[collection_name].update_many(
+                {field: {"$type": "string"}},
+                [{"$set": {field: {"$toDate": f"${field}"}}}]
+            )
+            print(f"{collection_name}.{field}: converted {result.modified_count} documents")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Bring existing data under lifecycle management.
+
+- Carts without updated_at are never removed by the TTL index; they get
+  their created_at, or now, so they expire CART_TTL_DAYS later.
+- A plain status_checks collection is renamed aside, recreated with the
+  storage set by STATUS_CHECKS_STORAGE, and refilled with the checks still
+  inside STATUS_CHECKS_RETENTION_DAYS. The old collection is kept unless
+  --drop-legacy is given.
+
+Usage: python scripts/migrate_lifecycle.py [--drop-legacy]
+(run from backend/ while the API is stopped; needs MONGO_URL and DB_NAME)
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+from lifecycle import collection_options, ensure_status_checks_collection  # noqa: E402
+
+BATCH_SIZE = 1000
+
+
+async def backfill_cart_dates():
+    result = await server.db.carts.update_many(
+        {"updated_at": {"$exists": False}},
+        [{"$set": {"updated_at": {"$ifNull": ["$created_at", "$$NOW"]}}}]
+    )
+    print(f"carts: set updated_at on {result.modified_count} carts")
+
+
+async def convert_status_checks(drop_legacy: bool):
+    info = await collection_options(server.db, "status_checks")
+    if info is None or info.get("type") == "timeseries" or info.get("options", {}).get("capped"):
+        print("status_checks: already bounded, nothing to do")
+        return
+    if server.STATUS_CHECKS_STORAGE == "plain":
+        print("status_checks: STATUS_CHECKS_STORAGE=plain, leaving it as is")
+        return
+
+    legacy = f"status_checks_legacy_{datetime.now(timezone.utc):%Y%m%d%H%M%S}"
+    await server.db.status_checks.rename(legacy)
+    kind = await ensure_status_checks_collection(
+        server.db,
+        storage=server.STATUS_CHECKS_STORAGE,
+        retention_seconds=server.STATUS_CHECKS_RETENTION_DAYS * 24 * 3600,
+        capped_size_bytes=server.STATUS_CHECKS_CAPPED_MB * 1024 * 1024
+    )
+    cutoff = datetime.now(timezone.utc) - timedelta(days=server.STATUS_CHECKS_RETENTION_DAYS)
+    copied, batch = 0, []
+    # Oldest first, so a capped collection that overflows keeps the newest checks
+    async for check in server.db[legacy].find({"timestamp": {"$gte": cutoff}}, {"_id": 0}).sort("timestamp", 1):
+        batch.append(check)
+        if len(batch) >= BATCH_SIZE:
+            await server.db.status_checks.insert_many(batch)
+            copied, batch = copied + len(batch), []
+    if batch:
+        await server.db.status_checks.insert_many(batch)
+        copied += len(batch)
+    print(f"status_checks: recreated as {kind}, copied {copied} checks from {legacy}")
+
+    if drop_legacy:
+        await server.db[legacy].drop()
+        print(f"status_checks: dropped {legacy}")
+
+
+async def main(args):
+    server.connect_database()
+    await backfill_cart_dates()
+    await convert_status_checks(args.drop_legacy)
+    await server.ensure_indexes()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drop-legacy", action="store_true", help="Drop the old status_checks collection")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,31 @@
+"""Repair orders stuck in "created" by checking their payments at the gateway.
+
+Usage: python scripts/reconcile_orders.py [--batch-size 100] [--concurrency 10]
+(run from backend/, needs MONGO_URL and DB_NAME; PAYMENT_GATEWAY=fake runs offline)
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+
+async def main(args):
+    server.connect_database()
+    try:
+        stats = await server.reconcile_orders(batch_size=args.batch_size, concurrency=args.concurrency)
+        # Confirmation emails queued by the run are sent by the running API's outbox workers
+        print(json.dumps(stats, indent=2))
+    finally:
+        await server.payment_gateway.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
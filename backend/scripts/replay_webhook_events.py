@@ -0,0 +1,39 @@
+"""Re-apply stored Razorpay webhook events to db.orders.
+
+Usage: python scripts/replay_webhook_events.py [--event payment.captured] [--since 2026-01-01] [--concurrency 10]
+(run from backend/, needs MONGO_URL and DB_NAME)
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+
+async def main(args):
+    server.connect_database()
+    query = {}
+    if args.event:
+        query["event"] = args.event
+    if args.since:
+        query["received_at"] = {"$gte": datetime.fromisoformat(args.since).replace(tzinfo=timezone.utc)}
+
+    start = time.perf_counter()
+    outcomes = await server.replay_webhook_events(query, concurrency=args.concurrency)
+    # Confirmation emails queued by the replay are sent by the running API's outbox workers
+    elapsed = time.perf_counter() - start
+    total = sum(outcomes.values())
+    print(f"Replayed {total} events in {elapsed:.2f}s: {outcomes}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--event", help="Only replay events of this type")
+    parser.add_argument("--since", help="Only replay events received on or after this ISO date")
+    parser.add_argument("--concurrency", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
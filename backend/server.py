@@ -1,21 +1,63 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request
-from dotenv import load_dotenv
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 import asyncio
-import resend
-import razorpay
+import base64
+import hashlib
+import time
+import orjson
+import secrets
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+from collections import OrderedDict
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from email.utils import format_datetime
+from admission import AdmissionMiddleware, LocalBucketStore, MongoBucketStore
+from analytics import AnalyticsRollups
+from email_templates import render_contact_email, render_order_confirmation_email
+from group_commit import GroupCommitWriter
+from idempotency import IdempotencyKeyInProgress, IdempotencyKeyReused, IdempotencyStore
+from exports import FORMATS as EXPORT_FORMATS, MEDIA_TYPES as EXPORT_MEDIA_TYPES, OrderExport
+from lifecycle import (
+    CollectionArchiveSink, JsonlArchiveSink, OrderArchiver, collection_sizes, ensure_status_checks_collection
+)
+from metrics import Instrumented, InstrumentedDatabase, MetricsMiddleware, monitor_event_loop, registry
+from outbox import EmailOutbox, ResendTransport, LocalTransport
+from response_policy import ResponsePolicyMiddleware, etag_matches, not_modified_since
+from sessions import SessionMiddleware, get_session
+from shared_state import create_change_bus
+from structured_logging import RequestIdMiddleware, configure_logging, log_event, parse_sample_rates
+from task_leases import TaskLeases
+from payments import (
+    RazorpayGateway, FakePaymentGateway, CircuitBreaker, GatewayUnavailableError, SignatureVerificationError,
+    verify_signature_async
+)
 
 
 ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+# python-dotenv is only needed, and only imported, when a .env file exists
+if (ROOT_DIR / '.env').exists():
+    from dotenv import load_dotenv
+    load_dotenv(ROOT_DIR / '.env')
+
+# Logging: records are queued on the event loop and written as JSON lines by a
+# background thread (LOG_FORMAT=text for local development, LOG_PIPELINE=sync
+# to write directly from the calling thread)
+configure_logging(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    fmt=os.environ.get('LOG_FORMAT', 'json'),
+    sample_rates=parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', '')),
+    pipeline=os.environ.get('LOG_PIPELINE', 'queue')
+)
+logger = logging.getLogger(__name__)
 
 # Email configuration
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
@@ -27,23 +69,133 @@ RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET')
 RAZORPAY_WEBHOOK_SECRET = os.environ.get('RAZORPAY_WEBHOOK_SECRET')
 
-# Initialize Resend
-if RESEND_API_KEY:
-    resend.api_key = RESEND_API_KEY
+# Emails go through the outbox when Resend is configured or EMAIL_TRANSPORT=local
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'resend')
+EMAIL_ENABLED = EMAIL_TRANSPORT == 'local' or bool(RESEND_API_KEY and RESEND_API_KEY != "re_placeholder_key_here")
 
-# Initialize Razorpay
-if RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET:
-    razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+# Initialize the payment gateway (PAYMENT_GATEWAY=fake forces the local demo gateway)
+PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY', 'razorpay' if RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET else 'fake')
+GATEWAY_CALLS = ("create_order", "fetch_order", "fetch_order_payments")
+if PAYMENT_GATEWAY == 'razorpay':
+    payment_gateway = Instrumented(RazorpayGateway(
+        RAZORPAY_KEY_ID,
+        RAZORPAY_KEY_SECRET,
+        timeout=float(os.environ.get('RAZORPAY_TIMEOUT', '10')),
+        connect_timeout=float(os.environ.get('RAZORPAY_CONNECT_TIMEOUT', '3')),
+        max_retries=int(os.environ.get('RAZORPAY_MAX_RETRIES', '2')),
+        max_connections=int(os.environ.get('RAZORPAY_MAX_CONNECTIONS', '20')),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.environ.get('RAZORPAY_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.environ.get('RAZORPAY_BREAKER_RESET', '30'))
+        )
+    ), "razorpay", GATEWAY_CALLS)
 else:
-    razorpay_client = None
+    payment_gateway = Instrumented(
+        FakePaymentGateway(latency=float(os.environ.get('FAKE_GATEWAY_LATENCY_MS', '0')) / 1000),
+        "fake_gateway",
+        GATEWAY_CALLS
+    )
+
+# Worker processes serving this app (set by run.py)
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+# MongoDB connection, opened per worker process by connect_database() at startup.
+# The default pool keeps all workers together at roughly 100 connections.
+mongo_url = os.environ.get('MONGO_URL')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', str(max(10, 100 // WEB_CONCURRENCY))))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+client = None
+db = InstrumentedDatabase()
+
+def connect_database():
+    """Create this process's Motor client and bind db to it"""
+    global client
+    if db.bound:
+        return
+    if not mongo_url or not os.environ.get('DB_NAME'):
+        raise RuntimeError("MONGO_URL and DB_NAME must be set")
+    from motor.motor_asyncio import AsyncIOMotorClient
+    # tz_aware so BSON dates come back as UTC datetimes
+    client = AsyncIOMotorClient(
+        mongo_url,
+        tz_aware=True,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE
+    )
+    db.bind(client[os.environ['DB_NAME']])
+
+# Idempotency-Key records for /create-order, shared by all workers through Mongo
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_HOURS', '24')) * 3600
+idempotency_store = IdempotencyStore(
+    db.idempotency_keys,
+    lease=float(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '60')),
+    wait_timeout=float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '30'))
+)
+
+# Cache invalidation between workers: in-process only for a single worker,
+# Mongo change streams otherwise (SHARED_STATE_BACKEND=local|changestream)
+SHARED_STATE_BACKEND = os.environ.get('SHARED_STATE_BACKEND', 'local' if WEB_CONCURRENCY == 1 else 'changestream')
+change_bus = create_change_bus(SHARED_STATE_BACKEND)
+
+# Per-task leases so background work runs in one worker process at a time
+task_leases = TaskLeases(db.task_leases)
+
+# Email outbox drained by background workers. Only the worker process holding
+# the "email_outbox" lease sends, so EMAIL_RATE_PER_SECOND is the total rate
+email_outbox = EmailOutbox(
+    db.email_outbox,
+    Instrumented(
+        ResendTransport(RESEND_API_KEY) if EMAIL_TRANSPORT == 'resend' and EMAIL_ENABLED else LocalTransport(),
+        "resend" if EMAIL_TRANSPORT == 'resend' else "local_email",
+        ("send_batch",)
+    ),
+    workers=int(os.environ.get('EMAIL_WORKERS', '2')),
+    batch_size=int(os.environ.get('EMAIL_BATCH_SIZE', '10')),
+    rate_per_second=float(os.environ.get('EMAIL_RATE_PER_SECOND', '2')),
+    max_attempts=int(os.environ.get('EMAIL_MAX_ATTEMPTS', '5')),
+    leases=task_leases
+)
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Opt-in group commit for high-volume inserts (GROUP_COMMIT=1)
+GROUP_COMMIT_ENABLED = os.environ.get('GROUP_COMMIT', '0') == '1'
+group_writers = {
+    name: GroupCommitWriter(
+        db[name],
+        max_batch=int(os.environ.get('GROUP_COMMIT_MAX_BATCH', '100')),
+        max_delay=float(os.environ.get('GROUP_COMMIT_MAX_DELAY_MS', '5')) / 1000
+    )
+    for name in ("contact_inquiries", "status_checks")
+}
 
-# Create the main app without a prefix
-app = FastAPI(title="Mystic Prana API", description="API for Mystic Prana Energy Healing Center")
+async def insert_document(collection_name: str, document: dict):
+    """Insert one document, through the group-commit writer when enabled"""
+    if GROUP_COMMIT_ENABLED and collection_name in group_writers:
+        await group_writers[collection_name].insert(document)
+    else:
+        await db[collection_name].insert_one(document)
+
+# Signed session cookies identifying each shopper's cart
+# A random fallback only works for a single demo worker: every worker would
+# sign with its own key; validate_settings refuses it otherwise
+SESSION_SECRET = os.environ.get('SESSION_SECRET')
+SESSION_SECRET_GENERATED = not SESSION_SECRET
+if SESSION_SECRET_GENERATED:
+    SESSION_SECRET = secrets.token_hex(32)
+    logger.warning("SESSION_SECRET is not set; sessions will not survive a restart")
+SESSION_COOKIE_NAME = os.environ.get('SESSION_COOKIE_NAME', 'mp_session')
+SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', '0') == '1'
+SESSION_COOKIE_SAMESITE = os.environ.get('SESSION_COOKIE_SAMESITE', 'lax')
+
+# Admin endpoints need "Authorization: Bearer <ADMIN_TOKEN>"; without
+# ADMIN_TOKEN set they are disabled
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled; set ADMIN_TOKEN to enable it")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -61,6 +213,11 @@ class ContactInquiry(BaseModel):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     status: str = Field(default="new")
 
+INQUIRY_STATUSES = ("new", "in_progress", "responded", "closed", "spam")
+
+class ContactInquiryStatusUpdate(BaseModel):
+    status: str = Field(..., pattern=f"^({'|'.join(INQUIRY_STATUSES)})$")
+
 class ContactInquiryCreate(BaseModel):
     name: str = Field(..., min_length=2, max_length=100)
     email: EmailStr
@@ -69,18 +226,22 @@ class ContactInquiryCreate(BaseModel):
     message: str = Field(..., min_length=10, max_length=1000)
     service_interest: Optional[str] = None
 
+MAX_ITEM_QUANTITY = 99
+
 class CartItem(BaseModel):
     product_id: str
     name: str
     price: str
-    quantity: int
+    quantity: int = Field(..., ge=1, le=MAX_ITEM_QUANTITY)
     image: str
+    unit_price: Optional[int] = None  # Catalog price in paise, set by the server
 
 class Cart(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     session_id: str
     items: List[CartItem]
     total_amount: float
+    total_paise: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -115,6 +276,13 @@ class Service(BaseModel):
     benefits: List[str]
     is_active: bool = True
 
+class Product(BaseModel):
+    product_id: str
+    name: str
+    price: str  # Display price
+    price_paise: int  # Canonical price in paise (INR)
+    is_active: bool = True
+
 class StatusCheck(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     client_name: str
@@ -123,13 +291,329 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
-# Helper function to prepare data for MongoDB
-def prepare_for_mongo(data):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-    return data
+# Default product catalog, seeded into db.products when the collection is empty
+DEFAULT_PRODUCTS = [
+    {"product_id": "1", "name": "Aura Spray", "price": "₹600"},
+    {"product_id": "2", "name": "Chakra Healing Crystal Set", "price": "$89.99"},
+    {"product_id": "3", "name": "Meditation Cushion & Mat Set", "price": "$125.00"},
+    {"product_id": "4", "name": "Essential Oil Diffuser", "price": "$65.00"},
+    {"product_id": "5", "name": "Singing Bowl Set", "price": "$145.00"},
+    {"product_id": "6", "name": "Yoga & Meditation Bundle", "price": "$199.99"},
+    {"product_id": "7", "name": "Sage & Palo Santo Kit", "price": "$35.00"},
+]
+
+# In-process product index keyed by product_id, loaded at startup
+product_catalog: Dict[str, Product] = {}
+
+def price_to_paise(price: str) -> int:
+    """Parse a display price such as "₹1,299" into integer paise"""
+    amount = Decimal(price.replace("₹", "").replace("$", "").replace(",", "").strip())
+    return int(amount * 100)
+
+async def load_product_catalog():
+    """Load the product catalog into the in-process index, seeding defaults if empty"""
+    products = await db.products.find({"is_active": True}, {"_id": 0}).to_list(None)
+    if not products:
+        # Upserts keyed on the unique product_id, so workers booting together seed it once
+        await db.products.bulk_write([
+            UpdateOne(
+                {"product_id": product["product_id"]},
+                {"$setOnInsert": Product(**product, price_paise=price_to_paise(product["price"])).model_dump()},
+                upsert=True
+            )
+            for product in DEFAULT_PRODUCTS
+        ], ordered=False)
+        products = await db.products.find({"is_active": True}, {"_id": 0}).to_list(None)
+    product_catalog.clear()
+    for product in products:
+        product_catalog[product["product_id"]] = Product(**product)
+    logger.info(f"Loaded {len(product_catalog)} products into catalog")
+
+def get_catalog_product(product_id: str) -> Product:
+    product = product_catalog.get(product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail=f"Product not found: {product_id}")
+    return product
+
+def order_total_paise(items: List[CartItem]) -> int:
+    """Compute an order total in paise from canonical catalog prices"""
+    return sum(get_catalog_product(item.product_id).price_paise * item.quantity for item in items)
+
+def stable_service_id(name: str) -> str:
+    """Deterministic id for a default service so clients can cache it"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"mysticprana/services/{name}"))
+
+# Default services, returned when none exist in the database
+DEFAULT_SERVICES = [
+    {
+        "id": stable_service_id("Energy Healing Sessions"),
+        "name": "Energy Healing Sessions",
+        "description": "Personalized energy healing sessions to restore balance and promote natural healing.",
+        "duration": "60-90 minutes",
+        "benefits": ["Stress relief", "Energy balance", "Emotional healing", "Physical wellness"],
+        "is_active": True
+    },
+    {
+        "id": stable_service_id("Group Meditation"),
+        "name": "Group Meditation",
+        "description": "Join our weekly group meditation sessions for community healing and shared spiritual growth.",
+        "duration": "45 minutes",
+        "benefits": ["Community connection", "Guided practice", "Spiritual growth", "Inner peace"],
+        "is_active": True
+    },
+    {
+        "id": stable_service_id("Chakra Balancing"),
+        "name": "Chakra Balancing",
+        "description": "Specialized chakra alignment and balancing therapy to harmonize your energy centers.",
+        "duration": "75 minutes",
+        "benefits": ["Energy alignment", "Chakra balance", "Spiritual clarity", "Physical vitality"],
+        "is_active": True
+    },
+    {
+        "id": stable_service_id("Wellness Consultation"),
+        "name": "Wellness Consultation",
+        "description": "Comprehensive wellness assessment and personalized healing plan development.",
+        "duration": "90 minutes",
+        "benefits": ["Personalized plan", "Holistic assessment", "Goal setting", "Ongoing support"],
+        "is_active": True
+    }
+]
+
+SERVICES_CACHE_TTL = float(os.environ.get('SERVICES_CACHE_TTL', '60'))
+
+class ServicesSnapshot:
+    def __init__(self, services: List[Service], etag: str, last_modified: datetime, expires_at: float):
+        self.services = services
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+class ServicesCache:
+    """In-memory TTL snapshot of active services with single-flight refresh"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.snapshot: Optional[ServicesSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self.snapshot is not None and self.snapshot.expires_at > time.monotonic()
+
+    async def get(self) -> ServicesSnapshot:
+        if self._fresh():
+            return self.snapshot
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            if not self._fresh():
+                self.snapshot = await self._load()
+            return self.snapshot
+
+    async def _load(self) -> ServicesSnapshot:
+        services = await db.services.find({"is_active": True}, {"_id": 0}).to_list(100)
+        models = [Service(**service) for service in (services or DEFAULT_SERVICES)]
+        payload = orjson.dumps([model.model_dump() for model in models], option=orjson.OPT_SORT_KEYS)
+        etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+        last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        if self.snapshot and self.snapshot.etag == etag:
+            last_modified = self.snapshot.last_modified
+        return ServicesSnapshot(models, etag, last_modified, time.monotonic() + self.ttl)
+
+    def invalidate(self):
+        if self.snapshot:
+            self.snapshot.expires_at = 0
+
+services_cache = ServicesCache(SERVICES_CACHE_TTL)
+change_bus.subscribe(
+    "services",
+    lambda change: services_cache.invalidate(),
+    lambda available: services_cache.invalidate()
+)
+
+# Keyset pagination for time-ordered listings. Pages are sorted newest first on
+# (timestamp, id); the next page cursor is returned in the X-Next-Cursor header.
+LIST_PAGE_SIZE = 100
+MAX_LIST_PAGE_SIZE = 1000
+LIST_SORT = [("timestamp", -1), ("id", -1)]
+
+def encode_cursor(doc: dict) -> str:
+    position = orjson.dumps([doc["timestamp"], doc["id"]])
+    return base64.urlsafe_b64encode(position).decode()
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        timestamp, doc_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        timestamp = datetime.fromisoformat(timestamp)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "id": {"$lt": doc_id}}
+    ]}
+
+def list_projection(model, fields: Optional[str]) -> dict:
+    """Build a projection from a comma separated fields= parameter"""
+    projection = {"_id": 0}
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = set(requested) - set(model.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        # The sort keys are always returned so the cursor can be built
+        projection.update({field: 1 for field in requested + ["timestamp", "id"]})
+    return projection
+
+async def stream_ndjson(documents):
+    async for doc in documents:
+        yield orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE)
+
+async def list_documents(collection, model, cursor: Optional[str], limit: int, fields: Optional[str], stream: bool):
+    """List a time-ordered collection as a keyset page or an NDJSON stream"""
+    query = decode_cursor(cursor) if cursor else {}
+    documents = collection.find(query, list_projection(model, fields)).sort(LIST_SORT)
+    if stream:
+        return StreamingResponse(stream_ndjson(documents.batch_size(limit)), media_type="application/x-ndjson")
+    docs = await documents.limit(limit + 1).to_list(limit + 1)
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(docs[-1])
+    # Raw documents go straight to orjson without building a model per row
+    return ORJSONResponse(docs, headers=headers)
+
+# Index declarations for every collection queried by the API, with the
+# endpoints whose queries rely on each index
+INQUIRY_SEARCH_WEIGHTS = {"subject": 5, "name": 3, "message": 1}
+CART_TTL_SECONDS = int(os.environ.get('CART_TTL_DAYS', '30')) * 24 * 3600
+
+INDEX_SPECS = {
+    "carts": [
+        {"keys": [("session_id", 1)], "options": {"name": "session_id_unique", "unique": True},
+         "endpoints": ["add_to_cart", "get_cart", "clear_cart", "remove_from_cart"]},
+        {"keys": [("updated_at", 1)], "options": {"name": "updated_at_ttl", "expireAfterSeconds": CART_TTL_SECONDS},
+         "endpoints": []},
+    ],
+    "orders": [
+        {"keys": [("order_id", 1)], "options": {"name": "order_id_unique", "unique": True},
+         "endpoints": ["create_payment_order", "verify_payment", "get_order", "razorpay_webhook"]},
+        {"keys": [("status", 1), ("created_at", 1)], "options": {"name": "status_created_at"},
+         "endpoints": ["reconcile_orders"]},
+        {"keys": [("reconciled_by", 1)], "options": {"name": "reconciled_by", "sparse": True},
+         "endpoints": ["reconcile_orders"]},
+        {"keys": [("updated_at", 1)], "options": {"name": "updated_at"},
+         "endpoints": ["refresh_analytics"]},
+        {"keys": [("created_at", 1), ("order_id", 1)], "options": {"name": "created_at_order_id"},
+         "endpoints": ["export_orders", "refresh_analytics"]},
+    ],
+    "orders_archive": [
+        {"keys": [("order_id", 1)], "options": {"name": "order_id_unique", "unique": True},
+         "endpoints": ["get_order", "archive_orders", "verify_payment", "razorpay_webhook"]},
+        {"keys": [("created_at", 1)], "options": {"name": "created_at"},
+         "endpoints": ["refresh_analytics"]},
+    ],
+    "orphan_payments": [
+        {"keys": [("order_id", 1), ("payment_id", 1)], "options": {"name": "order_id_payment_id_unique", "unique": True},
+         "endpoints": ["verify_payment", "razorpay_webhook"]},
+    ],
+    "analytics_daily": [
+        {"keys": [("metric", 1), ("day", 1)], "options": {"name": "metric_day"},
+         "endpoints": ["get_orders_analytics", "get_revenue_by_product", "get_inquiries_analytics", "get_cart_abandonment"]},
+    ],
+    "products": [
+        {"keys": [("product_id", 1)], "options": {"name": "product_id_unique", "unique": True},
+         "endpoints": []},
+        {"keys": [("is_active", 1)], "options": {"name": "is_active"},
+         "endpoints": ["load_product_catalog"]},
+    ],
+    "services": [
+        {"keys": [("is_active", 1)], "options": {"name": "is_active"},
+         "endpoints": ["get_services"]},
+    ],
+    "contact_inquiries": [
+        {"keys": LIST_SORT, "options": {"name": "timestamp_id"},
+         "endpoints": ["get_contact_inquiries", "search_contact_inquiries"]},
+        {"keys": [("status", 1)] + LIST_SORT, "options": {"name": "status_timestamp_id"},
+         "endpoints": ["search_contact_inquiries"]},
+        {"keys": [("service_interest", 1)] + LIST_SORT, "options": {"name": "service_interest_timestamp_id"},
+         "endpoints": ["search_contact_inquiries"]},
+        {"keys": [("id", 1)], "options": {"name": "id_unique", "unique": True},
+         "endpoints": ["update_contact_inquiry_status"]},
+        {"keys": [("subject", "text"), ("name", "text"), ("message", "text")],
+         "options": {"name": "search_text", "weights": INQUIRY_SEARCH_WEIGHTS, "default_language": "english"},
+         "endpoints": ["search_contact_inquiries"]},
+    ],
+    "email_outbox": [
+        {"keys": [("status", 1), ("next_attempt_at", 1)], "options": {"name": "status_next_attempt_at"},
+         "endpoints": ["email_outbox"]},
+        {"keys": [("id", 1)], "options": {"name": "id_unique", "unique": True},
+         "endpoints": ["email_outbox"]},
+    ],
+    "idempotency_keys": [
+        {"keys": [("created_at", 1)],
+         "options": {"name": "created_at_ttl", "expireAfterSeconds": IDEMPOTENCY_TTL_SECONDS},
+         "endpoints": ["create_payment_order"]},
+    ],
+    "rate_limits": [
+        {"keys": [("expires_at", 1)], "options": {"name": "expires_at_ttl", "expireAfterSeconds": 0},
+         "endpoints": ["create_contact_inquiry", "add_to_cart", "create_payment_order"]},
+    ],
+    "webhook_events": [
+        {"keys": [("event_id", 1)], "options": {"name": "event_id_unique", "unique": True},
+         "endpoints": ["razorpay_webhook"]},
+        {"keys": [("received_at", 1)], "options": {"name": "received_at"},
+         "endpoints": ["replay_webhook_events"]},
+    ],
+    "status_checks": [
+        {"keys": LIST_SORT, "options": {"name": "timestamp_id"},
+         "endpoints": ["get_status_checks"]},
+    ],
+}
+
+# Representative query shape of each endpoint, used to check query plans
+ENDPOINT_QUERIES = {
+    "get_cart": ("carts", {"session_id": "default"}, None),
+    "get_order": ("orders", {"order_id": "order_demo"}, None),
+    "get_services": ("services", {"is_active": True}, None),
+    "load_product_catalog": ("products", {"is_active": True}, None),
+    "get_contact_inquiries": ("contact_inquiries", {}, LIST_SORT),
+    "get_status_checks": ("status_checks", {}, LIST_SORT),
+    "search_contact_inquiries": ("contact_inquiries", {"status": "new"}, LIST_SORT),
+    "update_contact_inquiry_status": ("contact_inquiries", {"id": "inquiry_demo"}, None),
+    "get_orders_analytics": ("analytics_daily", {"metric": "orders", "day": {"$gte": "2026-01-01"}}, [("day", 1)]),
+}
+
+async def ensure_indexes():
+    """Idempotently create the declared indexes"""
+    for collection_name, specs in INDEX_SPECS.items():
+        for spec in specs:
+            try:
+                await db[collection_name].create_index(spec["keys"], **spec["options"])
+                logger.info(f"Index {collection_name}.{spec['options']['name']} ready for: {', '.join(spec['endpoints']) or 'maintenance'}")
+            except Exception as e:
+                logger.error(f"Failed to create index {collection_name}.{spec['options']['name']}: {str(e)}")
+
+def plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of an explain plan tree"""
+    stages = [plan.get("stage", "")]
+    if "inputStage" in plan:
+        stages += plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+async def explain_endpoint_queries() -> Dict[str, List[str]]:
+    """Return the winning plan stages for each endpoint query"""
+    plans = {}
+    for endpoint, (collection_name, query, sort) in ENDPOINT_QUERIES.items():
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        plans[endpoint] = plan_stages(explain["queryPlanner"]["winningPlan"])
+    return plans
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Serialise a model straight to JSON bytes, skipping FastAPI's re-validation"""
+    return Response(model.model_dump_json(), status_code=status_code, media_type="application/json")
 
 # API Routes
 @api_router.get("/")
@@ -140,316 +624,493 @@ async def root():
 async def create_contact_inquiry(inquiry: ContactInquiryCreate):
     """Submit a contact inquiry"""
     try:
-        inquiry_dict = inquiry.dict()
-        contact_obj = ContactInquiry(**inquiry_dict)
-        
-        # Prepare for MongoDB storage
-        mongo_data = prepare_for_mongo(contact_obj.dict())
+        # The input is already validated; model_construct fills in id, timestamp and status
+        contact_obj = ContactInquiry.model_construct(**inquiry.model_dump())
+        mongo_data = contact_obj.model_dump()
         
         # Store in database
-        await db.contact_inquiries.insert_one(mongo_data)
+        await insert_document("contact_inquiries", mongo_data)
         
         # Send email notification
-        if RESEND_API_KEY and RESEND_API_KEY != "re_placeholder_key_here":
+        if EMAIL_ENABLED:
             try:
-                # Create HTML email content
-                html_content = f"""
-                <html>
-                <head>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #2d5739; }}
-                        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                        .header {{ background: linear-gradient(135deg, #2d5739 0%, #4a7c59 100%); color: white; padding: 20px; text-align: center; }}
-                        .content {{ background: #f7f3e9; padding: 20px; }}
-                        .field {{ margin-bottom: 15px; }}
-                        .field strong {{ color: #2d5739; }}
-                        .footer {{ background: #2d5739; color: white; padding: 15px; text-align: center; }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="header">
-                            <h1>New Contact Inquiry - Mystic Prana</h1>
-                        </div>
-                        <div class="content">
-                            <h2>Contact Details:</h2>
-                            <div class="field">
-                                <strong>Name:</strong> {contact_obj.name}
-                            </div>
-                            <div class="field">
-                                <strong>Email:</strong> {contact_obj.email}
-                            </div>
-                            {f'<div class="field"><strong>Phone:</strong> {contact_obj.phone}</div>' if contact_obj.phone else ''}
-                            <div class="field">
-                                <strong>Subject:</strong> {contact_obj.subject}
-                            </div>
-                            {f'<div class="field"><strong>Service Interest:</strong> {contact_obj.service_interest}</div>' if contact_obj.service_interest else ''}
-                            <div class="field">
-                                <strong>Message:</strong><br>
-                                {contact_obj.message.replace(chr(10), '<br>')}
-                            </div>
-                            <div class="field">
-                                <strong>Submitted:</strong> {contact_obj.timestamp.strftime('%B %d, %Y at %I:%M %p UTC')}
-                            </div>
-                            <div class="field">
-                                <strong>Inquiry ID:</strong> {contact_obj.id}
-                            </div>
-                        </div>
-                        <div class="footer">
-                            <p>This inquiry has been automatically stored in your database.</p>
-                            <p>Please respond to {contact_obj.email} directly.</p>
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
-                
-                # Email parameters
+                subject, html_content, text_content = render_contact_email(contact_obj)
                 email_params = {
                     "from": SENDER_EMAIL,
                     "to": [RECIPIENT_EMAIL],
-                    "subject": f"New Contact Inquiry from {contact_obj.name} - {contact_obj.subject}",
-                    "html": html_content
+                    "subject": subject,
+                    "html": html_content,
+                    "text": text_content
                 }
                 
-                # Send email asynchronously
-                email_result = await asyncio.to_thread(resend.Emails.send, email_params)
-                logger.info(f"Email sent successfully to {RECIPIENT_EMAIL}, ID: {email_result.get('id', 'Unknown')}")
+                # Queue email for the outbox workers
+                job_id = await email_outbox.enqueue(email_params, kind="contact_inquiry")
+                log_event(logger, "contact_inquiry.created", inquiry_id=contact_obj.id,
+                          service_interest=contact_obj.service_interest, email_job_id=job_id)
                 
             except Exception as email_error:
-                logger.error(f"Failed to send email notification: {str(email_error)}")
+                logger.error(f"Failed to queue email notification: {str(email_error)}")
         else:
-            # Demo mode - simulate email sending
-            logger.info("=== EMAIL DEMO MODE ===")
-            logger.info(f"📧 SIMULATED EMAIL to: {RECIPIENT_EMAIL}")
-            logger.info(f"📧 Subject: New Contact Inquiry from {contact_obj.name} - {contact_obj.subject}")
-            logger.info(f"📧 From: {contact_obj.name} ({contact_obj.email})")
-            logger.info(f"📧 Phone: {contact_obj.phone or 'Not provided'}")
-            logger.info(f"📧 Service Interest: {contact_obj.service_interest or 'General inquiry'}")
-            logger.info(f"📧 Message: {contact_obj.message[:100]}{'...' if len(contact_obj.message) > 100 else ''}")
-            logger.info(f"📧 Inquiry ID: {contact_obj.id}")
-            logger.info("📧 To enable real emails, add RESEND_API_KEY to .env file")
-            logger.info("=======================")
+            # Demo mode: no email is sent; set RESEND_API_KEY to enable real emails
+            log_event(logger, "contact_inquiry.created", inquiry_id=contact_obj.id,
+                      service_interest=contact_obj.service_interest, email="simulated", recipient=RECIPIENT_EMAIL)
         
-        return contact_obj
+        return model_response(contact_obj)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to submit inquiry: {str(e)}")
 
-@api_router.get("/contact", response_model=List[ContactInquiry])
-async def get_contact_inquiries():
-    """Get all contact inquiries (admin only)"""
+@api_router.get("/contact", dependencies=[Depends(require_admin)])
+async def get_contact_inquiries(
+    cursor: Optional[str] = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_LIST_PAGE_SIZE),
+    fields: Optional[str] = None,
+    stream: bool = False
+):
+    """Get contact inquiries, newest first (admin only)"""
     try:
-        inquiries = await db.contact_inquiries.find().to_list(1000)
-        return [ContactInquiry(**inquiry) for inquiry in inquiries]
+        return await list_documents(db.contact_inquiries, ContactInquiry, cursor, limit, fields, stream)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch inquiries: {str(e)}")
 
+# Inquiry search. With q, matches come from the text index ranked by score,
+# then newest first; without q, filtered inquiries are listed newest first.
+# Either way the page ends in a keyset cursor over the sort keys.
+def encode_search_cursor(doc: dict) -> str:
+    position = [doc["timestamp"], doc["id"]] + ([doc["score"]] if "score" in doc else [])
+    return base64.urlsafe_b64encode(orjson.dumps(position)).decode()
+
+def decode_search_cursor(cursor: str, ranked: bool) -> dict:
+    try:
+        position = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        timestamp, doc_id = datetime.fromisoformat(position[0]), position[1]
+        score = float(position[2]) if ranked else None
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    after = [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "id": {"$lt": doc_id}},
+    ]
+    if not ranked:
+        return {"$or": after}
+    return {"$or": [{"score": {"$lt": score}}] + [{"score": score, **condition} for condition in after]}
+
+def inquiry_filters(status: Optional[str], service_interest: Optional[str],
+                    since: Optional[datetime], until: Optional[datetime]) -> dict:
+    query = {}
+    if status:
+        query["status"] = status
+    if service_interest:
+        query["service_interest"] = service_interest
+    if since or until:
+        query["timestamp"] = {}
+        if since:
+            query["timestamp"]["$gte"] = since
+        if until:
+            query["timestamp"]["$lt"] = until
+    return query
+
+async def search_inquiries(q: Optional[str], filters: dict, cursor: Optional[str], limit: int, fields: Optional[str]):
+    projection = list_projection(ContactInquiry, fields)
+    if q:
+        # $text must lead the pipeline; the score is materialised so the cursor can compare on it
+        pipeline = [
+            {"$match": {"$text": {"$search": q}, **filters}},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+        if cursor:
+            pipeline.append({"$match": decode_search_cursor(cursor, ranked=True)})
+        pipeline += [
+            {"$sort": {"score": -1, "timestamp": -1, "id": -1}},
+            {"$limit": limit + 1},
+            # With fields= the projection is inclusive, so keep the score the cursor needs
+            {"$project": {**projection, "score": 1} if fields else projection},
+        ]
+        docs = await db.contact_inquiries.aggregate(pipeline).to_list(limit + 1)
+    else:
+        query = {"$and": [filters, decode_search_cursor(cursor, ranked=False)]} if cursor else filters
+        docs = await db.contact_inquiries.find(query, projection).sort(LIST_SORT).limit(limit + 1).to_list(limit + 1)
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers["X-Next-Cursor"] = encode_search_cursor(docs[-1])
+    return ORJSONResponse(docs, headers=headers)
+
+@api_router.get("/contact/search", dependencies=[Depends(require_admin)])
+async def search_contact_inquiries(
+    q: Optional[str] = Query(None, max_length=200),
+    status: Optional[str] = None,
+    service_interest: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_LIST_PAGE_SIZE),
+    fields: Optional[str] = None
+):
+    """Search contact inquiries by text, most relevant first, with optional filters (admin only)"""
+    try:
+        filters = inquiry_filters(status, service_interest, since, until)
+        return await search_inquiries(q.strip() if q else None, filters, cursor, limit, fields)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search inquiries: {str(e)}")
+
+@api_router.patch("/contact/{inquiry_id}/status", dependencies=[Depends(require_admin)])
+async def update_contact_inquiry_status(inquiry_id: str, update: ContactInquiryStatusUpdate):
+    """Move an inquiry to another status (admin only)"""
+    try:
+        inquiry = await db.contact_inquiries.find_one_and_update(
+            {"id": inquiry_id},
+            {"$set": {"status": update.status, "status_updated_at": datetime.now(timezone.utc)}},
+            projection={"_id": 0, "id": 1, "status": 1, "status_updated_at": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not inquiry:
+            raise HTTPException(status_code=404, detail="Inquiry not found")
+        return ORJSONResponse(inquiry)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update inquiry: {str(e)}")
+
+def services_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the snapshot's validators"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, headers["ETag"])
+    if_modified_since = request.headers.get("if-modified-since")
+    return bool(if_modified_since) and not_modified_since(if_modified_since, headers["Last-Modified"])
+
 @api_router.get("/services", response_model=List[Service])
-async def get_services():
+async def get_services(request: Request, response: Response):
     """Get all available services"""
     try:
-        services = await db.services.find({"is_active": True}).to_list(100)
-        if not services:
-            # Return default services if none exist in database
-            default_services = [
-                {
-                    "id": str(uuid.uuid4()),
-                    "name": "Energy Healing Sessions",
-                    "description": "Personalized energy healing sessions to restore balance and promote natural healing.",
-                    "duration": "60-90 minutes",
-                    "benefits": ["Stress relief", "Energy balance", "Emotional healing", "Physical wellness"],
-                    "is_active": True
-                },
-                {
-                    "id": str(uuid.uuid4()),
-                    "name": "Group Meditation",
-                    "description": "Join our weekly group meditation sessions for community healing and shared spiritual growth.",
-                    "duration": "45 minutes",
-                    "benefits": ["Community connection", "Guided practice", "Spiritual growth", "Inner peace"],
-                    "is_active": True
-                },
-                {
-                    "id": str(uuid.uuid4()),
-                    "name": "Chakra Balancing",
-                    "description": "Specialized chakra alignment and balancing therapy to harmonize your energy centers.",
-                    "duration": "75 minutes",
-                    "benefits": ["Energy alignment", "Chakra balance", "Spiritual clarity", "Physical vitality"],
-                    "is_active": True
-                },
-                {
-                    "id": str(uuid.uuid4()),
-                    "name": "Wellness Consultation",
-                    "description": "Comprehensive wellness assessment and personalized healing plan development.",
-                    "duration": "90 minutes",
-                    "benefits": ["Personalized plan", "Holistic assessment", "Goal setting", "Ongoing support"],
-                    "is_active": True
-                }
-            ]
-            return [Service(**service) for service in default_services]
-        return [Service(**service) for service in services]
+        snapshot = await services_cache.get()
+        headers = {
+            "ETag": snapshot.etag,
+            "Last-Modified": format_datetime(snapshot.last_modified, usegmt=True),
+            "Cache-Control": f"public, max-age={int(SERVICES_CACHE_TTL)}"
+        }
+        # ResponsePolicyMiddleware answers conditionals with the encoding suffix
+        # it adds to the ETag; without it the handler answers them itself
+        if not request.app.state.response_policy and services_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return snapshot.services
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch services: {str(e)}")
 
+@api_router.post("/services", response_model=Service, dependencies=[Depends(require_admin)])
+async def create_service(service: Service):
+    """Create a service (admin only)"""
+    try:
+        await db.services.insert_one(service.model_dump())
+        services_cache.invalidate()
+        return model_response(service)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create service: {str(e)}")
+
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
-    status_dict = input.dict()
-    status_obj = StatusCheck(**status_dict)
-    mongo_data = prepare_for_mongo(status_obj.dict())
-    await db.status_checks.insert_one(mongo_data)
-    return status_obj
+    status_obj = StatusCheck(client_name=input.client_name)
+    await insert_document("status_checks", status_obj.model_dump())
+    return model_response(status_obj)
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+@api_router.get("/status")
+async def get_status_checks(
+    cursor: Optional[str] = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_LIST_PAGE_SIZE),
+    fields: Optional[str] = None,
+    stream: bool = False
+):
+    return await list_documents(db.status_checks, StatusCheck, cursor, limit, fields, stream)
 
 # Cart Management APIs
+def cart_total_stages():
+    """Pipeline stages recomputing cart totals from integer paise unit prices"""
+    return [
+        {"$set": {"total_paise": {"$sum": {"$map": {
+            "input": "$items",
+            "in": {"$multiply": [{"$ifNull": ["$$this.unit_price", 0]}, "$$this.quantity"]}
+        }}}}},
+        {"$set": {"total_amount": {"$divide": ["$total_paise", 100]}}}
+    ]
+
+HOT_CART_MAX_ENTRIES = int(os.environ.get('HOT_CART_MAX_ENTRIES', '10000'))
+HOT_CART_TTL = float(os.environ.get('HOT_CART_TTL', '300'))
+# With several workers, a cart written by another worker reaches this cache
+# only when its change event arrives. Until then a hit is checked against the
+# version stored in Mongo before it is served.
+HOT_CART_VERIFY_READS = os.environ.get(
+    'HOT_CART_VERIFY_READS', '0' if SHARED_STATE_BACKEND == 'local' else '1'
+) == '1'
+
+class HotCartCache:
+    """Write-through LRU of recently active carts, keyed by session id
+
+    Entries hold the serialised Cart so a hit is served without touching
+    Mongo or pydantic. None marks a session known to have no cart. Every
+    mutation bumps the cart's version and an entry is only replaced by an
+    equal or newer version, so a slow read or write finishing late can never
+    put an older cart back into the cache. get() returns the entry's version
+    so callers can check it is still current.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Off until the change bus confirms other workers' writes will reach us
+        self.enabled = False
+        self._entries: "OrderedDict[str, Tuple[float, int, Optional[bytes]]]" = OrderedDict()
+
+    def set_available(self, available: bool):
+        self._entries.clear()
+        self.enabled = available
+
+    def get(self, session_id: str) -> Tuple[bool, int, Optional[bytes]]:
+        if not self.enabled:
+            return False, 0, None
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return False, 0, None
+        expires_at, version, body = entry
+        if expires_at <= time.monotonic():
+            del self._entries[session_id]
+            return False, 0, None
+        self._entries.move_to_end(session_id)
+        return True, version, body
+
+    def put(self, session_id: str, cart: Optional[dict]):
+        if not self.enabled:
+            return
+        version = cart.get("version", 0) if cart else 0
+        current = self._entries.get(session_id)
+        if current is not None and current[1] > version:
+            return
+        body = Cart.model_validate(cart).model_dump_json().encode() if cart else None
+        self._entries[session_id] = (time.monotonic() + self.ttl, version, body)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+hot_carts = HotCartCache(HOT_CART_MAX_ENTRIES, HOT_CART_TTL)
+
+def apply_cart_change(change: dict):
+    """Apply a cart written by any worker to this worker's hot cart cache"""
+    cart = change.get("fullDocument")
+    # Deletes only come from the TTL index, long after HOT_CART_TTL has expired the entry
+    if change["operationType"] in ("insert", "update", "replace") and cart:
+        cart.pop("_id", None)
+        hot_carts.put(cart["session_id"], cart)
+
+change_bus.subscribe("carts", apply_cart_change, hot_carts.set_available)
+
+def cart_session_id(request: Request) -> str:
+    """Cart key taken from the signed session cookie, issuing one when missing
+
+    The session_id path and query parameters are kept for URL compatibility
+    but no longer select the cart, so shoppers cannot read each other's carts.
+    """
+    return get_session(request).id
+
+def empty_cart_response(session_id: str) -> Response:
+    return model_response(Cart(session_id=session_id, items=[], total_amount=0.0))
+
 @api_router.post("/cart")
-async def add_to_cart(cart_item: CartItem, session_id: str = "default"):
+async def add_to_cart(cart_item: CartItem, session_id: str = Depends(cart_session_id)):
     """Add item to cart"""
     try:
-        # Check if cart exists for session
-        existing_cart = await db.carts.find_one({"session_id": session_id})
-        
-        if existing_cart:
-            # Update existing cart
-            items = existing_cart.get("items", [])
-            
-            # Check if item already exists in cart
-            item_found = False
-            for i, item in enumerate(items):
-                if item["product_id"] == cart_item.product_id:
-                    items[i]["quantity"] += cart_item.quantity
-                    item_found = True
-                    break
-            
-            if not item_found:
-                items.append(cart_item.dict())
-            
-            # Calculate total
-            total_amount = sum(float(item["price"].replace("₹", "").replace("$", "")) * item["quantity"] for item in items)
-            
-            await db.carts.update_one(
-                {"session_id": session_id},
+        item = cart_item.model_dump()
+        item["unit_price"] = get_catalog_product(cart_item.product_id).price_paise
+        items = {"$ifNull": ["$items", []]}
+        product_id = {"$literal": cart_item.product_id}
+
+        # Merge the item and recompute the total inside one atomic pipeline update,
+        # so concurrent adds for the same session never lose increments
+        cart = await db.carts.find_one_and_update(
+            {"session_id": session_id},
+            [
                 {"$set": {
-                    "items": items,
-                    "total_amount": total_amount,
-                    "updated_at": datetime.now(timezone.utc).isoformat()
-                }}
-            )
-        else:
-            # Create new cart
-            total_amount = float(cart_item.price.replace("₹", "").replace("$", "")) * cart_item.quantity
-            cart = Cart(
-                session_id=session_id,
-                items=[cart_item],
-                total_amount=total_amount
-            )
-            cart_data = prepare_for_mongo(cart.dict())
-            await db.carts.insert_one(cart_data)
-        
+                    "id": {"$ifNull": ["$id", str(uuid.uuid4())]},
+                    "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+                    "created_at": {"$ifNull": ["$created_at", "$$NOW"]},
+                    "updated_at": "$$NOW",
+                    "items": {"$cond": [
+                        {"$in": [product_id, {"$map": {"input": items, "in": "$$this.product_id"}}]},
+                        {"$map": {"input": items, "in": {"$cond": [
+                            {"$eq": ["$$this.product_id", product_id]},
+                            {"$mergeObjects": ["$$this", {"quantity": {"$min": [
+                                {"$add": ["$$this.quantity", cart_item.quantity]}, MAX_ITEM_QUANTITY
+                            ]}}]},
+                            "$$this"
+                        ]}}},
+                        {"$concatArrays": [items, [{"$literal": item}]]}
+                    ]}
+                }},
+                *cart_total_stages()
+            ],
+            upsert=True,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        hot_carts.put(session_id, cart)
+
         return {"message": "Item added to cart successfully", "status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add item to cart: {str(e)}")
 
 @api_router.get("/cart/{session_id}")
-async def get_cart(session_id: str = "default"):
+async def get_cart(session_id: str = Depends(cart_session_id)):
     """Get cart contents"""
     try:
-        cart = await db.carts.find_one({"session_id": session_id})
+        hit, version, body = hot_carts.get(session_id)
+        if hit and HOT_CART_VERIFY_READS:
+            # Only the version is read, so a current entry still skips loading
+            # and validating the full cart
+            current = await db.carts.find_one({"session_id": session_id}, {"_id": 0, "version": 1})
+            hit = (current.get("version", 0) if current else 0) == version
+        if hit:
+            if body is not None:
+                return Response(body, media_type="application/json")
+            return empty_cart_response(session_id)
+
+        cart = await db.carts.find_one({"session_id": session_id}, {"_id": 0})
+        hot_carts.put(session_id, cart)
         if cart:
-            return Cart(**cart)
+            return model_response(Cart.model_validate(cart))
         else:
             # Return empty cart
-            return Cart(session_id=session_id, items=[], total_amount=0.0)
+            return empty_cart_response(session_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch cart: {str(e)}")
 
 @api_router.delete("/cart/{session_id}")
-async def clear_cart(session_id: str = "default"):
+async def clear_cart(session_id: str = Depends(cart_session_id)):
     """Clear cart"""
     try:
-        await db.carts.delete_one({"session_id": session_id})
+        # Empty the cart in place rather than deleting it so its version keeps
+        # increasing; abandoned carts are removed by the updated_at TTL index
+        cart = await db.carts.find_one_and_update(
+            {"session_id": session_id},
+            [
+                {"$set": {
+                    "items": [],
+                    "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+                    "updated_at": "$$NOW"
+                }},
+                *cart_total_stages()
+            ],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        hot_carts.put(session_id, cart)
         return {"message": "Cart cleared successfully", "status": "success"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to clear cart: {str(e)}")
 
 @api_router.delete("/cart/{session_id}/item/{product_id}")
-async def remove_from_cart(session_id: str, product_id: str):
+async def remove_from_cart(product_id: str, session_id: str = Depends(cart_session_id)):
     """Remove item from cart"""
     try:
-        cart = await db.carts.find_one({"session_id": session_id})
-        if cart:
-            items = [item for item in cart.get("items", []) if item["product_id"] != product_id]
-            total_amount = sum(float(item["price"].replace("₹", "").replace("$", "")) * item["quantity"] for item in items)
-            
-            await db.carts.update_one(
-                {"session_id": session_id},
+        cart = await db.carts.find_one_and_update(
+            {"session_id": session_id},
+            [
                 {"$set": {
-                    "items": items,
-                    "total_amount": total_amount,
-                    "updated_at": datetime.now(timezone.utc).isoformat()
-                }}
-            )
-        
+                    "items": {"$filter": {
+                        "input": {"$ifNull": ["$items", []]},
+                        "cond": {"$ne": ["$$this.product_id", {"$literal": product_id}]}
+                    }},
+                    "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+                    "updated_at": "$$NOW"
+                }},
+                *cart_total_stages()
+            ],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        hot_carts.put(session_id, cart)
+
         return {"message": "Item removed from cart successfully", "status": "success"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to remove item from cart: {str(e)}")
 
 # Payment and Order APIs
+async def create_gateway_order(order_request: CreateOrderRequest) -> dict:
+    """Create the gateway order and store it in the database"""
+    gateway_order = await payment_gateway.create_order({
+        "amount": order_request.amount,
+        "currency": order_request.currency,
+        "payment_capture": 1,
+        "notes": {
+            "customer_name": order_request.customer_info.get("name", ""),
+            "customer_email": order_request.customer_info.get("email", "")
+        }
+    })
+
+    # Store order in database, with the catalog unit prices it was charged at
+    order = Order(
+        order_id=gateway_order["id"],
+        customer_info=order_request.customer_info,
+        items=[
+            item.model_copy(update={"unit_price": get_catalog_product(item.product_id).price_paise})
+            for item in order_request.cart_items
+        ],
+        total_amount=order_request.amount,
+        currency=order_request.currency
+    )
+    order_data = order.model_dump()
+    await db.orders.insert_one(order_data)
+
+    log_event(logger, "order.created", order_id=gateway_order["id"],
+              amount_paise=order_request.amount, demo=payment_gateway.demo)
+    return gateway_order
+
 @api_router.post("/create-order")
-async def create_payment_order(order_request: CreateOrderRequest):
-    """Create Razorpay order"""
+async def create_payment_order(
+    order_request: CreateOrderRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """Create Razorpay order
+
+    With an Idempotency-Key header, retries of the same request return the
+    original order instead of creating another one.
+    """
     try:
-        if not razorpay_client:
-            # Demo mode - simulate order creation
-            demo_order = {
-                "id": f"order_demo_{uuid.uuid4().hex[:10]}",
-                "amount": order_request.amount,
-                "currency": order_request.currency,
-                "status": "created"
-            }
-            
-            # Store order in database
-            order = Order(
-                order_id=demo_order["id"],
-                customer_info=order_request.customer_info,
-                items=order_request.cart_items,
-                total_amount=order_request.amount,
-                currency=order_request.currency
+        expected_amount = order_total_paise(order_request.cart_items)
+        if order_request.amount != expected_amount:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Order amount {order_request.amount} does not match cart total {expected_amount}"
             )
-            order_data = prepare_for_mongo(order.dict())
-            await db.orders.insert_one(order_data)
-            
-            logger.info(f"Demo order created: {demo_order['id']} for amount: ₹{order_request.amount/100}")
-            return demo_order
-        
-        # Create Razorpay order
-        razorpay_order = razorpay_client.order.create({
-            "amount": order_request.amount,
-            "currency": order_request.currency,
-            "payment_capture": 1,
-            "notes": {
-                "customer_name": order_request.customer_info.get("name", ""),
-                "customer_email": order_request.customer_info.get("email", "")
-            }
-        })
-        
-        # Store order in database
-        order = Order(
-            order_id=razorpay_order["id"],
-            customer_info=order_request.customer_info,
-            items=order_request.cart_items,
-            total_amount=order_request.amount,
-            currency=order_request.currency
+
+        if not idempotency_key:
+            return await create_gateway_order(order_request)
+
+        fingerprint = hashlib.sha256(
+            orjson.dumps(order_request.model_dump(), option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()
+        gateway_order, replayed = await idempotency_store.run(
+            "create-order", idempotency_key, fingerprint, lambda: create_gateway_order(order_request)
         )
-        order_data = prepare_for_mongo(order.dict())
-        await db.orders.insert_one(order_data)
-        
-        logger.info(f"Razorpay order created: {razorpay_order['id']}")
-        return razorpay_order
-        
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return gateway_order
+
+    except HTTPException:
+        raise
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyKeyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+    except GatewayUnavailableError as e:
+        logger.error(f"Failed to create order: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Payment gateway unavailable: {str(e)}")
     except Exception as e:
         logger.error(f"Failed to create order: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
@@ -458,42 +1119,24 @@ async def create_payment_order(order_request: CreateOrderRequest):
 async def verify_payment(payment_data: PaymentVerification):
     """Verify payment signature"""
     try:
-        if not razorpay_client:
+        if payment_gateway.demo:
             # Demo mode - simulate successful verification
-            await db.orders.update_one(
-                {"order_id": payment_data.razorpay_order_id},
-                {"$set": {
-                    "status": "paid",
-                    "payment_id": payment_data.razorpay_payment_id,
-                    "updated_at": datetime.now(timezone.utc).isoformat()
-                }}
-            )
-            logger.info(f"Demo payment verified for order: {payment_data.razorpay_order_id}")
+            await mark_order_paid(payment_data.razorpay_order_id, payment_data.razorpay_payment_id)
+            log_event(logger, "payment.verified", order_id=payment_data.razorpay_order_id, demo=True)
             return {"status": "success", "message": "Payment verified successfully (Demo Mode)"}
         
         # Verify payment signature
-        razorpay_client.utility.verify_payment_signature({
-            "razorpay_order_id": payment_data.razorpay_order_id,
-            "razorpay_payment_id": payment_data.razorpay_payment_id,
-            "razorpay_signature": payment_data.razorpay_signature
-        })
-        
-        # Update order status
-        await db.orders.update_one(
-            {"order_id": payment_data.razorpay_order_id},
-            {"$set": {
-                "status": "paid",
-                "payment_id": payment_data.razorpay_payment_id,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
+        await payment_gateway.verify_payment_signature(
+            payment_data.razorpay_order_id,
+            payment_data.razorpay_payment_id,
+            payment_data.razorpay_signature
         )
         
-        # Send confirmation email
-        order = await db.orders.find_one({"order_id": payment_data.razorpay_order_id})
-        if order and order.get("customer_info", {}).get("email"):
-            await send_order_confirmation_email(order)
+        # Update order status; the email is only sent by whichever of this call
+        # and the webhook moves the order to paid first
+        await mark_order_paid(payment_data.razorpay_order_id, payment_data.razorpay_payment_id)
         
-        logger.info(f"Payment verified for order: {payment_data.razorpay_order_id}")
+        log_event(logger, "payment.verified", order_id=payment_data.razorpay_order_id, demo=False)
         return {"status": "success", "message": "Payment verified successfully"}
         
     except Exception as e:
@@ -504,88 +1147,131 @@ async def verify_payment(payment_data: PaymentVerification):
 async def get_order(order_id: str):
     """Get order details"""
     try:
-        order = await db.orders.find_one({"order_id": order_id})
+        order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
+        if not order and ORDER_ARCHIVE_TARGET == 'collection':
+            # Unpaid orders are moved out of db.orders after ORDER_ARCHIVE_AFTER_DAYS
+            order = await db.orders_archive.find_one({"order_id": order_id}, {"_id": 0})
+        # With ORDER_ARCHIVE_TARGET=jsonl archived orders only exist in the files
+        # under ORDER_ARCHIVE_DIR, so they are reported as not found here
         if order:
-            return Order(**order)
+            return model_response(Order.model_validate(order))
         else:
             raise HTTPException(status_code=404, detail="Order not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch order: {str(e)}")
 
 async def send_order_confirmation_email(order_data):
-    """Send order confirmation email"""
-    if RESEND_API_KEY and RESEND_API_KEY != "re_placeholder_key_here":
+    """Queue order confirmation email"""
+    if EMAIL_ENABLED:
         try:
             customer_info = order_data.get("customer_info", {})
-            items_html = ""
-            for item in order_data.get("items", []):
-                items_html += f"""
-                <tr>
-                    <td style="padding: 10px; border-bottom: 1px solid #eee;">{item['name']}</td>
-                    <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: center;">{item['quantity']}</td>
-                    <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: right;">{item['price']}</td>
-                </tr>
-                """
-            
-            html_content = f"""
-            <html>
-            <head>
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #2d5739; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background: linear-gradient(135deg, #2d5739 0%, #4a7c59 100%); color: white; padding: 20px; text-align: center; }}
-                    .content {{ background: #f7f3e9; padding: 20px; }}
-                    .order-table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-                    .order-table th {{ background: #2d5739; color: white; padding: 10px; text-align: left; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>Order Confirmation - Mystic Prana</h1>
-                    </div>
-                    <div class="content">
-                        <h2>Thank you for your order!</h2>
-                        <p><strong>Order ID:</strong> {order_data['order_id']}</p>
-                        <p><strong>Customer:</strong> {customer_info.get('name', 'N/A')}</p>
-                        
-                        <table class="order-table">
-                            <thead>
-                                <tr>
-                                    <th>Product</th>
-                                    <th>Quantity</th>
-                                    <th>Price</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {items_html}
-                            </tbody>
-                        </table>
-                        
-                        <p><strong>Total Amount:</strong> ₹{order_data['total_amount']/100}</p>
-                        <p><strong>Status:</strong> {order_data['status'].title()}</p>
-                        
-                        <p>We'll process your order and send you tracking information soon.</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
+            subject, html_content, text_content = render_order_confirmation_email(order_data)
             email_params = {
                 "from": SENDER_EMAIL,
                 "to": [customer_info.get("email")],
-                "subject": f"Order Confirmation - {order_data['order_id']} - Mystic Prana",
-                "html": html_content
+                "subject": subject,
+                "html": html_content,
+                "text": text_content
             }
             
-            email_result = await asyncio.to_thread(resend.Emails.send, email_params)
-            logger.info(f"Order confirmation email sent to {customer_info.get('email')}")
+            await email_outbox.enqueue(email_params, kind="order_confirmation")
+            log_event(logger, "order_email.queued", order_id=order_data["order_id"])
             
         except Exception as email_error:
-            logger.error(f"Failed to send order confirmation email: {str(email_error)}")
+            logger.error(f"Failed to queue order confirmation email: {str(email_error)}")
     else:
-        logger.info(f"Demo mode: Order confirmation email for order {order_data['order_id']}")
+        log_event(logger, "order_email.simulated", order_id=order_data["order_id"])
+
+async def restore_archived_order(order_id: str, update: dict) -> Optional[dict]:
+    """Move an order archived while unpaid back into db.orders with update applied"""
+    archived = await db.orders_archive.find_one({"order_id": order_id}, {"_id": 0})
+    if archived is None:
+        return None
+    # Restored already updated, so the archiver cannot take it again in between
+    order = {**archived, **update}
+    try:
+        await db.orders.insert_one(order)
+    except DuplicateKeyError:
+        # Restored by a concurrent call for the same payment
+        return None
+    order.pop("_id", None)
+    await db.orders_archive.delete_one({"order_id": order_id})
+    log_event(logger, "order.restored_from_archive", order_id=order_id, status=update.get("status"))
+    return order
+
+async def mark_order_paid(order_id: str, payment_id: Optional[str]):
+    """Move an order to paid in one conditional update and queue its confirmation email"""
+    paid = {"status": "paid", "payment_id": payment_id, "updated_at": datetime.now(timezone.utc)}
+    order = await db.orders.find_one_and_update(
+        {"order_id": order_id, "status": {"$ne": "paid"}},
+        {"$set": paid},
+        return_document=ReturnDocument.AFTER
+    )
+    if order is None:
+        # The payment may arrive after the order was archived as unpaid
+        order = await restore_archived_order(order_id, paid)
+    if order is None and not await db.orders.find_one({"order_id": order_id}, {"_id": 1}):
+        # Unknown order, or archived to JSONL files: keep the payment for manual follow-up
+        logger.error(f"Payment {payment_id} for order {order_id} has no live or archived order")
+        await db.orphan_payments.update_one(
+            {"order_id": order_id, "payment_id": payment_id},
+            {"$setOnInsert": {"received_at": paid["updated_at"]}},
+            upsert=True
+        )
+    if order and order.get("customer_info", {}).get("email"):
+        await send_order_confirmation_email(order)
+    return order
+
+async def mark_order_failed(order_id: str, payment_id: Optional[str]):
+    """Mark a still-unpaid order as failed"""
+    return await db.orders.find_one_and_update(
+        {"order_id": order_id, "status": "created"},
+        {"$set": {
+            "status": "failed",
+            "payment_id": payment_id,
+            "updated_at": datetime.now(timezone.utc)
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def apply_webhook_event(event: dict) -> str:
+    """Apply a Razorpay webhook event to db.orders, returning the outcome"""
+    event_type = event.get("event")
+    payload = event.get("payload", {})
+    payment = payload.get("payment", {}).get("entity", {})
+    if event_type == "order.paid":
+        order_id = payload.get("order", {}).get("entity", {}).get("id") or payment.get("order_id")
+    else:
+        order_id = payment.get("order_id")
+    if not order_id:
+        return "ignored"
+    if event_type in ("payment.captured", "order.paid"):
+        order = await mark_order_paid(order_id, payment.get("id"))
+    elif event_type == "payment.failed":
+        order = await mark_order_failed(order_id, payment.get("id"))
+    else:
+        return "ignored"
+    return "applied" if order else "unchanged"
+
+async def replay_webhook_events(query: Optional[dict] = None, concurrency: int = 10) -> Dict[str, int]:
+    """Re-apply stored webhook events in bulk; safe to repeat since updates are conditional"""
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes: Dict[str, int] = {}
+
+    async def replay(stored):
+        async with semaphore:
+            outcome = await apply_webhook_event(stored["payload"])
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    pending = set()
+    async for stored in db.webhook_events.find(query or {}, {"_id": 0, "payload": 1}).sort("received_at", 1):
+        pending.add(asyncio.create_task(replay(stored)))
+        if len(pending) >= concurrency * 10:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    await asyncio.gather(*pending)
+    return outcomes
 
 @api_router.post("/webhook")
 async def razorpay_webhook(request: Request):
@@ -594,42 +1280,487 @@ async def razorpay_webhook(request: Request):
         payload = await request.body()
         signature = request.headers.get('X-Razorpay-Signature', '')
         
-        if razorpay_client and RAZORPAY_WEBHOOK_SECRET:
-            # Verify webhook signature
-            razorpay_client.utility.verify_webhook_signature(
-                payload.decode(),
-                signature,
-                RAZORPAY_WEBHOOK_SECRET
-            )
-        
-        # Process webhook payload (payment.captured, payment.failed, etc.)
-        # Update order status in database based on webhook event
-        
-        logger.info("Razorpay webhook processed successfully")
-        return {"status": "ok"}
+        if not payment_gateway.demo:
+            # Webhooks change orders, so a live gateway only accepts signed ones
+            if not RAZORPAY_WEBHOOK_SECRET:
+                logger.error("Rejected webhook: RAZORPAY_WEBHOOK_SECRET is not set")
+                raise HTTPException(status_code=401, detail="Webhook signature cannot be verified")
+            try:
+                await verify_signature_async(RAZORPAY_WEBHOOK_SECRET, payload, signature)
+            except SignatureVerificationError:
+                raise HTTPException(status_code=401, detail="Invalid webhook signature")
         
+        event = orjson.loads(payload)
+        if not isinstance(event, dict):
+            raise HTTPException(status_code=400, detail="Webhook payload must be a JSON object")
+        event_id = request.headers.get('X-Razorpay-Event-Id') or hashlib.sha256(payload).hexdigest()
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Webhook processing failed: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Webhook processing failed: {str(e)}")
+    
+    # Record the event first; the unique event_id index drops redeliveries
+    try:
+        await db.webhook_events.insert_one({
+            "event_id": event_id,
+            "event": event.get("event"),
+            "payload": event,
+            "received_at": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        log_event(logger, "webhook.duplicate", event_id=event_id)
+        return {"status": "ok", "duplicate": True}
+    
+    try:
+        outcome = await apply_webhook_event(event)
+        await db.webhook_events.update_one(
+            {"event_id": event_id},
+            {"$set": {"outcome": outcome, "processed_at": datetime.now(timezone.utc)}}
+        )
+        log_event(logger, "webhook.processed", event_id=event_id, webhook_event=event.get("event"), outcome=outcome)
+        return {"status": "ok"}
+    except Exception as e:
+        # Forget the event so Razorpay's retry is processed again
+        await db.webhook_events.delete_one({"event_id": event_id})
+        logger.error(f"Webhook processing failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
 
-# Include the router in the main app
-app.include_router(api_router)
+# Every worker starts the periodic loops; each run first takes a per-task lease
+# so only one worker does the work. A lease outlives two intervals, so the
+# holder renews it before it lapses and another worker takes over if it dies.
+async def run_if_leased(name: str, interval: float, task):
+    if await task_leases.acquire(name, interval * 2):
+        return await task()
+    return None
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Order reconciliation against the payment gateway
+RECONCILE_INTERVAL_SECONDS = float(os.environ.get('RECONCILE_INTERVAL_SECONDS', '0'))  # 0 disables the periodic task
+RECONCILE_STALE_MINUTES = float(os.environ.get('RECONCILE_STALE_MINUTES', '15'))
+RECONCILE_FAIL_AFTER_HOURS = float(os.environ.get('RECONCILE_FAIL_AFTER_HOURS', '24'))
+
+async def reconcile_batch(orders: List[dict], semaphore: asyncio.Semaphore, run_id: str, stats: Dict[str, float]):
+    """Look up a batch of stale orders at the gateway and apply fixes in one bulk_write"""
+    fail_cutoff = datetime.now(timezone.utc) - timedelta(hours=RECONCILE_FAIL_AFTER_HOURS)
+
+    async def check(order):
+        async with semaphore:
+            try:
+                return order, await payment_gateway.fetch_order_payments(order["order_id"])
+            except Exception as e:
+                logger.error(f"Reconciliation lookup failed for {order['order_id']}: {str(e)}")
+                stats["errors"] += 1
+                return order, None
+
+    now = datetime.now(timezone.utc)
+    operations = []
+    for order, payments in await asyncio.gather(*(check(order) for order in orders)):
+        if payments is None:
+            continue
+        items = payments.get("items", [])
+        captured = next((payment for payment in items if payment.get("status") == "captured"), None)
+        if captured:
+            update = {"status": "paid", "payment_id": captured["id"]}
+        elif items and all(payment.get("status") == "failed" for payment in items) and order["created_at"] < fail_cutoff:
+            update = {"status": "failed", "payment_id": items[-1]["id"]}
+        else:
+            continue
+        operations.append(UpdateOne(
+            {"order_id": order["order_id"], "status": "created"},
+            {"$set": {**update, "updated_at": now, "reconciled_by": run_id}}
+        ))
+
+    if operations:
+        result = await db.orders.bulk_write(operations, ordered=False)
+        stats["fixed"] += result.modified_count
+
+async def reconcile_orders(batch_size: int = 100, concurrency: int = 10) -> Dict[str, float]:
+    """Repair orders stuck in "created" whose payment completed or failed at the gateway"""
+    run_id = str(uuid.uuid4())
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=RECONCILE_STALE_MINUTES)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"scanned": 0, "fixed": 0, "errors": 0}
+    start = time.perf_counter()
+
+    orders = db.orders.find(
+        {"status": "created", "created_at": {"$lt": cutoff}},
+        {"_id": 0, "order_id": 1, "created_at": 1}
+    ).batch_size(batch_size)
+    batch = []
+    async for order in orders:
+        batch.append(order)
+        if len(batch) >= batch_size:
+            await reconcile_batch(batch, semaphore, run_id, stats)
+            stats["scanned"] += len(batch)
+            batch = []
+    if batch:
+        await reconcile_batch(batch, semaphore, run_id, stats)
+        stats["scanned"] += len(batch)
+
+    # Orders this run moved to paid still need their confirmation email
+    async for order in db.orders.find({"reconciled_by": run_id, "status": "paid"}):
+        if order.get("customer_info", {}).get("email"):
+            await send_order_confirmation_email(order)
+
+    elapsed = time.perf_counter() - start
+    stats["elapsed_seconds"] = round(elapsed, 3)
+    stats["orders_per_second"] = round(stats["scanned"] / elapsed, 1) if elapsed else 0.0
+    logger.info(f"Order reconciliation {run_id}: {stats}")
+    return stats
+
+async def run_periodic_reconciliation():
+    while True:
+        await asyncio.sleep(RECONCILE_INTERVAL_SECONDS)
+        try:
+            await run_if_leased("reconcile_orders", RECONCILE_INTERVAL_SECONDS, reconcile_orders)
+        except Exception as e:
+            logger.error(f"Order reconciliation failed: {str(e)}")
+
+# Daily analytics rollups, refreshed incrementally in the background
+ANALYTICS_TIMEZONE = os.environ.get('ANALYTICS_TIMEZONE', 'Asia/Kolkata')
+ANALYTICS_REFRESH_SECONDS = float(os.environ.get('ANALYTICS_REFRESH_SECONDS', '300'))  # 0 disables the periodic task
+analytics = AnalyticsRollups(db, tz=ANALYTICS_TIMEZONE)
+
+async def run_periodic_analytics_refresh():
+    while True:
+        try:
+            result = await run_if_leased("refresh_analytics", ANALYTICS_REFRESH_SECONDS, analytics.refresh)
+            if result:
+                logger.info(f"Analytics rollups refreshed: {result['refreshed']}")
+        except Exception as e:
+            logger.error(f"Analytics refresh failed: {str(e)}")
+        await asyncio.sleep(ANALYTICS_REFRESH_SECONDS)
+
+# Data lifecycle: bounded status check storage and archival of unpaid orders.
+# Orders still in "created" after ORDER_ARCHIVE_AFTER_DAYS are moved to the
+# orders_archive collection, or to gzip JSONL files under ORDER_ARCHIVE_DIR.
+STATUS_CHECKS_STORAGE = os.environ.get('STATUS_CHECKS_STORAGE', 'timeseries')  # timeseries, capped or plain
+STATUS_CHECKS_RETENTION_DAYS = int(os.environ.get('STATUS_CHECKS_RETENTION_DAYS', '30'))
+STATUS_CHECKS_CAPPED_MB = int(os.environ.get('STATUS_CHECKS_CAPPED_MB', '64'))
+ORDER_ARCHIVE_AFTER_DAYS = float(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', '30'))
+ORDER_ARCHIVE_TARGET = os.environ.get('ORDER_ARCHIVE_TARGET', 'collection')  # collection or jsonl
+ORDER_ARCHIVE_DIR = os.environ.get('ORDER_ARCHIVE_DIR', str(ROOT_DIR / 'archive'))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.environ.get('ORDER_ARCHIVE_BATCH_SIZE', '500'))
+ORDER_ARCHIVE_DUTY_CYCLE = float(os.environ.get('ORDER_ARCHIVE_DUTY_CYCLE', '0.2'))
+ORDER_ARCHIVE_INTERVAL_SECONDS = float(os.environ.get('ORDER_ARCHIVE_INTERVAL_SECONDS', '0'))  # 0 disables the periodic task
+LIFECYCLE_COLLECTIONS = ["carts", "status_checks", "orders", "orders_archive"]
+
+def create_order_archiver(batch_size: int = ORDER_ARCHIVE_BATCH_SIZE, duty_cycle: float = ORDER_ARCHIVE_DUTY_CYCLE) -> OrderArchiver:
+    if ORDER_ARCHIVE_TARGET == 'jsonl':
+        sink = JsonlArchiveSink(ORDER_ARCHIVE_DIR)
+    else:
+        sink = CollectionArchiveSink(db.orders_archive)
+    return OrderArchiver(
+        db.orders, sink, batch_size=batch_size, duty_cycle=duty_cycle, on_archived=analytics.mark_orders_archived
+    )
+
+async def archive_orders(max_batches: Optional[int] = None, **options) -> Dict[str, float]:
+    """Archive orders left in "created" for longer than ORDER_ARCHIVE_AFTER_DAYS"""
+    # Never earlier than the reconciler's window, so it has settled every order it can
+    days = max(ORDER_ARCHIVE_AFTER_DAYS, RECONCILE_FAIL_AFTER_HOURS / 24)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    stats = await create_order_archiver(**options).run(cutoff, max_batches=max_batches)
+    log_event(logger, "orders.archived", target=ORDER_ARCHIVE_TARGET, **stats)
+    return stats
+
+async def run_periodic_order_archival():
+    while True:
+        await asyncio.sleep(ORDER_ARCHIVE_INTERVAL_SECONDS)
+        try:
+            await run_if_leased("archive_orders", ORDER_ARCHIVE_INTERVAL_SECONDS, archive_orders)
+        except Exception as e:
+            logger.error(f"Order archival failed: {str(e)}")
+
+reconcile_task: Optional[asyncio.Task] = None
+analytics_task: Optional[asyncio.Task] = None
+archive_task: Optional[asyncio.Task] = None
+monitor_task: Optional[asyncio.Task] = None
+
+@api_router.post("/admin/reconcile-orders", dependencies=[Depends(require_admin)])
+async def trigger_reconciliation():
+    """Run order reconciliation now (admin only)"""
+    try:
+        return await reconcile_orders()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to reconcile orders: {str(e)}")
+
+@api_router.post("/admin/analytics/refresh", dependencies=[Depends(require_admin)])
+async def refresh_analytics():
+    """Recompute analytics rollups for days changed since the last refresh (admin only)"""
+    try:
+        return await analytics.refresh()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to refresh analytics: {str(e)}")
+
+@api_router.get("/admin/analytics/orders", dependencies=[Depends(require_admin)])
+async def get_orders_analytics(start: Optional[date] = None, end: Optional[date] = None):
+    """Order counts and amounts by status per day (admin only, defaults to the last 30 days)"""
+    try:
+        return await analytics.orders_by_day(start, end)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch order analytics: {str(e)}")
+
+@api_router.get("/admin/analytics/revenue-by-product", dependencies=[Depends(require_admin)])
+async def get_revenue_by_product(start: Optional[date] = None, end: Optional[date] = None):
+    """Paid quantity and revenue per product (admin only)"""
+    try:
+        return await analytics.revenue_by_product(start, end)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch revenue analytics: {str(e)}")
+
+@api_router.get("/admin/analytics/inquiries", dependencies=[Depends(require_admin)])
+async def get_inquiries_analytics(start: Optional[date] = None, end: Optional[date] = None):
+    """Contact inquiries per service interest (admin only)"""
+    try:
+        return await analytics.inquiries_by_service(start, end)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch inquiry analytics: {str(e)}")
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+@api_router.get("/admin/analytics/cart-abandonment", dependencies=[Depends(require_admin)])
+async def get_cart_abandonment(start: Optional[date] = None, end: Optional[date] = None):
+    """Carts created versus paid orders, overall and per day (admin only)"""
+    try:
+        return await analytics.cart_abandonment(start, end)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch cart analytics: {str(e)}")
+
+@api_router.post("/admin/archive-orders", dependencies=[Depends(require_admin)])
+async def trigger_order_archival(max_batches: Optional[int] = Query(None, ge=1)):
+    """Archive stale unpaid orders now (admin only)"""
+    try:
+        return await archive_orders(max_batches=max_batches)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to archive orders: {str(e)}")
+
+@api_router.get("/admin/lifecycle", dependencies=[Depends(require_admin)])
+async def get_lifecycle_report():
+    """Size of the collections under lifecycle management (admin only)"""
+    try:
+        return {
+            "status_checks_storage": STATUS_CHECKS_STORAGE,
+            "order_archive_target": ORDER_ARCHIVE_TARGET,
+            "collections": await collection_sizes(db, LIFECYCLE_COLLECTIONS),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build lifecycle report: {str(e)}")
+
+@api_router.get("/admin/exports/orders", dependencies=[Depends(require_admin)])
+async def export_orders(
+    format: str = Query("csv", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = Query(None, description="Comma separated statuses"),
+    after: Optional[str] = Query(None, description="Resume after this order_id"),
+    chunk_size: int = Query(5000, ge=100, le=50000)
+):
+    """Stream orders as CSV, JSONL or Parquet, one row per line item, oldest first (admin only)"""
+    try:
+        statuses = [value.strip() for value in status.split(",") if value.strip()] if status else None
+        export = OrderExport(db.orders, start=start, end=end, statuses=statuses, chunk_size=chunk_size)
+        position = None
+        if after:
+            position = await export.position_of(after)
+            if not position:
+                raise HTTPException(status_code=400, detail="Unknown order_id in after")
+        if format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise HTTPException(status_code=400, detail="Parquet exports need pyarrow installed on the server")
+        filename = f"orders-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.{format}"
+        return StreamingResponse(
+            export.stream(format, position),
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to export orders: {str(e)}")
+
+@api_router.get("/admin/indexes", dependencies=[Depends(require_admin)])
+async def get_index_report():
+    """Declared indexes and the winning plan of each endpoint query (admin only)"""
+    try:
+        declared = {
+            collection_name: [
+                {"name": spec["options"]["name"], "keys": spec["keys"], "endpoints": spec["endpoints"]}
+                for spec in specs
+            ]
+            for collection_name, specs in INDEX_SPECS.items()
+        }
+        return {"indexes": declared, "plans": await explain_endpoint_queries()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build index report: {str(e)}")
+
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def validate_settings():
+    """Refuse to start with settings that are unsafe in production"""
+    problems = []
+    if not payment_gateway.demo and not RAZORPAY_WEBHOOK_SECRET:
+        problems.append("RAZORPAY_WEBHOOK_SECRET must be set when live Razorpay keys are configured")
+    if SESSION_SECRET_GENERATED and (WEB_CONCURRENCY > 1 or not payment_gateway.demo):
+        problems.append("SESSION_SECRET must be set when running more than one worker or with live Razorpay keys")
+    if problems:
+        raise RuntimeError("; ".join(problems))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open this worker's connections and background tasks, and close them on shutdown"""
+    global reconcile_task, analytics_task, archive_task, monitor_task
+    validate_settings()
+    connect_database()
+    await change_bus.start(db)
+    try:
+        # Before ensure_indexes, which would create a plain collection
+        await ensure_status_checks_collection(
+            db,
+            storage=STATUS_CHECKS_STORAGE,
+            retention_seconds=STATUS_CHECKS_RETENTION_DAYS * 24 * 3600,
+            capped_size_bytes=STATUS_CHECKS_CAPPED_MB * 1024 * 1024
+        )
+    except Exception as e:
+        logger.error(f"Failed to create status_checks collection: {str(e)}")
+    await ensure_indexes()
+    # After ensure_indexes, so the catalog seed relies on the unique product_id index
+    await load_product_catalog()
+    email_outbox.start()
+    if RECONCILE_INTERVAL_SECONDS > 0:
+        reconcile_task = asyncio.create_task(run_periodic_reconciliation())
+    if ANALYTICS_REFRESH_SECONDS > 0:
+        analytics_task = asyncio.create_task(run_periodic_analytics_refresh())
+    if ORDER_ARCHIVE_INTERVAL_SECONDS > 0:
+        archive_task = asyncio.create_task(run_periodic_order_archival())
+    monitor_task = asyncio.create_task(monitor_event_loop())
+    try:
+        yield
+    finally:
+        if monitor_task:
+            monitor_task.cancel()
+        if reconcile_task:
+            reconcile_task.cancel()
+        if analytics_task:
+            analytics_task.cancel()
+        if archive_task:
+            archive_task.cancel()
+        for name in ("reconcile_orders", "refresh_analytics", "archive_orders"):
+            try:
+                await task_leases.release(name)
+            except Exception as e:
+                logger.error(f"Failed to release task lease {name}: {str(e)}")
+        await email_outbox.stop()
+        for writer in group_writers.values():
+            await writer.close()
+        await payment_gateway.close()
+        await change_bus.stop()
+        if client:
+            client.close()
+
+# Response policy: Cache-Control per endpoint, content-hash ETags with 304s for
+# the endpoints listed in ETAG_ROUTES, and gzip/brotli above a size threshold
+RESPONSE_POLICY_ENABLED = os.environ.get('RESPONSE_POLICY', '1') == '1'
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+CORS_MAX_AGE = int(os.environ.get('CORS_MAX_AGE', '600'))
+CACHE_RULES = {
+    "root": "public, max-age=300",
+    "get_cart": "private, no-cache",
+    "get_order": "private, no-cache",
+    "get_contact_inquiries": "private, no-cache",
+    "search_contact_inquiries": "private, no-cache",
+    "get_status_checks": "private, no-cache",
+    "get_orders_analytics": "private, max-age=60",
+    "get_revenue_by_product": "private, max-age=60",
+    "get_inquiries_analytics": "private, max-age=60",
+    "get_cart_abandonment": "private, max-age=60",
+    "get_index_report": "no-store",
+    "get_lifecycle_report": "no-store",
+    "export_orders": "no-store",
+    "create_payment_order": "no-store",
+    "verify_payment": "no-store",
+    "metrics": "no-store",
+}
+ETAG_ROUTES = (
+    "root", "get_cart", "get_order", "get_contact_inquiries", "get_status_checks",
+    "get_orders_analytics", "get_revenue_by_product", "get_inquiries_analytics", "get_cart_abandonment",
 )
-logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+# Admission control for public write endpoints: token buckets per client IP and
+# per session, one bucket per route shared by requests without an established
+# session, and a cap on in-flight requests per route in each worker.
+# RATE_LIMIT_BACKEND=mongo shares the buckets between workers. Per-IP buckets
+# key on the socket peer; behind a proxy or ingress, list it in TRUSTED_PROXIES
+# (comma separated addresses or CIDR ranges) so they key on the forwarded
+# client instead of every request sharing the proxy's bucket.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+TRUSTED_PROXIES = [value for value in os.environ.get('TRUSTED_PROXIES', '').split(',') if value.strip()]
+RATE_LIMIT_PER_IP = os.environ.get('RATE_LIMIT_PER_IP', '1') == '1'
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'local')
+if RATE_LIMIT_BACKEND == 'mongo':
+    rate_limit_store = MongoBucketStore(db.rate_limits)
+else:
+    rate_limit_store = LocalBucketStore(max_keys=int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000')))
+ADMISSION_RULES = {
+    ("POST", "/api/contact"): {"ip": (5 / 60, 5), "concurrency": 50},
+    ("POST", "/api/cart"): {"ip": (10, 50), "session": (2, 20), "new_session": (20, 100), "concurrency": 200},
+    ("POST", "/api/create-order"): {
+        "ip": (10 / 60, 10), "session": (5 / 60, 5), "new_session": (1, 20), "concurrency": 50
+    },
+}
+
+def create_app(response_policy: bool = RESPONSE_POLICY_ENABLED) -> FastAPI:
+    """Build the ASGI app; nothing connects until the lifespan starts"""
+    app = FastAPI(
+        title="Mystic Prana API",
+        description="API for Mystic Prana Energy Healing Center",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
+    )
+    app.include_router(api_router)
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+    app.state.response_policy = response_policy
+
+    # Inside the session middleware so session buckets can see the cookie, and
+    # inside CORS so browsers can read the 429/503 responses
+    app.add_middleware(
+        AdmissionMiddleware,
+        rules=ADMISSION_RULES,
+        store=rate_limit_store,
+        enabled=RATE_LIMIT_ENABLED,
+        ip_limits=RATE_LIMIT_PER_IP,
+        trusted_proxies=TRUSTED_PROXIES
+    )
+
+    app.add_middleware(
+        SessionMiddleware,
+        secret=SESSION_SECRET,
+        cookie_name=SESSION_COOKIE_NAME,
+        max_age=CART_TTL_SECONDS,
+        secure=SESSION_COOKIE_SECURE,
+        same_site=SESSION_COOKIE_SAMESITE
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        max_age=CORS_MAX_AGE,
+    )
+
+    if response_policy:
+        app.add_middleware(
+            ResponsePolicyMiddleware,
+            cache_rules=CACHE_RULES,
+            etag_routes=ETAG_ROUTES,
+            minimum_size=COMPRESSION_MIN_SIZE
+        )
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(RequestIdMiddleware)
+    return app
+
+app = create_app()
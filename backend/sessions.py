@@ -0,0 +1,109 @@
+"""Signed cookie sessions.
+
+SessionMiddleware reads a session id from an HMAC-signed cookie and exposes
+it to handlers through get_session(request). A new id is only issued, and
+the cookie only set, when a handler actually uses the session.
+"""
+import hashlib
+import hmac
+import secrets
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from starlette.requests import Request
+
+
+class SessionSigner:
+    def __init__(self, secret: str):
+        self.key = secret.encode()
+
+    def _signature(self, session_id: str) -> str:
+        return hmac.new(self.key, session_id.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def sign(self, session_id: str) -> str:
+        return f"{session_id}.{self._signature(session_id)}"
+
+    def unsign(self, token: str) -> Optional[str]:
+        session_id, _, signature = token.rpartition(".")
+        if session_id and hmac.compare_digest(self._signature(session_id), signature):
+            return session_id
+        return None
+
+
+class Session:
+    def __init__(self, session_id: Optional[str]):
+        self._id = session_id
+        self.is_new = session_id is None
+
+    @property
+    def id(self) -> str:
+        if self._id is None:
+            self._id = secrets.token_urlsafe(18)
+        return self._id
+
+    @property
+    def issued(self) -> bool:
+        """True when a new id was handed out during this request"""
+        return self.is_new and self._id is not None
+
+
+class SessionMiddleware:
+    def __init__(
+        self,
+        app,
+        secret: str,
+        cookie_name: str = "mp_session",
+        max_age: int = 30 * 24 * 3600,
+        secure: bool = False,
+        same_site: str = "lax",
+    ):
+        self.app = app
+        self.signer = SessionSigner(secret)
+        self.cookie_name = cookie_name
+        self.max_age = max_age
+        self.secure = secure
+        self.same_site = same_site
+
+    def _read(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"cookie":
+                cookie = SimpleCookie()
+                try:
+                    cookie.load(value.decode("latin-1"))
+                except Exception:
+                    return None
+                if self.cookie_name in cookie:
+                    return self.signer.unsign(cookie[self.cookie_name].value)
+        return None
+
+    def _cookie_header(self, session_id: str) -> bytes:
+        parts = [
+            f"{self.cookie_name}={self.signer.sign(session_id)}",
+            "Path=/",
+            f"Max-Age={self.max_age}",
+            "HttpOnly",
+            f"SameSite={self.same_site.capitalize()}",
+        ]
+        if self.secure:
+            parts.append("Secure")
+        return "; ".join(parts).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        session = Session(self._read(scope))
+        scope.setdefault("state", {})["session"] = session
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and session.issued:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", self._cookie_header(session.id))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def get_session(request: Request) -> Session:
+    return request.state.session
@@ -0,0 +1,94 @@
+"""Cross-worker propagation of changes that invalidate in-process caches.
+
+Each worker keeps its own caches, so a write handled by one worker must
+reach the caches of the others. Handlers subscribe per collection; the
+backend decides how changes are delivered:
+
+- LocalChangeBus: a single worker. Writes already update the local caches,
+  so nothing is delivered and caches are always trusted.
+- ChangeStreamBus: a Mongo change stream per subscribed collection (needs a
+  replica set). While a stream is down, handlers are told to stop trusting
+  their caches until it resumes.
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+ChangeHandler = Callable[[dict], None]
+# Called with True once changes are flowing again and False when they stop
+AvailabilityHandler = Callable[[bool], None]
+
+
+class LocalChangeBus:
+    name = "local"
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Tuple[ChangeHandler, AvailabilityHandler]]] = {}
+
+    def subscribe(self, collection_name: str, on_change: ChangeHandler, on_availability: AvailabilityHandler):
+        self.handlers.setdefault(collection_name, []).append((on_change, on_availability))
+
+    async def start(self, database):
+        for handlers in self.handlers.values():
+            for _, on_availability in handlers:
+                on_availability(True)
+
+    async def stop(self):
+        pass
+
+
+class ChangeStreamBus(LocalChangeBus):
+    name = "changestream"
+
+    def __init__(self, retry_delay: float = 5.0):
+        super().__init__()
+        self.retry_delay = retry_delay
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self, database):
+        for collection_name, handlers in self.handlers.items():
+            self.tasks.append(asyncio.create_task(self._watch(database[collection_name], handlers)))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def _notify(self, handlers, available: bool):
+        for _, on_availability in handlers:
+            on_availability(available)
+
+    async def _watch(self, collection, handlers):
+        resume_token: Optional[dict] = None
+        while True:
+            try:
+                async with collection.watch(full_document="updateLookup", resume_after=resume_token) as stream:
+                    self._notify(handlers, True)
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        for on_change, _ in handlers:
+                            try:
+                                on_change(change)
+                            except Exception as e:
+                                logger.error(f"Change handler for {collection.name} failed: {str(e)}")
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning(f"Change stream on {collection.name} unavailable, retrying: {str(e)}")
+                # The token may have rolled off the oplog; start fresh next time
+                resume_token = None
+            self._notify(handlers, False)
+            await asyncio.sleep(self.retry_delay)
+
+
+def create_change_bus(backend: str):
+    if backend == "changestream":
+        return ChangeStreamBus()
+    if backend == "local":
+        return LocalChangeBus()
+    raise ValueError(f"Unknown shared state backend: {backend}")
@@ -0,0 +1,173 @@
+"""Non-blocking structured logging.
+
+configure_logging() routes every record through a QueueHandler. The event
+loop thread only attaches the current request id, applies sampling and
+enqueues the record. A QueueListener thread formats each record as one JSON
+line and writes it to stderr.
+
+Handlers log events with log_event(logger, "contact_inquiry.created",
+inquiry_id=...), which builds nothing when the level is disabled and keeps
+the fields structured instead of formatted into the message. A sample rate
+per event (LOG_SAMPLE_RATES="contact_inquiry.created=0.1,...") thins out
+high-volume events. Warnings and errors are never sampled.
+"""
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user supplied fields
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "event", "fields"}
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """Log one structured event; nothing is built when the level is disabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"event": event, "fields": fields})
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for part in value.split(","):
+        event, _, rate = part.partition("=")
+        if event.strip() and rate.strip():
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+        else:
+            entry["message"] = record.getMessage()
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", None) or {})
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and key not in entry and key != "request_id":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable format for local development, with the event fields appended"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if getattr(record, "request_id", None):
+            line += f" request_id={record.request_id}"
+        return line
+
+
+class RequestContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records without formatting them on the calling thread"""
+
+    def __init__(self, log_queue, sample_rates: Dict[str, float]):
+        super().__init__(log_queue)
+        self.sample_rates = sample_rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and self.sample_rates:
+            rate = self.sample_rates.get(getattr(record, "event", None) or "")
+            if rate is not None and random.random() >= rate:
+                return False
+            if rate is not None:
+                record.sample_rate = rate
+        return super().filter(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener thread formats the record; only capture the context here
+        record.request_id = request_id.get()
+        return record
+
+
+def configure_logging(
+    level: str = "INFO",
+    fmt: str = "json",
+    sample_rates: Optional[Dict[str, float]] = None,
+    pipeline: str = "queue",
+):
+    """Install the root handler; with the queue pipeline, start the writer thread
+
+    pipeline="sync" writes from the calling thread instead, for debugging and
+    for comparing against the queue in benchmarks.
+    """
+    formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+    if pipeline == "sync":
+        stream_handler.addFilter(RequestContextFilter())
+        root.addHandler(stream_handler)
+        return None
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    root.addHandler(SamplingQueueHandler(log_queue, sample_rates or {}))
+    listener.start()
+
+    def flush_on_exit():
+        if listener._thread is not None:
+            listener.stop()
+    atexit.register(flush_on_exit)
+    return listener
+
+
+class RequestIdMiddleware:
+    """Binds a request id (X-Request-ID, or a new one) to the request's log records and response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = next((value for name, value in scope["headers"] if name == b"x-request-id"), None)
+        current = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex
+        token = request_id.set(current)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", current.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(token)
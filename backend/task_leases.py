@@ -0,0 +1,39 @@
+"""Mongo leases so only one worker runs each periodic task.
+
+Every worker process starts the same background loops. Before each run a
+loop takes the lease named after its task: one document per task, keyed by
+name, holding the owner and an expiry. The holder renews it on every run;
+the other workers skip their run until the holder stops renewing and the
+lease expires, so a dead worker's tasks are picked up by another one.
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+
+class TaskLeases:
+    def __init__(self, collection, owner: str = None):
+        self.collection = collection
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self, name: str, ttl: float) -> bool:
+        """Take or renew the lease on name for ttl seconds; False if another worker holds it"""
+        now = datetime.now(timezone.utc)
+        try:
+            # Matches a lease this worker holds or one that has expired; otherwise
+            # the upsert collides with the holder's document on _id
+            await self.collection.find_one_and_update(
+                {"_id": name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=ttl), "renewed_at": now}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def release(self, name: str):
+        """Give the lease up so another worker can take it without waiting for the expiry"""
+        await self.collection.delete_one({"_id": name, "owner": self.owner})
@@ -79,7 +79,10 @@ const initialState = {
 
 export const CartProvider = ({ children }) => {
   const [state, dispatch] = useReducer(cartReducer, initialState);
-  const sessionId = 'default'; // In production, this would be a unique session ID
+  // The backend keys carts by a signed session cookie; the id in the URL is kept
+  // only for route compatibility
+  const sessionId = 'current';
+  const withSession = { withCredentials: true };
 
   // Load cart from backend on component mount
   useEffect(() => {
@@ -89,7 +92,7 @@ export const CartProvider = ({ children }) => {
   const loadCart = async () => {
     try {
       dispatch({ type: 'SET_LOADING', payload: true });
-      const response = await axios.get(`${API}/cart/${sessionId}`);
+      const response = await axios.get(`${API}/cart/${sessionId}`, withSession);
       dispatch({ type: 'SET_CART', payload: response.data });
     } catch (error) {
       console.error('Failed to load cart:', error);
@@ -107,7 +110,7 @@ export const CartProvider = ({ children }) => {
         image: product.image
       };
 
-      await axios.post(`${API}/cart?session_id=${sessionId}`, cartItem);
+      await axios.post(`${API}/cart`, cartItem, withSession);
       
       // Reload cart to get updated data
       await loadCart();
@@ -121,7 +124,7 @@ export const CartProvider = ({ children }) => {
 
   const removeFromCart = async (productId) => {
     try {
-      await axios.delete(`${API}/cart/${sessionId}/item/${productId}`);
+      await axios.delete(`${API}/cart/${sessionId}/item/${productId}`, withSession);
       dispatch({ type: 'REMOVE_ITEM', payload: productId });
       toast.success('Item removed from cart');
     } catch (error) {
@@ -148,7 +151,7 @@ export const CartProvider = ({ children }) => {
 
   const clearCart = async () => {
     try {
-      await axios.delete(`${API}/cart/${sessionId}`);
+      await axios.delete(`${API}/cart/${sessionId}`, withSession);
       dispatch({ type: 'CLEAR_CART' });
       toast.success('Cart cleared');
     } catch (error) {
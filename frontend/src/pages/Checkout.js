@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useCart } from '../context/CartContext';
 import { Button } from '../components/ui/button';
 import { Card, CardContent } from '../components/ui/card';
@@ -27,6 +27,8 @@ const Checkout = () => {
   const [isProcessing, setIsProcessing] = useState(false);
   const [orderComplete, setOrderComplete] = useState(false);
   const [orderId, setOrderId] = useState('');
+  // Retries of the same order reuse its Idempotency-Key so the backend never creates it twice
+  const idempotency = useRef({ payload: null, key: null });
 
   const handleInputChange = (e) => {
     const { name, value } = e.target;
@@ -66,7 +68,13 @@ const Checkout = () => {
         cart_items: items
       };
 
-      const orderResponse = await axios.post(`${API}/create-order`, orderData);
+      const payload = JSON.stringify(orderData);
+      if (idempotency.current.payload !== payload) {
+        idempotency.current = { payload, key: crypto.randomUUID() };
+      }
+      const orderResponse = await axios.post(`${API}/create-order`, orderData, {
+        headers: { 'Idempotency-Key': idempotency.current.key }
+      });
       const order = orderResponse.data;
 
       // Demo mode simulation
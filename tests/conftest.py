@@ -0,0 +1,58 @@
+"""Shared fixtures: the backend package on sys.path and the app bound to mongomock.
+
+mongomock has no pipeline updates, $merge or $text, so tests stay clear of
+add_to_cart and text search; tests/test_query_plans.py runs against a real
+mongod when TEST_MONGO_URL is set.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# server.py reads its settings at import time
+os.environ.update({
+    "MONGO_URL": "mongodb://localhost:27017",
+    "DB_NAME": "mystic_prana_test",
+    "PAYMENT_GATEWAY": "fake",
+    "EMAIL_TRANSPORT": "local",
+    "RATE_LIMIT_ENABLED": "0",
+    "SESSION_SECRET": "test-session-secret",
+    "ADMIN_TOKEN": "test-admin-token",
+    "LOG_LEVEL": "WARNING",
+})
+os.environ.pop("RAZORPAY_WEBHOOK_SECRET", None)
+
+ADMIN_HEADERS = {"Authorization": "Bearer test-admin-token"}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def server():
+    """server.py with its database bound to a fresh mongomock database"""
+    import server
+    from mongomock_motor import AsyncMongoMockClient
+
+    server.db.bind(AsyncMongoMockClient(tz_aware=True)["mystic_prana_test"])
+    server.product_catalog.clear()
+    server.product_catalog.update({
+        product["product_id"]: server.Product(**product, price_paise=server.price_to_paise(product["price"]))
+        for product in server.DEFAULT_PRODUCTS
+    })
+    server.services_cache.snapshot = None
+    yield server
+    server.db.bind(None)
+
+
+@pytest.fixture
+def client(server):
+    from fastapi.testclient import TestClient
+
+    # Without the lifespan, so nothing connects to a real mongod
+    return TestClient(server.app)
@@ -0,0 +1,36 @@
+import pytest
+
+from tests.conftest import ADMIN_HEADERS
+
+ADMIN_ROUTES = [
+    ("GET", "/api/contact"),
+    ("GET", "/api/contact/search"),
+    ("PATCH", "/api/contact/inq-1/status"),
+    ("POST", "/api/services"),
+    ("GET", "/api/admin/indexes"),
+    ("POST", "/api/admin/reconcile-orders"),
+    ("POST", "/api/admin/analytics/refresh"),
+    ("GET", "/api/admin/analytics/orders"),
+    ("POST", "/api/admin/archive-orders"),
+    ("GET", "/api/admin/lifecycle"),
+    ("GET", "/api/admin/exports/orders"),
+]
+
+SERVICE = {"name": "Reiki", "description": "Energy healing", "duration": "60 min", "benefits": ["Calm"]}
+
+
+@pytest.mark.parametrize("method,path", ADMIN_ROUTES)
+def test_admin_routes_need_the_admin_token(client, method, path):
+    assert client.request(method, path).status_code == 401
+    assert client.request(method, path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_admin_api_is_disabled_without_a_token(server, client, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", None)
+    assert client.post("/api/services", json=SERVICE, headers=ADMIN_HEADERS).status_code == 403
+
+
+def test_admin_token_is_accepted(client):
+    response = client.post("/api/services", json=SERVICE, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Reiki"
@@ -0,0 +1,106 @@
+import httpx
+import pytest
+
+from admission import AdmissionMiddleware, LocalBucketStore
+
+
+@pytest.mark.anyio
+async def test_bucket_allows_the_burst_then_reports_the_wait(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("admission.time.monotonic", lambda: now[0])
+    store = LocalBucketStore()
+    assert [(await store.take("k", rate=2, burst=3))[0] for _ in range(3)] == [True, True, True]
+    assert await store.take("k", rate=2, burst=3) == (False, 0.5)
+    now[0] += 0.5
+    assert await store.take("k", rate=2, burst=3) == (True, 0.0)
+
+
+@pytest.mark.anyio
+async def test_bucket_store_evicts_the_least_recently_used_key():
+    store = LocalBucketStore(max_keys=2)
+    await store.take("a", rate=1, burst=1)
+    await store.take("b", rate=1, burst=1)
+    await store.take("a", rate=1, burst=1)
+    await store.take("c", rate=1, burst=1)
+    assert list(store._buckets) == ["a", "c"]
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def admission_client(peer, **options):
+    app = AdmissionMiddleware(ok_app, {("POST", "/limited"): {"ip": (0.001, 2)}}, LocalBucketStore(), **options)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, client=(peer, 1234)), base_url="http://test")
+
+
+@pytest.mark.anyio
+async def test_ip_bucket_answers_429_with_retry_after():
+    async with admission_client("203.0.113.1") as http:
+        statuses = [(await http.post("/limited")).status_code for _ in range(3)]
+        rejected = await http.post("/limited")
+        assert (await http.post("/other")).status_code == 200
+    assert statuses == [200, 200, 429]
+    assert int(rejected.headers["retry-after"]) > 0
+
+
+@pytest.mark.anyio
+async def test_ip_limits_can_be_turned_off():
+    async with admission_client("203.0.113.1", ip_limits=False) as http:
+        assert [(await http.post("/limited")).status_code for _ in range(3)] == [200, 200, 200]
+
+
+@pytest.mark.anyio
+async def test_clients_behind_a_trusted_proxy_get_their_own_buckets():
+    async with admission_client("10.0.0.5", trusted_proxies=["10.0.0.0/8"]) as http:
+        for client_ip in ("198.51.100.1", "198.51.100.2"):
+            headers = {"X-Forwarded-For": f"{client_ip}, 10.0.0.7"}
+            assert [(await http.post("/limited", headers=headers)).status_code for _ in range(2)] == [200, 200]
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers():
+    middleware = AdmissionMiddleware(ok_app, {}, LocalBucketStore(), trusted_proxies=["10.0.0.0/8"])
+    scope = {"client": ("203.0.113.1", 1), "headers": [(b"x-forwarded-for", b"198.51.100.1")]}
+    assert middleware.client_ip(scope) == "203.0.113.1"
+    # A client cannot spoof past the proxy: only the entries it appended are trusted
+    scope = {"client": ("10.0.0.5", 1), "headers": [(b"x-forwarded-for", b"1.1.1.1, 198.51.100.1, 10.0.0.7")]}
+    assert middleware.client_ip(scope) == "198.51.100.1"
+
+
+def session_client(store, peer, cookie=None):
+    from sessions import SessionMiddleware, SessionSigner
+
+    rules = {("POST", "/limited"): {"ip": (0.001, 100), "session": (0.001, 1), "new_session": (0.001, 2)}}
+    app = SessionMiddleware(AdmissionMiddleware(ok_app, rules, store), secret="secret")
+    cookies = {"mp_session": SessionSigner("secret").sign(cookie)} if cookie else None
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, client=(peer, 1234)), base_url="http://test", cookies=cookies
+    )
+
+
+@pytest.mark.anyio
+async def test_clients_without_a_session_share_one_bucket():
+    store = LocalBucketStore()
+    statuses = []
+    for peer in ("203.0.113.1", "203.0.113.2", "203.0.113.3"):
+        async with session_client(store, peer) as http:
+            statuses.append((await http.post("/limited")).status_code)
+    assert statuses == [200, 200, 429]
+    # An established session has its own bucket
+    async with session_client(store, "203.0.113.4", cookie="abc") as http:
+        assert [(await http.post("/limited")).status_code for _ in range(2)] == [200, 429]
+
+
+def test_default_settings_rate_limit_cookieless_clients(server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(server, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(server, "rate_limit_store", LocalBucketStore())
+    client = TestClient(server.create_app())
+    inquiry = {"name": "Asha", "email": "asha@example.com", "subject": "Reiki", "message": "Tell me more please."}
+    statuses = []
+    for _ in range(6):
+        client.cookies.clear()
+        statuses.append(client.post("/api/contact", json=inquiry).status_code)
+    assert statuses == [200] * 5 + [429]
@@ -0,0 +1,105 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from analytics import AnalyticsRollups
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL")
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+@pytest.fixture
+def rollups():
+    return AnalyticsRollups(AsyncMongoMockClient(tz_aware=True)["analytics_test"], tz="Asia/Kolkata")
+
+
+def test_day_ranges_use_local_midnight_and_merge_adjacent_days(rollups):
+    ranges = rollups.day_ranges(["2026-01-03", "2026-01-01", "2026-01-02", "2026-01-05"])
+    assert ranges == [
+        (datetime(2026, 1, 1, tzinfo=IST), datetime(2026, 1, 4, tzinfo=IST)),
+        (datetime(2026, 1, 5, tzinfo=IST), datetime(2026, 1, 6, tzinfo=IST)),
+    ]
+
+
+def test_scopes(rollups):
+    assert rollups.scope("created_at", None) == ({}, {})
+    since = datetime(2026, 1, 1, 20, tzinfo=timezone.utc)
+    assert rollups.scope("created_at", since) == ({"created_at": {"$gte": since}}, {"day": {"$gte": "2026-01-02"}})
+    match, days = rollups.scope("created_at", ["2026-01-02"])
+    assert match == {"$or": [{"created_at": {
+        "$gte": datetime(2026, 1, 2, tzinfo=IST), "$lt": datetime(2026, 1, 3, tzinfo=IST),
+    }}]}
+    assert days == {"day": {"$in": ["2026-01-02"]}}
+
+
+@pytest.mark.anyio
+async def test_archived_orders_queue_their_days(rollups):
+    await rollups.mark_orders_archived([
+        {"order_id": "a", "created_at": datetime(2026, 1, 1, 20, tzinfo=timezone.utc)},
+        {"order_id": "b", "created_at": datetime(2026, 1, 2, 1, tzinfo=timezone.utc)},
+    ])
+    await rollups.mark_orders_archived([{"order_id": "c", "created_at": datetime(2026, 1, 5, tzinfo=timezone.utc)}])
+    state = await rollups.rollups.find_one({"_id": "state"})
+    assert state["archived_order_days"] == ["2026-01-02", "2026-01-05"]
+
+
+@pytest.mark.anyio
+async def test_archival_reports_only_the_orders_it_removed(server, monkeypatch):
+    old = datetime.now(timezone.utc) - timedelta(days=60)
+    await server.db.orders.insert_many([
+        {"order_id": f"order_{i}", "status": "created", "created_at": old, "updated_at": old} for i in range(3)
+    ])
+    await server.archive_orders(duty_cycle=1.0)
+    state = await server.db.analytics_daily.find_one({"_id": "state"})
+    assert state["archived_order_days"] == [server.analytics.local_day(old)]
+    assert await server.db.orders_archive.count_documents({}) == 3
+
+
+def order(order_id, day, status="paid", amount=60000):
+    created = datetime.fromisoformat(f"{day}T12:00:00+05:30")
+    return {
+        "order_id": order_id, "status": status, "total_amount": amount, "created_at": created,
+        "updated_at": datetime.now(timezone.utc) - timedelta(hours=1),
+        "items": [{"product_id": "1", "name": "Aura Spray", "quantity": 1, "unit_price": amount}],
+    }
+
+
+@pytest.mark.anyio
+@pytest.mark.skipif(not TEST_MONGO_URL, reason="TEST_MONGO_URL is not set; mongomock has no $merge or $unionWith")
+async def test_refresh_rebuilds_only_changed_and_archived_days():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(TEST_MONGO_URL, tz_aware=True)
+    db = client["mystic_prana_analytics_test"]
+    rollups = AnalyticsRollups(db, tz="Asia/Kolkata", grace=0)
+    try:
+        await db.orders.insert_many([order("a", "2026-01-01"), order("b", "2026-01-02"), order("c", "2026-01-03")])
+        await db.orders_archive.insert_one(order("d", "2026-01-01", status="created"))
+        assert (await rollups.refresh())["refreshed"]["orders"] == "all"
+
+        async def orders_on(day):
+            rollup = await db.analytics_daily.find_one({"metric": "orders", "day": day})
+            return rollup and rollup["orders"]
+
+        # Orders in the archive collection still count
+        assert await orders_on("2026-01-01") == 2
+
+        await db.orders.update_one(
+            {"order_id": "b"}, {"$set": {"status": "failed", "updated_at": datetime.now(timezone.utc)}}
+        )
+        # Archived to files: gone from Mongo, so the day is rebuilt without it
+        archived = await db.orders.find_one_and_delete({"order_id": "c"})
+        await rollups.mark_orders_archived([archived])
+
+        result = await rollups.refresh()
+        assert result["refreshed"]["orders"] == ["2026-01-02", "2026-01-03"]
+        rollup = await db.analytics_daily.find_one({"metric": "orders", "day": "2026-01-02"})
+        assert [status["status"] for status in rollup["statuses"]] == ["failed"]
+        assert await orders_on("2026-01-03") is None
+        assert (await db.analytics_daily.find_one({"_id": "state"}))["archived_order_days"] == []
+        assert "orders" not in (await rollups.refresh())["refreshed"]
+    finally:
+        await client.drop_database("mystic_prana_analytics_test")
+        client.close()
@@ -0,0 +1,26 @@
+import pytest
+
+CART_ITEM = {"product_id": "1", "name": "Aura Spray", "price": "₹600", "image": ""}
+
+
+def test_new_session_gets_an_empty_cart(client):
+    response = client.get("/api/cart/ignored")
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+    assert response.json()["total_amount"] == 0
+    assert "mp_session" in response.cookies
+
+
+@pytest.mark.parametrize("quantity", [0, -1, 100])
+def test_cart_rejects_out_of_range_quantities(client, quantity):
+    response = client.post("/api/cart", json={**CART_ITEM, "quantity": quantity})
+    assert response.status_code == 422
+
+
+def test_create_order_rejects_out_of_range_quantities(client):
+    response = client.post("/api/create-order", json={
+        "amount": 0,
+        "customer_info": {"name": "A", "email": "a@example.com"},
+        "cart_items": [{**CART_ITEM, "quantity": 0}],
+    })
+    assert response.status_code == 422
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+
+def cart_item(server, product_id, quantity):
+    product = server.product_catalog[product_id]
+    return server.CartItem(product_id=product_id, name=product.name, price=product.price, quantity=quantity, image="")
+
+
+def test_price_to_paise(server):
+    assert server.price_to_paise("₹600") == 60000
+    assert server.price_to_paise("$89.99") == 8999
+    assert server.price_to_paise("₹1,299") == 129900
+
+
+def test_order_total_uses_catalog_prices(server):
+    # The client's display price is ignored; the catalog price is authoritative
+    items = [cart_item(server, "1", 2), cart_item(server, "2", 1).model_copy(update={"price": "₹1"})]
+    assert server.order_total_paise(items) == 2 * 60000 + 8999
+
+
+def test_order_total_rejects_unknown_products(server):
+    with pytest.raises(server.HTTPException) as error:
+        server.order_total_paise([server.CartItem(product_id="missing", name="x", price="₹1", quantity=1, image="")])
+    assert error.value.status_code == 404
+
+
+def test_concurrent_boots_seed_the_catalog_once(server):
+    async def boot_twice():
+        await server.db.products.delete_many({})
+        await asyncio.gather(server.load_product_catalog(), server.load_product_catalog())
+        return await server.db.products.count_documents({})
+
+    assert asyncio.run(boot_twice()) == len(server.DEFAULT_PRODUCTS)
+    assert server.product_catalog["1"].price_paise == 60000
+
+
+def test_create_order_rejects_a_mismatched_amount(client):
+    response = client.post("/api/create-order", json={
+        "amount": 100,
+        "customer_info": {"name": "A", "email": "a@example.com"},
+        "cart_items": [{"product_id": "1", "name": "Aura Spray", "price": "₹600", "quantity": 2, "image": ""}],
+    })
+    assert response.status_code == 400
+    assert "does not match cart total 120000" in response.json()["detail"]
@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from email_templates import Template, render_contact_email, render_order_confirmation_email
+
+SCRIPT = "<script>alert('x')</script>"
+
+
+def inquiry(**fields):
+    return SimpleNamespace(**{
+        "id": "inq-1", "name": "Asha", "email": "asha@example.com", "phone": None, "subject": "Reiki",
+        "service_interest": None, "message": "Hello", "timestamp": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        **fields,
+    })
+
+
+def test_placeholders_escape_and_triple_braces_do_not():
+    template = Template("{{ value }}|{{{ value }}}")
+    assert template.render({"value": '<b>"&"</b>'}) == '&lt;b&gt;&quot;&amp;&quot;&lt;/b&gt;|<b>"&"</b>'
+
+
+def test_contact_email_escapes_every_customer_field():
+    subject, html, text = render_contact_email(inquiry(
+        name=SCRIPT, subject=SCRIPT, phone=SCRIPT, service_interest=SCRIPT, message=f"{SCRIPT}\nbye",
+    ))
+    assert "<script>" not in html
+    assert html.count("&lt;script&gt;") == 5
+    assert "&lt;script&gt;alert(&#x27;x&#x27;)&lt;/script&gt;<br>bye" in html
+    # Plain text is not HTML, so it keeps the original characters
+    assert f"Name: {SCRIPT}" in text
+
+
+def test_contact_email_leaves_out_missing_optional_fields():
+    _, html, text = render_contact_email(inquiry())
+    assert "Phone:" not in html
+    assert "Phone: Not provided" in text
+    assert "Service Interest: General inquiry" in text
+
+
+def test_order_email_escapes_item_names():
+    _, html, text = render_order_confirmation_email({
+        "order_id": "order_1", "customer_info": {"name": "Asha & Co"}, "total_amount": 129900, "status": "paid",
+        "items": [{"name": SCRIPT, "quantity": 2, "price": "₹600"}],
+    })
+    assert "<script>" not in html
+    assert "Asha &amp; Co" in html
+    assert "₹1299.0" in html
+    assert f"- {SCRIPT} x 2 @ ₹600" in text
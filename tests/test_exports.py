@@ -0,0 +1,100 @@
+import asyncio
+import csv
+import io
+import sys
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+
+from exports import COLUMNS, CsvEncoder, JsonlEncoder, OrderExport, export_to_file, flatten_order
+from tests.conftest import ADMIN_HEADERS
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def order(i, items=1, status="paid"):
+    created_at = START + timedelta(hours=i)
+    return {
+        "id": f"id-{i}", "order_id": f"order_{i:03d}", "status": status, "currency": "INR",
+        "total_amount": 60000 * items, "payment_id": None, "created_at": created_at, "updated_at": created_at,
+        "customer_info": {"name": f"Customer {i}", "email": f"c{i}@example.com", "phone": "1", "address": "Lane"},
+        "items": [
+            {"product_id": "1", "name": "Aura Spray", "quantity": 1, "unit_price": 60000, "price": "₹600"}
+        ] * items,
+    }
+
+
+def test_flatten_order_repeats_order_columns_per_item():
+    rows = flatten_order(order(1, items=2))
+    assert [row["item_index"] for row in rows] == [0, 1]
+    assert all(row["order_id"] == "order_001" and row["customer_email"] == "c1@example.com" for row in rows)
+    assert set(rows[0]) == set(COLUMNS)
+
+
+def test_order_without_items_still_gets_a_row():
+    [row] = flatten_order({**order(1), "items": []})
+    assert row["item_index"] is None and row["item_product_id"] is None
+
+
+def test_csv_header_is_written_once():
+    encoder = CsvEncoder()
+    data = encoder.encode(flatten_order(order(1))) + encoder.encode(flatten_order(order(2)))
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert [row["order_id"] for row in rows] == ["order_001", "order_002"]
+    assert rows[0]["created_at"] == "2026-01-01T01:00:00+00:00"
+
+
+def test_jsonl_writes_one_object_per_row():
+    data = JsonlEncoder().encode(flatten_order(order(1, items=3)))
+    assert [orjson.loads(line)["item_index"] for line in data.splitlines()] == [0, 1, 2]
+
+
+async def seed(server, count):
+    await server.db.orders.insert_many([order(i, status="paid" if i % 2 else "created") for i in range(count)])
+
+
+@pytest.mark.anyio
+async def test_export_filters_and_resumes_from_the_checkpoint(server, tmp_path):
+    await seed(server, 10)
+    export = OrderExport(server.db.orders, statuses=["paid"], chunk_size=2)
+    path = tmp_path / "orders.jsonl"
+    first = await export_to_file(export, "jsonl", path)
+    assert first["orders"] == 5
+    expected = path.read_bytes()
+
+    # Simulate an interrupted run: the checkpoint covers the first chunk only,
+    # and a partial row was written after it
+    lines = expected.splitlines(keepends=True)
+    checkpoint = {
+        "filters": {"format": "jsonl", "start": None, "end": None, "statuses": ["paid"]},
+        "position": {"created_at": (START + timedelta(hours=3)).isoformat(), "order_id": "order_003"},
+        "orders": 2, "rows": 2, "bytes": len(b"".join(lines[:2])), "part": 0,
+    }
+    path.write_bytes(b"".join(lines[:2]) + b'{"partial"')
+    (tmp_path / "orders.jsonl.checkpoint.json").write_bytes(orjson.dumps(checkpoint))
+
+    with pytest.raises(FileExistsError):
+        await export_to_file(export, "jsonl", path)
+    resumed = await export_to_file(export, "jsonl", path, resume=True)
+    assert resumed["orders"] == 3
+    assert path.read_bytes() == expected
+    assert not (tmp_path / "orders.jsonl.checkpoint.json").exists()
+
+
+def test_export_endpoint_streams_csv(server, client):
+    asyncio.run(seed(server, 3))
+    response = client.get("/api/admin/exports/orders?format=csv", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert [row["order_id"] for row in csv.DictReader(io.StringIO(response.text))] == [
+        "order_000", "order_001", "order_002"
+    ]
+
+
+def test_parquet_export_without_pyarrow_is_a_400(client, monkeypatch):
+    # A None entry makes "import pyarrow" raise ImportError
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    response = client.get("/api/admin/exports/orders?format=parquet", headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+    assert "pyarrow" in response.json()["detail"]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from group_commit import GroupCommitError, GroupCommitWriter
+
+
+class RecordingCollection:
+    """Passes insert_many through to mongomock and records each batch size"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.batches = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.batches.append(len(documents))
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+
+@pytest.fixture
+def collection():
+    return RecordingCollection(AsyncMongoMockClient()["group_commit_test"].status_checks)
+
+
+@pytest.mark.anyio
+async def test_concurrent_inserts_share_one_write(collection):
+    writer = GroupCommitWriter(collection, max_batch=100, max_delay=0.01)
+    await asyncio.gather(*(writer.insert({"_id": i}) for i in range(20)))
+    assert collection.batches == [20]
+    assert await collection.collection.count_documents({}) == 20
+
+
+@pytest.mark.anyio
+async def test_full_batches_are_written_without_waiting(collection):
+    writer = GroupCommitWriter(collection, max_batch=5, max_delay=60)
+    await asyncio.wait_for(asyncio.gather(*(writer.insert({"_id": i}) for i in range(10))), timeout=1)
+    assert collection.batches == [5, 5]
+
+
+@pytest.mark.anyio
+async def test_only_the_failed_document_raises(collection):
+    await collection.collection.insert_one({"_id": 1})
+    writer = GroupCommitWriter(collection, max_batch=3, max_delay=0.01)
+    results = await asyncio.gather(*(writer.insert({"_id": i}) for i in range(3)), return_exceptions=True)
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], GroupCommitError)
+    assert collection.batches == [3]
+
+
+@pytest.mark.anyio
+async def test_close_flushes_pending_inserts(collection):
+    writer = GroupCommitWriter(collection, max_batch=100, max_delay=60)
+    pending = asyncio.create_task(writer.insert({"_id": 1}))
+    await asyncio.sleep(0)
+    await writer.close()
+    await pending
+    assert collection.batches == [1]
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from idempotency import IdempotencyKeyInProgress, IdempotencyKeyReused, IdempotencyStore
+
+
+@pytest.fixture
+def store():
+    return IdempotencyStore(AsyncMongoMockClient(tz_aware=True)["idempotency_test"].idempotency_keys)
+
+
+def counting_operation(result, delay=0.0):
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+
+    return operation, calls
+
+
+@pytest.mark.anyio
+async def test_concurrent_duplicates_run_the_operation_once(store):
+    operation, calls = counting_operation({"id": "order_1"}, delay=0.05)
+    results = await asyncio.gather(*(store.run("create-order", "k1", "fp", operation) for _ in range(5)))
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [{"id": "order_1"}] * 5
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+
+
+@pytest.mark.anyio
+async def test_completed_key_is_replayed(store):
+    operation, calls = counting_operation({"id": "order_1"})
+    assert await store.run("create-order", "k1", "fp", operation) == ({"id": "order_1"}, False)
+    assert await store.run("create-order", "k1", "fp", operation) == ({"id": "order_1"}, True)
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_key_reused_with_another_request_is_rejected(store):
+    operation, _ = counting_operation({"id": "order_1"})
+    await store.run("create-order", "k1", "fp", operation)
+    with pytest.raises(IdempotencyKeyReused):
+        await store.run("create-order", "k1", "other-fp", operation)
+
+
+@pytest.mark.anyio
+async def test_failed_operation_releases_the_key(store):
+    async def failing():
+        raise RuntimeError("gateway down")
+
+    with pytest.raises(RuntimeError):
+        await store.run("create-order", "k1", "fp", failing)
+    operation, _ = counting_operation({"id": "order_2"})
+    assert await store.run("create-order", "k1", "fp", operation) == ({"id": "order_2"}, False)
+
+
+@pytest.mark.anyio
+async def test_duplicate_gives_up_after_the_wait_timeout(store):
+    store.wait_timeout = 0.05
+    slow, _ = counting_operation({"id": "order_1"}, delay=0.5)
+    original = asyncio.create_task(store.run("create-order", "k1", "fp", slow))
+    await asyncio.sleep(0.01)
+    with pytest.raises(IdempotencyKeyInProgress):
+        await store.run("create-order", "k1", "fp", slow)
+    await original
+
+
+@pytest.mark.anyio
+async def test_record_of_a_dead_owner_is_taken_over(store):
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    await store.collection.insert_one({
+        "_id": "create-order:k1", "fingerprint": "fp", "state": "in_progress", "owner": "dead",
+        "locked_until": past, "created_at": past,
+    })
+    operation, calls = counting_operation({"id": "order_1"})
+    assert await store.run("create-order", "k1", "fp", operation) == ({"id": "order_1"}, False)
+    assert len(calls) == 1
+
+
+ORDER = {
+    "amount": 60000,
+    "customer_info": {"name": "A", "email": "a@example.com"},
+    "cart_items": [{"product_id": "1", "name": "Aura Spray", "price": "₹600", "quantity": 1, "image": ""}],
+}
+
+
+def test_create_order_replays_the_original_order(server, client):
+    first = client.post("/api/create-order", json=ORDER, headers={"Idempotency-Key": "k1"})
+    second = client.post("/api/create-order", json=ORDER, headers={"Idempotency-Key": "k1"})
+    assert first.status_code == second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert asyncio.run(server.db.orders.count_documents({})) == 1
+
+
+def test_create_order_rejects_a_reused_key(client):
+    client.post("/api/create-order", json=ORDER, headers={"Idempotency-Key": "k1"})
+    changed = {**ORDER, "customer_info": {"name": "B", "email": "b@example.com"}}
+    assert client.post("/api/create-order", json=changed, headers={"Idempotency-Key": "k1"}).status_code == 422
@@ -0,0 +1,60 @@
+"""Cold-start checks for `import server` in fresh interpreters.
+
+The import time is compared with importing the frameworks server.py cannot
+avoid loading (FastAPI, pydantic, pymongo, orjson), measured the same way
+on the same machine. An absolute budget failed on slower or busier
+machines.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Imported only on first use, never by `import server`
+LAZY_MODULES = ("motor", "httpx", "resend", "requests", "dotenv", "razorpay", "pandas", "numpy", "boto3", "pyarrow")
+
+BASELINE_IMPORT = "fastapi, pydantic, pymongo, orjson"
+# server.py may take at most this multiple of the baseline
+MAX_RATIO = float(os.environ.get("IMPORT_TIME_MAX_RATIO", "2.0"))
+RUNS = 3
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps([time.perf_counter() - start, sorted(sys.modules)]))
+"""
+
+
+def cold_import(module):
+    """Return (seconds, loaded module names) for importing module in a fresh interpreter"""
+    env = {key: value for key, value in os.environ.items() if key not in ("MONGO_URL", "DB_NAME")}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, f"import {module} failed:\n{result.stderr[-2000:]}"
+    seconds, modules = json.loads(result.stdout.splitlines()[-1])
+    return seconds, modules
+
+
+def test_sdks_load_lazily():
+    _, modules = cold_import("server")
+    assert [name for name in LAZY_MODULES if name in modules] == []
+
+
+def test_import_time_stays_close_to_the_framework_baseline():
+    # Interleaved so a busy spell slows both measurements alike
+    server_runs, baseline_runs = [], []
+    for _ in range(RUNS):
+        server_runs.append(cold_import("server")[0])
+        baseline_runs.append(cold_import(BASELINE_IMPORT)[0])
+    server_s, baseline_s = statistics.median(server_runs), statistics.median(baseline_runs)
+    assert server_s <= baseline_s * MAX_RATIO, (
+        f"import server took {server_s * 1000:.0f} ms, over {MAX_RATIO}x the "
+        f"{baseline_s * 1000:.0f} ms it takes to import {BASELINE_IMPORT}"
+    )
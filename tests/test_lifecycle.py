@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.mark.anyio
+async def test_payment_for_an_archived_order_restores_it(server):
+    await server.db.orders_archive.insert_one({"order_id": "order_old", "status": "created", "customer_info": {}})
+    order = await server.mark_order_paid("order_old", "pay_9")
+    assert order["status"] == "paid"
+    assert await server.db.orders_archive.count_documents({}) == 0
+    assert (await server.db.orders.find_one({"order_id": "order_old"}))["payment_id"] == "pay_9"
+
+
+@pytest.mark.anyio
+async def test_payment_for_an_unknown_order_is_recorded(server):
+    assert await server.mark_order_paid("order_missing", "pay_9") is None
+    orphan = await server.db.orphan_payments.find_one({}, {"_id": 0, "received_at": 0})
+    assert orphan == {"order_id": "order_missing", "payment_id": "pay_9"}
@@ -0,0 +1,59 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from outbox import EmailOutbox, LocalTransport
+from task_leases import TaskLeases
+
+MESSAGE = {"to": ["asha@example.com"], "subject": "Hello", "html": "<p>Hi</p>"}
+
+
+@pytest.fixture
+def database():
+    return AsyncMongoMockClient(tz_aware=True)["outbox_test"]
+
+
+def outbox(database, transport, **options):
+    return EmailOutbox(database.email_outbox, transport, rate_per_second=0, **options)
+
+
+@pytest.mark.anyio
+async def test_failed_send_is_retried_after_the_backoff(database):
+    transport = LocalTransport(fail_times=1)
+    box = outbox(database, transport, backoff=60)
+    job_id = await box.enqueue(MESSAGE)
+
+    assert await box.drain_once() == 1
+    job = await database.email_outbox.find_one({"id": job_id})
+    assert (job["status"], job["attempts"]) == ("pending", 1)
+    assert job["last_error"] == "Simulated transport failure"
+    # Not due again until the backoff has passed
+    assert await box.drain_once() == 0
+
+    await database.email_outbox.update_one({"id": job_id}, {"$set": {"next_attempt_at": job["created_at"]}})
+    assert await box.drain_once() == 1
+    job = await database.email_outbox.find_one({"id": job_id})
+    assert (job["status"], job["attempts"]) == ("sent", 2)
+    assert transport.sent == [MESSAGE]
+
+
+@pytest.mark.anyio
+async def test_job_is_dead_lettered_after_max_attempts(database):
+    box = outbox(database, LocalTransport(fail_times=10), backoff=0, max_attempts=3)
+    job_id = await box.enqueue(MESSAGE)
+    for _ in range(3):
+        assert await box.drain_once() == 1
+    job = await database.email_outbox.find_one({"id": job_id})
+    assert (job["status"], job["attempts"]) == ("dead", 3)
+    assert await box.drain_once() == 0
+
+
+@pytest.mark.anyio
+async def test_only_the_lease_holder_sends(database):
+    first = outbox(database, LocalTransport(), leases=TaskLeases(database.task_leases, owner="worker-1"))
+    second = outbox(database, LocalTransport(), leases=TaskLeases(database.task_leases, owner="worker-2"))
+    assert await first._holds_lease()
+    assert await first._holds_lease()
+    assert not await second._holds_lease()
+
+    await first.stop()
+    assert await second._holds_lease()
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tests.conftest import ADMIN_HEADERS
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def seed_inquiries(server, count):
+    # Pairs share a timestamp so pages must break ties on id
+    asyncio.run(server.db.contact_inquiries.insert_many([
+        {
+            "id": f"inq-{i:03d}", "name": "Asha", "email": "asha@example.com", "phone": None,
+            "subject": "Question about reiki", "message": "Tell me more about reiki please.",
+            "service_interest": None, "timestamp": START + timedelta(minutes=i // 2),
+            "status": "new" if i % 3 else "closed",
+        }
+        for i in range(count)
+    ]))
+
+
+def test_cursor_round_trip(server):
+    doc = {"timestamp": START, "id": "inq-007"}
+    assert server.decode_cursor(server.encode_cursor(doc)) == {"$or": [
+        {"timestamp": {"$lt": START}},
+        {"timestamp": START, "id": {"$lt": "inq-007"}},
+    ]}
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm9wZQ==", "WzEsMl0="])
+def test_invalid_cursors_are_rejected(server, cursor):
+    with pytest.raises(server.HTTPException) as error:
+        server.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def collect_pages(client, url):
+    ids, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        ids += [inquiry["id"] for inquiry in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return ids
+
+
+def test_keyset_pages_cover_every_inquiry_once(server, client):
+    seed_inquiries(server, 25)
+    ids = collect_pages(client, "/api/contact?limit=4")
+    assert ids == [f"inq-{i:03d}" for i in reversed(range(25))]
+
+
+def test_ranked_search_cursor_round_trip(server):
+    doc = {"timestamp": START, "id": "inq-007", "score": 1.5}
+    query = server.decode_search_cursor(server.encode_search_cursor(doc), ranked=True)
+    assert query["$or"][0] == {"score": {"$lt": 1.5}}
+    assert {"score": 1.5, "timestamp": START, "id": {"$lt": "inq-007"}} in query["$or"]
+
+
+def test_unranked_search_cursor_needs_no_score(server):
+    cursor = server.encode_cursor({"timestamp": START, "id": "inq-007"})
+    assert server.decode_search_cursor(cursor, ranked=False) == server.decode_cursor(cursor)
+    with pytest.raises(server.HTTPException):
+        server.decode_search_cursor(cursor, ranked=True)
+
+
+def test_filtered_search_pages_cover_every_match_once(server, client):
+    seed_inquiries(server, 25)
+    ids = collect_pages(client, "/api/contact/search?status=closed&limit=3")
+    assert ids == [f"inq-{i:03d}" for i in reversed(range(25)) if i % 3 == 0]
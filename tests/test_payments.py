@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+from payments import (
+    CircuitBreaker, GatewayUnavailableError, PaymentGatewayError, RazorpayGateway, SignatureVerificationError,
+    hmac_sha256, verify_signature,
+)
+
+
+def gateway_with(handler, breaker):
+    gateway = RazorpayGateway("key", "secret", max_retries=0, breaker=breaker)
+    gateway._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://razorpay.test")
+    return gateway
+
+
+def test_signature_verification():
+    signature = hmac_sha256("secret", b"order_1|pay_1")
+    verify_signature("secret", b"order_1|pay_1", signature)
+    with pytest.raises(SignatureVerificationError):
+        verify_signature("secret", b"order_1|pay_2", signature)
+
+
+def test_breaker_opens_after_the_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(GatewayUnavailableError):
+        breaker.before_call()
+
+
+def test_half_open_admits_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.before_call() is True
+    with pytest.raises(GatewayUnavailableError):
+        breaker.before_call()
+    breaker.record_failure()
+    # The failed trial reopens the circuit; after the cool-down another trial goes through
+    assert breaker.before_call() is True
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_wait_out_the_trial_request():
+    release = asyncio.Event()
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await release.wait()
+        return httpx.Response(200, json={"id": "order_1"})
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    gateway = gateway_with(handler, breaker)
+    trial = asyncio.create_task(gateway.fetch_order("order_1"))
+    await asyncio.sleep(0)
+    with pytest.raises(GatewayUnavailableError):
+        await gateway.fetch_order("order_2")
+    release.set()
+    assert await trial == {"id": "order_1"}
+    assert calls == ["/orders/order_1"]
+    assert breaker.state == "closed"
+    await gateway.close()
+
+
+@pytest.mark.anyio
+async def test_server_errors_count_as_failures():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    gateway = gateway_with(lambda request: httpx.Response(502), breaker)
+    with pytest.raises(PaymentGatewayError):
+        await gateway.fetch_order("order_1")
+    assert breaker.state == "open"
+    await gateway.close()
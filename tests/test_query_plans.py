@@ -0,0 +1,27 @@
+"""Explain every endpoint query against a real mongod; mongomock has no query planner.
+
+Set TEST_MONGO_URL to run, e.g. TEST_MONGO_URL=mongodb://localhost:27017.
+The test creates and drops its own mystic_prana_plans_test database.
+"""
+import os
+
+import pytest
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_MONGO_URL, reason="TEST_MONGO_URL is not set")
+
+
+@pytest.mark.anyio
+async def test_no_endpoint_query_uses_a_collection_scan(server):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(TEST_MONGO_URL, tz_aware=True)
+    server.db.bind(client["mystic_prana_plans_test"])
+    try:
+        await server.ensure_indexes()
+        plans = await server.explain_endpoint_queries()
+    finally:
+        await client.drop_database("mystic_prana_plans_test")
+        client.close()
+    assert {endpoint: stages for endpoint, stages in plans.items() if "COLLSCAN" in stages} == {}
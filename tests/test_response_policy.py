@@ -0,0 +1,91 @@
+import httpx
+import pytest
+
+from response_policy import ResponsePolicyMiddleware, etag_matches
+
+BODY = b'{"items": [' + b", ".join(b'"row"' for _ in range(500)) + b"]}"
+
+
+def listing():
+    """Stands in for the route endpoint the policy is keyed on"""
+
+
+async def listing_app(scope, receive, send):
+    scope["endpoint"] = listing
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(BODY)).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": BODY})
+
+
+def policy_client():
+    app = ResponsePolicyMiddleware(listing_app, {"listing": "private, no-cache"}, etag_routes=("listing",))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "other"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    # An encoded variant is a different representation
+    assert not etag_matches('"abc-gzip"', '"abc"')
+    assert not etag_matches('"abc"', '"abc-gzip"')
+
+
+@pytest.mark.anyio
+async def test_compressed_response_carries_an_encoding_specific_etag():
+    async with policy_client() as http:
+        plain = await http.get("/", headers={"Accept-Encoding": "identity"})
+        compressed = await http.get("/", headers={"Accept-Encoding": "gzip"})
+    assert plain.content == BODY
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    # httpx decodes the body
+    assert compressed.content == BODY
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.headers["cache-control"] == "private, no-cache"
+
+
+@pytest.mark.anyio
+async def test_revalidation_returns_304_with_the_same_etag():
+    async with policy_client() as http:
+        first = await http.get("/", headers={"Accept-Encoding": "gzip"})
+        etag = first.headers["etag"]
+        revalidated = await http.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+
+@pytest.mark.anyio
+async def test_etag_of_another_encoding_does_not_revalidate():
+    async with policy_client() as http:
+        compressed = await http.get("/", headers={"Accept-Encoding": "gzip"})
+        headers = {"Accept-Encoding": "identity", "If-None-Match": compressed.headers["etag"]}
+        plain = await http.get("/", headers=headers)
+    assert plain.status_code == 200
+    assert plain.content == BODY
+
+
+def test_services_revalidate_on_etag_and_last_modified(client):
+    first = client.get("/api/services", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    by_etag = client.get("/api/services", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert (by_etag.status_code, by_etag.headers["etag"]) == (304, first.headers["etag"])
+    by_date = client.get("/api/services", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert by_date.status_code == 304
+    changed = client.get("/api/services", headers={"If-None-Match": '"stale"'})
+    assert changed.status_code == 200
+
+
+def test_services_revalidate_without_the_response_policy(server):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(server.create_app(response_policy=False))
+    first = client.get("/api/services")
+    assert "content-encoding" not in first.headers
+    by_etag = client.get("/api/services", headers={"If-None-Match": first.headers["etag"]})
+    assert (by_etag.status_code, by_etag.headers["etag"]) == (304, first.headers["etag"])
+    by_date = client.get("/api/services", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert by_date.status_code == 304
+    assert client.get("/api/services", headers={"If-None-Match": '"stale"'}).status_code == 200
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from tests.conftest import ADMIN_HEADERS
+
+SERVICE = {"name": "Reiki", "description": "Energy healing", "duration": "60 min", "benefits": ["Calm"]}
+
+
+@pytest.mark.anyio
+async def test_snapshot_is_reused_until_invalidated(server):
+    first = await server.services_cache.get()
+    assert [service.name for service in first.services] == [s["name"] for s in server.DEFAULT_SERVICES]
+    await server.db.services.insert_one({**SERVICE, "id": "svc-1", "is_active": True})
+    assert await server.services_cache.get() is first
+    server.services_cache.invalidate()
+    refreshed = await server.services_cache.get()
+    assert [service.name for service in refreshed.services] == ["Reiki"]
+    assert refreshed.etag != first.etag
+
+
+@pytest.mark.anyio
+async def test_unchanged_content_keeps_its_etag_and_last_modified(server):
+    first = await server.services_cache.get()
+    server.services_cache.invalidate()
+    second = await server.services_cache.get()
+    assert second is not first
+    assert (second.etag, second.last_modified) == (first.etag, first.last_modified)
+
+
+@pytest.mark.anyio
+async def test_concurrent_misses_load_once(server, monkeypatch):
+    loads = []
+    load = server.services_cache._load
+
+    async def counting_load():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return await load()
+
+    monkeypatch.setattr(server.services_cache, "_load", counting_load)
+    snapshots = await asyncio.gather(*(server.services_cache.get() for _ in range(10)))
+    assert len(loads) == 1
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+
+def test_creating_a_service_invalidates_the_cache(client):
+    assert "Reiki" not in [service["name"] for service in client.get("/api/services").json()]
+    assert client.post("/api/services", json=SERVICE, headers=ADMIN_HEADERS).status_code == 200
+    assert [service["name"] for service in client.get("/api/services").json()] == ["Reiki"]
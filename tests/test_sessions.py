@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from sessions import SessionSigner
+
+ITEM = {"product_id": "1", "name": "Aura Spray", "price": "₹600", "quantity": 1, "image": "", "unit_price": 60000}
+
+
+def test_signed_session_ids_round_trip():
+    signer = SessionSigner("secret")
+    assert signer.unsign(signer.sign("abc.def")) == "abc.def"
+
+
+@pytest.mark.parametrize("token", ["abc", "abc.", ".sig", "abc.0123456789abcdef0123456789abcdef"])
+def test_unsigned_or_forged_tokens_are_rejected(token):
+    assert SessionSigner("secret").unsign(token) is None
+
+
+def test_tokens_signed_with_another_secret_are_rejected():
+    assert SessionSigner("secret").unsign(SessionSigner("other").sign("abc")) is None
+
+
+def test_session_cookie_keeps_the_cart_session(client):
+    first = client.get("/api/cart/ignored")
+    second = client.get("/api/cart/ignored")
+    assert second.json()["session_id"] == first.json()["session_id"]
+    # The cookie is only set when the session is issued
+    assert "set-cookie" not in second.headers
+
+
+def test_forged_cookie_gets_a_new_session(client):
+    session_id = client.get("/api/cart/ignored").json()["session_id"]
+    client.cookies.set("mp_session", f"{session_id}.0123456789abcdef0123456789abcdef")
+    response = client.get("/api/cart/ignored")
+    assert response.json()["session_id"] != session_id
+    assert "mp_session" in response.cookies
+
+
+def test_generated_session_secret_is_refused_with_several_workers(server, monkeypatch):
+    monkeypatch.setattr(server, "SESSION_SECRET_GENERATED", True)
+    server.validate_settings()
+    monkeypatch.setattr(server, "WEB_CONCURRENCY", 2)
+    with pytest.raises(RuntimeError, match="SESSION_SECRET"):
+        server.validate_settings()
+
+
+@pytest.fixture
+def hot_carts(server):
+    server.hot_carts.set_available(True)
+    yield server.hot_carts
+    server.hot_carts.set_available(False)
+
+
+def cart(session_id, version, quantity):
+    return {"id": "cart-1", "session_id": session_id, "version": version,
+            "items": [{**ITEM, "quantity": quantity}], "total_amount": 600.0 * quantity}
+
+
+def test_hot_cart_keeps_the_newest_version(hot_carts):
+    hot_carts.put("s1", cart("s1", 2, 2))
+    hot_carts.put("s1", cart("s1", 1, 1))
+    hit, version, body = hot_carts.get("s1")
+    assert (hit, version) == (True, 2)
+    assert b'"quantity":2' in body
+
+
+@pytest.mark.parametrize("verify,quantity", [(True, 2), (False, 1)])
+def test_cart_written_by_another_worker_is_read_from_mongo(server, client, hot_carts, monkeypatch, verify, quantity):
+    monkeypatch.setattr(server, "HOT_CART_VERIFY_READS", verify)
+    session_id = client.get("/api/cart/ignored").json()["session_id"]
+    hot_carts.put(session_id, cart(session_id, 1, 1))
+    # Another worker's write whose change event has not arrived yet
+    asyncio.run(server.db.carts.insert_one(cart(session_id, 2, 2)))
+    assert client.get("/api/cart/ignored").json()["items"][0]["quantity"] == quantity
@@ -0,0 +1,43 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from task_leases import TaskLeases
+
+
+@pytest.fixture
+def collection():
+    return AsyncMongoMockClient(tz_aware=True)["mystic_prana_test"].task_leases
+
+
+@pytest.mark.anyio
+async def test_one_worker_holds_a_lease_until_it_expires(collection):
+    first, second = TaskLeases(collection, owner="a"), TaskLeases(collection, owner="b")
+    assert await first.acquire("reconcile_orders", 60)
+    assert not await second.acquire("reconcile_orders", 60)
+    # The holder renews its own lease; other tasks are independent
+    assert await first.acquire("reconcile_orders", 60)
+    assert await second.acquire("archive_orders", 60)
+
+
+@pytest.mark.anyio
+async def test_expired_or_released_leases_are_taken_over(collection):
+    first, second = TaskLeases(collection, owner="a"), TaskLeases(collection, owner="b")
+    assert await first.acquire("refresh_analytics", -1)
+    assert await second.acquire("refresh_analytics", 60)
+    await second.release("refresh_analytics")
+    assert await first.acquire("refresh_analytics", 60)
+
+
+@pytest.mark.anyio
+async def test_periodic_run_is_skipped_without_the_lease(server, monkeypatch):
+    runs = []
+
+    async def task():
+        runs.append(1)
+        return {"ran": True}
+
+    assert await server.run_if_leased("reconcile_orders", 60, task) == {"ran": True}
+    # Another worker's view of the same lease
+    monkeypatch.setattr(server, "task_leases", TaskLeases(server.db.task_leases, owner="other"))
+    assert await server.run_if_leased("reconcile_orders", 60, task) is None
+    assert runs == [1]
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import hmac
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+
+SECRET = "test-webhook-secret"
+
+
+def captured_event(order_id="order_1", payment_id="pay_1"):
+    return {
+        "event": "payment.captured",
+        "payload": {"payment": {"entity": {"id": payment_id, "order_id": order_id}}},
+    }
+
+
+def signed(body: bytes, secret: str = SECRET) -> dict:
+    return {"X-Razorpay-Signature": hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()}
+
+
+@pytest.fixture
+def live_gateway(server, monkeypatch):
+    monkeypatch.setattr(server.payment_gateway, "demo", False)
+    monkeypatch.setattr(server, "RAZORPAY_WEBHOOK_SECRET", SECRET)
+    return server
+
+
+def insert_order(server, order_id="order_1", status="created"):
+    now = datetime.now(timezone.utc)
+    asyncio.run(server.db.orders.insert_one({
+        "id": order_id, "order_id": order_id, "customer_info": {}, "items": [], "total_amount": 60000,
+        "currency": "INR", "status": status, "payment_id": None, "created_at": now, "updated_at": now,
+    }))
+
+
+def test_live_gateway_requires_a_signature(live_gateway, client):
+    body = orjson.dumps(captured_event())
+    assert client.post("/api/webhook", content=body).status_code == 401
+    assert client.post("/api/webhook", content=body, headers=signed(body, "wrong")).status_code == 401
+
+
+def test_live_gateway_without_a_secret_rejects_webhooks(live_gateway, client, monkeypatch):
+    monkeypatch.setattr(live_gateway, "RAZORPAY_WEBHOOK_SECRET", None)
+    body = orjson.dumps(captured_event())
+    assert client.post("/api/webhook", content=body, headers=signed(body)).status_code == 401
+
+
+def test_live_gateway_without_a_secret_refuses_to_start(live_gateway, monkeypatch):
+    monkeypatch.setattr(live_gateway, "RAZORPAY_WEBHOOK_SECRET", None)
+    with pytest.raises(RuntimeError, match="RAZORPAY_WEBHOOK_SECRET"):
+        live_gateway.validate_settings()
+
+
+def test_signed_webhook_marks_the_order_paid(live_gateway, client):
+    insert_order(live_gateway)
+    body = orjson.dumps(captured_event())
+    response = client.post("/api/webhook", content=body, headers=signed(body))
+    assert response.status_code == 200
+    order = client.get("/api/orders/order_1").json()
+    assert (order["status"], order["payment_id"]) == ("paid", "pay_1")
+
+
+def test_non_object_payload_is_rejected(live_gateway, client):
+    body = b"[1, 2]"
+    assert client.post("/api/webhook", content=body, headers=signed(body)).status_code == 400
+
+
+def test_redelivered_event_is_applied_once(server, client):
+    asyncio.run(server.ensure_indexes())
+    insert_order(server)
+    body = orjson.dumps(captured_event())
+    headers = {"X-Razorpay-Event-Id": "evt_1"}
+    first = client.post("/api/webhook", content=body, headers=headers)
+    second = client.post("/api/webhook", content=body, headers=headers)
+    assert first.json() == {"status": "ok"}
+    assert second.json() == {"status": "ok", "duplicate": True}
+
+
+def test_demo_verification_marks_the_order_paid_once(server, client):
+    insert_order(server)
+    asyncio.run(server.db.orders.update_one({"order_id": "order_1"}, {"$set": {"customer_info": {
+        "name": "Asha", "email": "asha@example.com",
+    }}}))
+    verification = {"razorpay_order_id": "order_1", "razorpay_payment_id": "pay_1", "razorpay_signature": "demo"}
+    for _ in range(2):
+        assert client.post("/api/verify-payment", json=verification).json()["status"] == "success"
+    order = asyncio.run(server.db.orders.find_one({"order_id": "order_1"}))
+    assert (order["status"], order["payment_id"]) == ("paid", "pay_1")
+    # The confirmation email is queued by the call that moved the order to paid
+    assert asyncio.run(server.db.email_outbox.count_documents({"kind": "order_confirmation"})) == 1